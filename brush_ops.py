@@ -0,0 +1,504 @@
+"""
+Brush operations on generated or parsed solids
+
+Works on the solid dicts used by every generator and converter in this
+project ({'id', 'sides': [{'plane', 'material', ...}]}). Axis-aligned boxes
+are recognised from their side planes, so the passes here don't depend on
+which generator built a brush or in what order it wrote the sides.
+
+A box is described by its numeric extents (x0, y0, z0, x1, y1, z1) and a
+tuple with the material of each face in FACE_KEYS order.
+"""
+
+import re
+
+import numpy as np
+
+from spatial_index import SpatialIndex
+
+# Face names as used by the generators' _create_box texture dicts,
+# in axis order: -X, +X, -Y, +Y, -Z, +Z
+FACE_KEYS = ('left', 'right', 'front', 'back', 'bottom', 'top')
+
+POINT_PATTERN = re.compile(r'\(\s*([-\d.eE+]+)\s+([-\d.eE+]+)\s+([-\d.eE+]+)\s*\)')
+
+
+def parse_points(plane):
+    """Return the points of a side's plane string as (x, y, z) float tuples."""
+    return [(float(x), float(y), float(z)) for x, y, z in POINT_PATTERN.findall(plane)]
+
+
+def side_axis(points):
+    """Return (axis, value) if all points lie on one axis-aligned plane, else None."""
+    for axis in range(3):
+        value = points[0][axis]
+        if all(point[axis] == value for point in points):
+            return axis, value
+    return None
+
+
+def solid_bounds(solid):
+    """Return the (mins, maxs) bounding box of all points of a solid's sides."""
+    points = [point for side in solid['sides'] for point in parse_points(side['plane'])]
+    mins = [min(point[axis] for point in points) for axis in range(3)]
+    maxs = [max(point[axis] for point in points) for axis in range(3)]
+    return mins, maxs
+
+
+def solid_planes(solid):
+    """
+    Return (normals, distances) of a convex solid's side planes as arrays:
+    points p inside the brush have normals @ p <= distances.
+
+    Normals are oriented away from the mean of the plane points, which lies
+    inside a convex brush, so the result doesn't depend on the winding a
+    generator wrote its planes with.
+    """
+    points = np.array([parse_points(side['plane'])[:3] for side in solid['sides']], dtype=float)
+    normals = np.cross(points[:, 2] - points[:, 0], points[:, 1] - points[:, 0])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    distances = np.einsum('ij,ij->i', normals, points[:, 0])
+    center = points.reshape(-1, 3).mean(axis=0)
+    flip = normals @ center > distances
+    normals[flip] *= -1
+    distances[flip] *= -1
+    return normals, distances
+
+
+def solid_faces(solid):
+    """
+    Classify the sides of an axis-aligned box.
+
+    Returns (extents, faces) where faces maps each FACE_KEYS index to its
+    side dict, or None if the solid is not an axis-aligned box.
+    """
+    sides = solid.get('sides') if isinstance(solid, dict) else None
+    if not sides or len(sides) != 6:
+        return None
+
+    planes = []
+    for side in sides:
+        points = parse_points(side['plane'])
+        plane = side_axis(points) if len(points) >= 3 else None
+        if plane is None:
+            return None
+        planes.append(plane)
+
+    mins, maxs = solid_bounds(solid)
+    faces = {}
+    for side, (axis, value) in zip(sides, planes):
+        if value == mins[axis]:
+            face = 2 * axis
+        elif value == maxs[axis]:
+            face = 2 * axis + 1
+        else:
+            return None
+        if face in faces:
+            return None
+        faces[face] = side
+
+    if any(mins[axis] >= maxs[axis] for axis in range(3)):
+        return None
+
+    return tuple(mins) + tuple(maxs), faces
+
+
+def solid_box(solid):
+    """Return (extents, materials) of an axis-aligned box solid, or None."""
+    classified = solid_faces(solid)
+    if classified is None:
+        return None
+    extents, faces = classified
+    return extents, tuple(faces[face]['material'] for face in range(6))
+
+
+def extract_boxes(solids):
+    """
+    Split solids into the numeric brush list and everything else.
+
+    Returns (boxes, others): boxes is a list of (extents, materials, solid)
+    tuples for the axis-aligned boxes, others the remaining solids.
+    """
+    boxes = []
+    others = []
+    for solid in solids:
+        box = solid_box(solid)
+        if box is None:
+            others.append(solid)
+        else:
+            boxes.append((box[0], box[1], solid))
+    return boxes, others
+
+
+def _merge_along(boxes, axis):
+    """
+    One greedy pass fusing boxes that touch or overlap along axis and have
+    identical extents on the other two axes and identical materials.
+    """
+    lo, hi = axis, axis + 3
+    groups = {}
+    for box in boxes:
+        extents, materials, solid = box
+        key = (tuple(extents[k] for k in range(6) if k not in (lo, hi)), materials)
+        groups.setdefault(key, []).append(box)
+
+    merged = []
+    for group in groups.values():
+        group.sort(key=lambda box: box[0][lo])
+        current = group[0]
+        for box in group[1:]:
+            if box[0][lo] <= current[0][hi]:
+                # Touching or overlapping: extend the current box
+                extents = list(current[0])
+                extents[hi] = max(extents[hi], box[0][hi])
+                current = (tuple(extents), current[1], None)
+            else:
+                merged.append(current)
+                current = box
+        merged.append(current)
+    return merged
+
+
+def merge_extents(boxes, max_rounds=4):
+    """
+    Merge numeric boxes: (extents, materials, payload) tuples that touch
+    along one axis and match on everything else are fused, repeating the
+    X, Y and Z passes until nothing changes (at most max_rounds times).
+    Fused boxes get None as payload. materials can be any hashable value.
+    """
+    for _ in range(max_rounds):
+        count = len(boxes)
+        for axis in range(3):
+            boxes = _merge_along(boxes, axis)
+        if len(boxes) == count:
+            break
+    return boxes
+
+
+def merge_boxes(solids, make_box, max_rounds=4):
+    """
+    Greedily coalesce adjacent axis-aligned boxes with identical materials.
+
+    Boxes that share a face (or overlap) along one axis, have identical
+    extents on the other two axes and use the same material on every face
+    are fused into one larger brush. Passes along X, Y and Z are repeated
+    until nothing changes (at most max_rounds times).
+
+    Args:
+        solids: List of solid dicts from any generator or parsed VMF.
+        make_box: Callable (mins, maxs, textures) -> solid, e.g. a
+            generator's _create_box, used to build the merged brushes.
+
+    Returns the new solid list: untouched solids keep their dicts and ids,
+    merged ones are rebuilt with make_box. Non-box solids are kept as is.
+    """
+    boxes, others = extract_boxes(solids)
+    boxes = merge_extents(boxes, max_rounds)
+
+    result = []
+    for extents, materials, solid in boxes:
+        if solid is None:
+            textures = dict(zip(FACE_KEYS, materials))
+            solid = make_box(list(extents[:3]), list(extents[3:]), textures)
+        result.append(solid)
+    return result + others
+
+
+def subtract_many(boxes, holes, owners):
+    """
+    Cut rectangular holes out of many boxes at once.
+
+    Round r cuts the r-th hole of every box from the pieces left by the
+    previous rounds, with NumPy operations over all pieces together. A
+    piece overlapping its hole is split into the slabs before and after the
+    hole along the piece's longest axis, then along the next longest one
+    and so on; what is left inside the hole is dropped. A wall with a door
+    becomes the two full-height pieces beside the opening and the lintel
+    above it, a wall with a window four pieces, and every further opening
+    in a straight wall adds the same two or three pieces, which is the
+    least number of boxes that can cover such a wall.
+
+    Args:
+        boxes: Extents (x0, y0, z0, x1, y1, z1) of the boxes, shape (n, 6).
+        holes: Extents of the holes, shape (m, 6); they may reach outside
+            their box.
+        owners: Index into boxes of the box each hole is cut from, shape (m,).
+
+    Returns (pieces, sources): the piece extents, shape (k, 6), and the
+    index of the box each piece was cut from, grouped by box in box order.
+    Boxes without holes come through as a single piece.
+    """
+    pieces = np.asarray(boxes, dtype=float).reshape(-1, 6)
+    holes = np.asarray(holes, dtype=float).reshape(-1, 6)
+    owners = np.asarray(owners, dtype=np.int64).reshape(-1)
+    sources = np.arange(len(pieces))
+
+    # Rank of every hole among the holes of its box
+    order = np.argsort(owners, kind='stable')
+    sorted_owners = owners[order]
+    ranks = np.empty(len(owners), dtype=np.int64)
+    ranks[order] = np.arange(len(owners)) - np.searchsorted(sorted_owners, sorted_owners)
+
+    for rank in range(int(ranks.max()) + 1 if len(ranks) else 0):
+        current = ranks == rank
+        hole_of = np.full((len(boxes), 6), np.nan)
+        hole_of[owners[current]] = holes[current]
+        cut = hole_of[sources]
+
+        hit = np.all(cut[:, :3] < pieces[:, 3:], axis=1) & np.all(cut[:, 3:] > pieces[:, :3], axis=1)
+        parts = [pieces[~hit]]
+        part_sources = [sources[~hit]]
+
+        rest = pieces[hit]
+        cut = cut[hit]
+        rest_sources = sources[hit]
+        rows = np.arange(len(rest))
+        axes = np.argsort(rest[:, :3] - rest[:, 3:], axis=1, kind='stable')  # longest axis first
+        for step in range(3):
+            low = axes[:, step]
+            high = low + 3
+            hole_low, hole_high = cut[rows, low], cut[rows, high]
+
+            # Slab before the hole: ends where the hole starts
+            before = rest[rows, low] < hole_low
+            slab = rest[before]
+            slab[np.arange(len(slab)), high[before]] = hole_low[before]
+            parts.append(slab)
+            part_sources.append(rest_sources[before])
+            rest[rows[before], low[before]] = hole_low[before]
+
+            # Slab after the hole: starts where the hole ends
+            after = hole_high < rest[rows, high]
+            slab = rest[after]
+            slab[np.arange(len(slab)), low[after]] = hole_high[after]
+            parts.append(slab)
+            part_sources.append(rest_sources[after])
+            rest[rows[after], high[after]] = hole_high[after]
+
+        pieces = np.concatenate(parts)
+        sources = np.concatenate(part_sources)
+
+    grouped = np.argsort(sources, kind='stable')
+    return pieces[grouped], sources[grouped]
+
+
+def extents_tuples(extents):
+    """Convert a (k, 6) array of extents to tuples, with integral coordinates as ints."""
+    return [tuple(int(v) if v.is_integer() else v for v in row) for row in np.asarray(extents).tolist()]
+
+
+def subtract(box, holes):
+    """Cut holes out of one box (see subtract_many); returns the list of piece extents."""
+    pieces, _ = subtract_many([box], holes, np.zeros(len(holes), dtype=np.int64))
+    return extents_tuples(pieces)
+
+
+# Materials of brushes that don't hide what is behind them
+NON_OCCLUDING_MATERIALS = (
+    'TOOLS/TOOLSHINT', 'TOOLS/TOOLSSKIP', 'TOOLS/TOOLSTRIGGER', 'TOOLS/TOOLSCLIP',
+    'TOOLS/TOOLSPLAYERCLIP', 'TOOLS/TOOLSNPCCLIP', 'TOOLS/TOOLSAREAPORTAL',
+    'TOOLS/TOOLSINVISIBLE', 'GLASS/', 'NATURE/WATER'
+)
+
+
+def is_occluder(materials):
+    """Return True if a box with these face materials hides the faces it covers."""
+    return not any(material.upper().startswith(NON_OCCLUDING_MATERIALS) for material in materials)
+
+
+def _rects_cover(rect, rects):
+    """Return True if the union of rects covers rect; all are (u0, u1, v0, v1)."""
+    u0, u1, v0, v1 = rect
+    clipped = [(max(r[0], u0), min(r[1], u1), max(r[2], v0), min(r[3], v1)) for r in rects]
+    clipped = [r for r in clipped if r[0] < r[1] and r[2] < r[3]]
+    if not clipped:
+        return False
+
+    us = sorted({u0, u1, *(r[0] for r in clipped), *(r[1] for r in clipped)})
+    vs = sorted({v0, v1, *(r[2] for r in clipped), *(r[3] for r in clipped)})
+    us = [u for u in us if u0 <= u <= u1]
+    vs = [v for v in vs if v0 <= v <= v1]
+    for i in range(len(us) - 1):
+        mid_u = (us[i] + us[i + 1]) / 2
+        for j in range(len(vs) - 1):
+            mid_v = (vs[j] + vs[j + 1]) / 2
+            if not any(r[0] <= mid_u <= r[1] and r[2] <= mid_v <= r[3] for r in clipped):
+                return False
+    return True
+
+
+def _grid_cells(rect, cell_size):
+    """Yield the 2D grid cells overlapped by rect (u0, u1, v0, v1)."""
+    for gu in range(int(rect[0] // cell_size), int(rect[1] // cell_size) + 1):
+        for gv in range(int(rect[2] // cell_size), int(rect[3] // cell_size) + 1):
+            yield gu, gv
+
+
+def find_hidden_faces(boxes):
+    """
+    Find box faces that are completely covered by other opaque boxes.
+
+    For each axis the faces perpendicular to it are swept in plane order
+    against the boxes spanning that plane (sort-and-sweep); the boxes
+    active at the current plane are bucketed on a 2D grid over the other
+    two axes, so each face only looks at its neighbours. A face is hidden
+    when the union of the boxes directly behind it covers its whole area,
+    which catches faces touching another brush as well as faces buried
+    inside one.
+
+    Args:
+        boxes: List of (extents, materials, ...) tuples as from extract_boxes.
+
+    Returns a set of (box index, face index) pairs.
+    """
+    hidden = set()
+    occluders = [index for index, box in enumerate(boxes) if is_occluder(box[1])]
+    if not occluders:
+        return hidden
+
+    for axis in range(3):
+        u_axis, v_axis = [k for k in range(3) if k != axis]
+
+        def rect(extents):
+            return (extents[u_axis], extents[u_axis + 3], extents[v_axis], extents[v_axis + 3])
+
+        # Bucket size: typical footprint of a box on this plane
+        spans = sorted(max(e[u_axis + 3] - e[u_axis], e[v_axis + 3] - e[v_axis])
+                       for e in (boxes[i][0] for i in occluders))
+        cell_size = max(spans[len(spans) // 2], 1.0)
+
+        # Events: insert occluders at their min, query faces, remove at max
+        events = []
+        for index in occluders:
+            extents = boxes[index][0]
+            events.append((extents[axis], 0, index, 0))
+            events.append((extents[axis + 3], 2, index, 0))
+        for index, box in enumerate(boxes):
+            extents = box[0]
+            events.append((extents[axis], 1, index, 2 * axis))
+            events.append((extents[axis + 3], 1, index, 2 * axis + 1))
+        events.sort(key=lambda event: (event[0], event[1]))
+
+        grid = {}
+        for value, kind, index, face in events:
+            extents = boxes[index][0]
+            if kind == 0:
+                for cell in _grid_cells(rect(extents), cell_size):
+                    grid.setdefault(cell, set()).add(index)
+            elif kind == 2:
+                for cell in _grid_cells(rect(extents), cell_size):
+                    grid[cell].discard(index)
+            else:
+                face_rect = rect(extents)
+                candidates = set()
+                for cell in _grid_cells(face_rect, cell_size):
+                    candidates.update(grid.get(cell, ()))
+                candidates.discard(index)
+
+                covering = []
+                for other in candidates:
+                    other_extents = boxes[other][0]
+                    # The other box must extend beyond the face, not end on it
+                    if face % 2 == 1 and other_extents[axis + 3] <= value:
+                        continue
+                    if face % 2 == 0 and other_extents[axis] >= value:
+                        continue
+                    covering.append(rect(other_extents))
+
+                if covering and _rects_cover(face_rect, covering):
+                    hidden.add((index, face))
+
+    return hidden
+
+
+def cull_hidden_faces(solids, nodraw='TOOLS/TOOLSNODRAW'):
+    """
+    Retexture every box face that is fully covered by other solids with
+    nodraw. Faces using tool materials and faces of non-occluding brushes
+    (hint, clip, glass, water...) are left alone. Solids are modified in
+    place; returns the number of faces retextured.
+    """
+    classified = []
+    for solid in solids:
+        faces = solid_faces(solid)
+        if faces is not None:
+            extents, sides = faces
+            materials = tuple(sides[face]['material'] for face in range(6))
+            classified.append((extents, materials, sides))
+
+    culled = 0
+    for index, face in find_hidden_faces(classified):
+        extents, materials, sides = classified[index]
+        if not is_occluder(materials) or materials[face].upper().startswith('TOOLS/'):
+            continue
+        sides[face]['material'] = nodraw
+        culled += 1
+    return culled
+
+
+def _bridges_gap(key, mins, maxs, index):
+    """
+    Return True if a box is held between two other boxes: along some axis
+    both of its opposite faces rest against a neighbour (face contact, not
+    just an edge). Such a box may close a gap in a wall, so it could seal.
+    """
+    contacts = set()
+    for other in index.query_box(mins, maxs, touching=True):
+        if other == key:
+            continue
+        other_mins, other_maxs = index.bounds(other)
+        for axis in range(3):
+            if any(min(maxs[k], other_maxs[k]) <= max(mins[k], other_mins[k]) for k in range(3) if k != axis):
+                continue
+            if other_maxs[axis] == mins[axis]:
+                contacts.add((axis, 0))
+            if other_mins[axis] == maxs[axis]:
+                contacts.add((axis, 1))
+    return any((axis, 0) in contacts and (axis, 1) in contacts for axis in range(3))
+
+
+def split_detail(solids, rooms=(), max_size=256, keep=()):
+    """
+    Sort solids into structural and detail brushes for func_detail.
+
+    A brush becomes detail if it lies entirely inside one of the rooms
+    ((mins, maxs) of walkable space: pillars, cover, trusses) or if it is no
+    larger than max_size on every axis, does not bridge a gap between other
+    brushes (see _bridges_gap) and does not reach the outer bounds of the
+    map, where it could face the void; taking it out of the world then
+    cannot open a leak. Tool and other non-occluding brushes always stay
+    in the world, and so do brushes touching one of the (mins, maxs) boxes
+    in keep (the frames areaportals have to be sealed by). Returns
+    (world, detail), both in the original order.
+    """
+    bounds = [solid_bounds(solid) for solid in solids]
+    if not bounds:
+        return [], []
+    map_mins = [min(mins[k] for mins, _ in bounds) for k in range(3)]
+    map_maxs = [max(maxs[k] for _, maxs in bounds) for k in range(3)]
+    index = SpatialIndex()
+    for key, (mins, maxs) in enumerate(bounds):
+        index.insert(key, mins, maxs)
+    room_index = SpatialIndex(cell_size=2048)
+    for key, (mins, maxs) in enumerate(rooms):
+        room_index.insert(key, mins, maxs)
+    keep_index = SpatialIndex()
+    for key, (mins, maxs) in enumerate(keep):
+        keep_index.insert(key, mins, maxs)
+
+    world = []
+    detail = []
+    for key, (solid, (mins, maxs)) in enumerate(zip(solids, bounds)):
+        inside = any(
+            all(room_mins[k] <= mins[k] and maxs[k] <= room_maxs[k] for k in range(3))
+            for room_mins, room_maxs in map(room_index.bounds, room_index.query_box(mins, maxs))
+        )
+        small = all(maxs[k] - mins[k] <= max_size and map_mins[k] < mins[k] and maxs[k] < map_maxs[k]
+                    for k in range(3))
+        if (is_occluder([side['material'] for side in solid['sides']])
+                and not keep_index.overlaps(mins, maxs, touching=True)
+                and (inside or (small and not _bridges_gap(key, mins, maxs, index)))):
+            detail.append(solid)
+        else:
+            world.append(solid)
+    return world, detail
@@ -0,0 +1,263 @@
+"""
+Convex brushes
+
+Brushes that are not axis-aligned boxes: ramps, roof slopes, wedges. A
+brush is a list of faces, each a dict with the 'points' of a convex polygon
+(counter-clockwise seen from outside the brush) and its 'material'.
+
+Brushes are made by cutting boxes with planes: clip() keeps the part of a
+brush behind a plane and closes the cut with a new face, so a ramp or a
+roof pitch is one brush instead of a staircase of boxes. brush_sides()
+turns a brush into the plane points, materials and texture axes of VMF
+sides; textures are projected onto each face (Hammer's face alignment), so
+they are not stretched on slopes.
+
+Planes are (normal, distance, material) triples: points p with
+normal . p <= distance are kept, material textures the cut face.
+"""
+
+import numpy as np
+
+from brush_ops import FACE_KEYS
+
+# Tolerance for points lying on a cutting plane
+EPSILON = 1e-6
+
+# Smallest Z component of a surface normal the player can walk up in Source (a slope of about 45.57 degrees)
+MIN_WALKABLE_NORMAL_Z = 0.7
+
+# Box corners of every face in FACE_KEYS order, counter-clockwise seen from outside;
+# a corner index has bit 0 set for max X, bit 1 for max Y, bit 2 for max Z
+BOX_FACES = (
+    (0, 4, 6, 2),  # left (-X)
+    (1, 3, 7, 5),  # right (+X)
+    (0, 1, 5, 4),  # front (-Y)
+    (2, 6, 7, 3),  # back (+Y)
+    (0, 2, 3, 1),  # bottom (-Z)
+    (4, 5, 7, 6)   # top (+Z)
+)
+
+
+def box_brush(mins, maxs, materials, default='TOOLS/TOOLSNODRAW'):
+    """
+    Return the brush of an axis-aligned box.
+
+    materials maps FACE_KEYS names to materials; missing faces get default.
+    """
+    corners = [(maxs[0] if i & 1 else mins[0], maxs[1] if i & 2 else mins[1], maxs[2] if i & 4 else mins[2])
+               for i in range(8)]
+    return [{'points': [corners[i] for i in face], 'material': materials.get(key, default)}
+            for key, face in zip(FACE_KEYS, BOX_FACES)]
+
+
+def face_normal(points):
+    """Return the unit outward normal of a face polygon."""
+    points = np.asarray(points, dtype=float)
+    # Newell's method: robust for any convex polygon
+    following = np.roll(points, -1, axis=0)
+    normal = np.array([
+        np.sum((points[:, 1] - following[:, 1]) * (points[:, 2] + following[:, 2])),
+        np.sum((points[:, 2] - following[:, 2]) * (points[:, 0] + following[:, 0])),
+        np.sum((points[:, 0] - following[:, 0]) * (points[:, 1] + following[:, 1]))
+    ])
+    return normal / np.linalg.norm(normal)
+
+
+def clip(brush, normal, distance, material):
+    """
+    Cut a brush with a plane and keep the part with normal . p <= distance.
+
+    Returns the new brush, the brush itself if the plane misses it, or None
+    if nothing is left.
+    """
+    normal = np.asarray(normal, dtype=float)
+    length = np.linalg.norm(normal)
+    normal, distance = normal / length, distance / length
+
+    # Signed distances of every vertex at once
+    counts = [len(face['points']) for face in brush]
+    sides = np.concatenate([np.asarray(face['points'], dtype=float) for face in brush]) @ normal - distance
+    if np.all(sides <= EPSILON):
+        return brush
+    if np.all(sides >= -EPSILON):
+        return None
+
+    faces = []
+    cut_points = []
+    start = 0
+    for face, count in zip(brush, counts):
+        points = face['points']
+        face_sides = sides[start:start + count]
+        start += count
+
+        kept = []
+        for k in range(count):
+            point, side = points[k], face_sides[k]
+            following, following_side = points[(k + 1) % count], face_sides[(k + 1) % count]
+            if side <= EPSILON:
+                kept.append(point)
+                if abs(side) <= EPSILON:
+                    cut_points.append(point)
+            if (side < -EPSILON and following_side > EPSILON) or (side > EPSILON and following_side < -EPSILON):
+                t = side / (side - following_side)
+                crossing = tuple(point[axis] + t * (following[axis] - point[axis]) for axis in range(3))
+                kept.append(crossing)
+                cut_points.append(crossing)
+        if len(kept) >= 3:
+            faces.append({'points': kept, 'material': face['material']})
+
+    cap = _order_around(cut_points, normal)
+    if len(cap) >= 3:
+        faces.append({'points': cap, 'material': material})
+    return faces if len(faces) >= 4 else None
+
+
+def _order_around(points, normal):
+    """Return the distinct points counter-clockwise around normal."""
+    unique = []
+    for point in points:
+        if all(sum((point[axis] - other[axis]) ** 2 for axis in range(3)) > EPSILON for other in unique):
+            unique.append(point)
+    if len(unique) < 3:
+        return unique
+
+    array = np.asarray(unique, dtype=float)
+    center = array.mean(axis=0)
+    u = array[0] - center
+    u /= np.linalg.norm(u)
+    v = np.cross(normal, u)
+    offsets = array - center
+    angles = np.arctan2(offsets @ v, offsets @ u)
+    return [unique[index] for index in np.argsort(angles)]
+
+
+def clip_many(brushes, planes):
+    """
+    Cut many brushes at once: planes[i] is the list of planes brush i is
+    cut with. Returns the list of resulting brushes, leaving out those that
+    were cut away entirely.
+    """
+    result = []
+    for brush, brush_planes in zip(brushes, planes):
+        for normal, distance, material in brush_planes:
+            brush = clip(brush, normal, distance, material)
+            if brush is None:
+                break
+        if brush is not None:
+            result.append(brush)
+    return result
+
+
+def ramp_plane(mins, maxs, direction, material):
+    """
+    Return the plane cutting a box into a ramp rising towards direction
+    ('east', 'west', 'north' or 'south'): from the bottom of the low edge to
+    the top of the high edge.
+    """
+    axis = 0 if direction in ('east', 'west') else 1
+    rise = maxs[2] - mins[2]
+    run = maxs[axis] - mins[axis]
+    normal = [0.0, 0.0, run]
+    if direction in ('east', 'north'):
+        normal[axis] = -rise
+        anchor = mins[axis]
+    else:
+        normal[axis] = rise
+        anchor = maxs[axis]
+    return normal, normal[axis] * anchor + run * mins[2], material
+
+
+def ramps(boxes, directions, materials, slope_material):
+    """
+    Build a ramp in every (mins, maxs) box, rising towards the matching
+    direction. materials textures the box faces (see box_brush),
+    slope_material the walking surface.
+
+    Raises ValueError for a ramp too steep to walk up, whose slope normal
+    has a Z component below MIN_WALKABLE_NORMAL_Z.
+    """
+    for (mins, maxs), direction in zip(boxes, directions):
+        normal = ramp_plane(mins, maxs, direction, slope_material)[0]
+        if normal[2] < MIN_WALKABLE_NORMAL_Z * np.linalg.norm(normal):
+            raise ValueError(f"Ramp {mins}..{maxs} rising {direction} is too steep to walk up: "
+                             f"slope normal Z {normal[2] / np.linalg.norm(normal):.3f} < {MIN_WALKABLE_NORMAL_Z}")
+    brushes = [box_brush(mins, maxs, materials) for mins, maxs in boxes]
+    planes = [[ramp_plane(mins, maxs, direction, slope_material)] for (mins, maxs), direction in zip(boxes, directions)]
+    return clip_many(brushes, planes)
+
+
+def gable(mins, maxs, axis, materials, slope_material):
+    """
+    Build a gable roof prism in a box: the ridge runs along axis (0 for X,
+    1 for Y) at the top of the box, over the middle of the other axis.
+    """
+    other = 1 - axis
+    rise = maxs[2] - mins[2]
+    half = (maxs[other] - mins[other]) / 2
+    planes = []
+    for sign in (-1, 1):
+        # Through the eave at the bottom of one side and the ridge at the top
+        normal = [0.0, 0.0, half]
+        normal[other] = sign * rise
+        eave = maxs[other] if sign > 0 else mins[other]
+        planes.append((normal, normal[other] * eave + half * mins[2], slope_material))
+    return clip_many([box_brush(mins, maxs, materials)], [planes])[0]
+
+
+def texture_axes(normal):
+    """
+    Return face-aligned (uaxis, vaxis) for a face: the world axes Hammer
+    uses for the face's dominant direction, projected into the face plane.
+    """
+    normal = np.asarray(normal, dtype=float)
+    dominant = int(np.argmax(np.abs(normal)))
+    if dominant == 2:
+        u, v = np.array([1.0, 0.0, 0.0]), np.array([0.0, -1.0, 0.0])
+    elif dominant == 0:
+        u, v = np.array([0.0, 1.0, 0.0]), np.array([0.0, 0.0, -1.0])
+    else:
+        u, v = np.array([1.0, 0.0, 0.0]), np.array([0.0, 0.0, -1.0])
+
+    u = u - (u @ normal) * normal
+    u /= np.linalg.norm(u)
+    v = v - (v @ normal) * normal - (v @ u) * u
+    v /= np.linalg.norm(v)
+    return u, v
+
+
+def _number(value):
+    """Format a coordinate: ints stay ints, everything else is rounded to 1/1000 unit."""
+    value = float(value)
+    rounded = round(value, 3)
+    return int(rounded) if rounded.is_integer() else rounded
+
+
+def brush_sides(brush):
+    """
+    Return the VMF data of a brush's faces as (points, material, uaxis,
+    vaxis) tuples: points are the three plane points in the order VMF
+    expects (clockwise seen from outside), uaxis and vaxis unit vectors.
+    """
+    sides = []
+    for face in brush:
+        points = face['points']
+        count = len(points)
+        # Well spread points keep the plane accurate after rounding
+        a, b, c = points[0], points[count // 3], points[(2 * count) // 3]
+        if count == 3:
+            b, c = points[1], points[2]
+        normal = face_normal(points)
+        u, v = texture_axes(normal)
+        sides.append((
+            [tuple(_number(value) for value in point) for point in (a, c, b)],
+            face['material'],
+            tuple(_number(value) for value in u),
+            tuple(_number(value) for value in v)
+        ))
+    return sides
+
+
+def brush_bounds(brush):
+    """Return the (mins, maxs) of a brush's vertices."""
+    points = np.concatenate([np.asarray(face['points'], dtype=float) for face in brush])
+    return points.min(axis=0).tolist(), points.max(axis=0).tolist()
@@ -0,0 +1,83 @@
+"""
+Corridor planning
+
+Decides which rooms get connected by corridors. Candidate edges come from
+a k-nearest-neighbour graph over the room centers, built with the spatial
+index; a minimum spanning tree of that graph connects every room with the
+shortest total corridor length, and a configurable number of the shortest
+remaining candidates is added back to create loops. Both the number of
+corridors and their total length stay near-linear in the number of rooms.
+"""
+
+import math
+
+from spatial_index import SpatialIndex
+
+
+def candidate_edges(points, k=6):
+    """
+    Return the k-nearest-neighbour edges (length, a, b) between points, with
+    a < b and every edge listed once.
+    """
+    if len(points) < 2:
+        return []
+
+    # Cells of about one point each keep the ring search short
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    area = max(max(xs) - min(xs), 1) * max(max(ys) - min(ys), 1)
+    index = SpatialIndex(cell_size=max(math.sqrt(area / len(points)), 1))
+    for key, point in enumerate(points):
+        index.insert(key, point, point)
+
+    edges = set()
+    for a, point in enumerate(points):
+        for b, distance in index.nearest_k(point, k, ignore=(a,)):
+            edges.add((distance, min(a, b), max(a, b)))
+    return sorted(edges)
+
+
+def minimum_spanning_tree(count, edges):
+    """
+    Kruskal's algorithm over (length, a, b) edges sorted by length.
+
+    Returns (tree, rest): the edges of the minimum spanning forest and the
+    edges left out, both in length order.
+    """
+    parent = list(range(count))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]  # path halving
+            node = parent[node]
+        return node
+
+    tree = []
+    rest = []
+    for edge in edges:
+        root_a, root_b = find(edge[1]), find(edge[2])
+        if root_a == root_b:
+            rest.append(edge)
+        else:
+            parent[root_a] = root_b
+            tree.append(edge)
+    return tree, rest
+
+
+def plan_corridors(points, extra_edges=0, k=6):
+    """
+    Plan the corridors between rooms centered at points.
+
+    Returns a list of (a, b) index pairs: a spanning tree over the
+    k-nearest-neighbour graph plus the extra_edges shortest candidates that
+    close loops. If the neighbour graph falls apart into clusters, k is
+    doubled until the tree connects every room.
+    """
+    count = len(points)
+    while True:
+        tree, rest = minimum_spanning_tree(count, candidate_edges(points, k))
+        if len(tree) >= count - 1 or k >= count - 1:
+            break
+        k *= 2
+
+    return [(a, b) for _, a, b in tree + rest[:max(extra_edges, 0)]]
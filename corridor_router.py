@@ -0,0 +1,339 @@
+"""
+Corridor routing
+
+Routes corridors between rooms around other rooms instead of through them.
+The map is rasterized into a coarse occupancy grid (one cell is wide enough
+for one corridor plus its walls); A* searches that grid with a penalty for
+every turn, so paths come out as a few long straight runs. Cells taken by a
+corridor are blocked for the next ones, so corridors never cross.
+
+The grid is built from the spatial index of the registered rooms and kept
+between calls: adding a room only marks its own cells, and the grid is
+only rebuilt when a room lands outside the area it covers. Routing hundreds
+of corridors therefore costs hundreds of small A* searches, not hundreds of
+rasterizations.
+
+Rooms are treated as 2D footprints; every corridor runs on a single floor.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+import brush_ops
+from spatial_index import SpatialIndex
+
+# Grid steps for the directions east, north, west, south
+STEPS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+class CorridorRouter:
+    """A* corridor router over a reusable occupancy grid of room footprints."""
+
+    def __init__(self, cell_size=160, turn_penalty=4, padding=4):
+        """
+        Args:
+            cell_size: Edge length of a grid cell in map units; corridors are
+                at most cell_size minus two wall thicknesses wide.
+            turn_penalty: Extra cost of a turn, in cells.
+            padding: Free cells kept around the rooms so corridors can go
+                around the outermost ones.
+        """
+        self.cell_size = cell_size
+        self.turn_penalty = turn_penalty
+        self.padding = padding
+        self.rooms = SpatialIndex(cell_size=cell_size * 8)
+        self.inner = {}  # room key -> (mins, maxs) of the walkable space
+        self.used = set()  # grid cells taken by corridors
+        self.origin = None  # grid coordinates of blocked[0, 0]
+        self.blocked = None
+
+    def add_room(self, key, inner_mins, inner_maxs, outer_mins, outer_maxs):
+        """Register a room by its inner (walkable) and outer (walls included) bounds."""
+        self.rooms.insert(key, outer_mins, outer_maxs)
+        self.inner[key] = (tuple(inner_mins), tuple(inner_maxs))
+        if self.blocked is None:
+            return
+
+        low, high = self._cell_span(outer_mins, outer_maxs)
+        shape = self.blocked.shape
+        if (low[0] - self.padding < self.origin[0] or low[1] - self.padding < self.origin[1]
+                or high[0] + self.padding >= self.origin[0] + shape[0]
+                or high[1] + self.padding >= self.origin[1] + shape[1]):
+            self.blocked = None  # outside the grid, rebuild on the next route
+        else:
+            self._mark(low, high)
+
+    def block(self, mins, maxs):
+        """Keep corridors out of the footprint mins..maxs, e.g. a corridor built without the router."""
+        low, high = self._cell_span(mins, maxs)
+        self.used.update((i, j) for i in range(low[0], high[0] + 1) for j in range(low[1], high[1] + 1))
+        self.blocked = None  # rebuild on the next route
+
+    def _cell_span(self, mins, maxs):
+        """Return the inclusive grid cells (low, high) a footprint overlaps."""
+        size = self.cell_size
+        return ((math.floor(mins[0] / size), math.floor(mins[1] / size)),
+                (math.ceil(maxs[0] / size) - 1, math.ceil(maxs[1] / size) - 1))
+
+    def _mark(self, low, high):
+        i, j = low[0] - self.origin[0], low[1] - self.origin[1]
+        self.blocked[i:high[0] - self.origin[0] + 1, j:high[1] - self.origin[1] + 1] = True
+
+    def _build_grid(self):
+        """Rasterize every room and corridor cell into a fresh occupancy grid."""
+        spans = [self._cell_span(mins, maxs) for mins, maxs in self.rooms.boxes.values()]
+        low = [min(span[0][k] for span in spans) for k in range(2)]
+        high = [max(span[1][k] for span in spans) for k in range(2)]
+        for cell in self.used:
+            for k in range(2):
+                low[k] = min(low[k], cell[k])
+                high[k] = max(high[k], cell[k])
+
+        self.origin = (low[0] - self.padding, low[1] - self.padding)
+        self.blocked = np.zeros((high[0] - low[0] + 2 * self.padding + 1,
+                                 high[1] - low[1] + 2 * self.padding + 1), dtype=bool)
+        for span in spans:
+            self._mark(*span)
+        for cell in self.used:
+            self.blocked[cell[0] - self.origin[0], cell[1] - self.origin[1]] = True
+
+    def _door_cells(self, key, half_width, free, wall=None):
+        """
+        Return {cell: direction} for the free cells next to a room from which
+        a straight corridor of half_width can run into it: direction is the
+        step towards the room, and the corridor stays between its side walls.
+        wall (an index into STEPS, pointing out of the room) keeps only the
+        cells next to that wall.
+        """
+        inner_mins, inner_maxs = self.inner[key]
+        outer_mins, outer_maxs = self.rooms.bounds(key)
+        low, high = self._cell_span(outer_mins, outer_maxs)
+        size = self.cell_size
+        doors = {}
+        for axis in range(2):
+            other = 1 - axis
+            first = math.ceil((inner_mins[other] + half_width) / size - 0.5)
+            last = math.floor((inner_maxs[other] - half_width) / size - 0.5)
+            for lateral in range(first, last + 1):
+                for cell_along, face, direction in ((low[axis] - 1, outer_mins[axis], axis),
+                                                    (high[axis] + 1, outer_maxs[axis], axis + 2)):
+                    cell = [0, 0]
+                    cell[axis], cell[other] = cell_along, lateral
+                    if (wall is not None and wall != (direction + 2) % 4) or not free(*cell):
+                        continue
+
+                    # The stretch between the cell and the wall must be clear of other rooms
+                    edge = (cell_along + (1 if direction < 2 else 0)) * size
+                    mins, maxs = [0, 0, outer_mins[2]], [0, 0, outer_maxs[2]]
+                    mins[axis], maxs[axis] = min(edge, face), max(edge, face)
+                    mins[other], maxs[other] = (lateral + 0.5) * size - half_width, (lateral + 0.5) * size + half_width
+                    if not self.rooms.overlaps(mins, maxs, ignore=(key,)):
+                        doors[tuple(cell)] = direction
+        return doors
+
+    def route(self, key_a, key_b, width, walls=(None, None)):
+        """
+        Find a corridor path from room key_a to room key_b, leaving and
+        entering them through any wall, or through walls[0] and walls[1]
+        (indices into STEPS, pointing out of the room) where given.
+
+        Returns the list of grid cells the corridor runs through, in order
+        from room a to room b, with the cell of the room wall it starts from
+        at the front and the one it ends at at the back, or None if there is
+        no way through. The cells in between lie outside every room; they
+        are reserved, so later routes go around them.
+        """
+        if self.blocked is None:
+            self._build_grid()
+
+        blocked = self.blocked
+        oi, oj = self.origin
+        width_cells, height_cells = blocked.shape
+
+        def free(i, j):
+            gi, gj = i - oi, j - oj
+            return 0 <= gi < width_cells and 0 <= gj < height_cells and not blocked[gi, gj]
+
+        half_width = width / 2
+        starts = self._door_cells(key_a, half_width, free, walls[0])
+        goals = self._door_cells(key_b, half_width, free, walls[1])
+        if not starts or not goals:
+            return None
+
+        goal_low = (min(cell[0] for cell in goals), min(cell[1] for cell in goals))
+        goal_high = (max(cell[0] for cell in goals), max(cell[1] for cell in goals))
+
+        def heuristic(i, j):
+            return max(goal_low[0] - i, 0, i - goal_high[0]) + max(goal_low[1] - j, 0, j - goal_high[1])
+
+        # States are (i, j, direction of travel); a start leaves its room, so it heads away from it
+        heap = []
+        cost = {}
+        parent = {}
+        for order, (cell, direction) in enumerate(sorted(starts.items())):
+            state = (cell[0], cell[1], (direction + 2) % 4)
+            cost[state] = 1
+            parent[state] = None
+            heapq.heappush(heap, (1 + heuristic(*cell), order, state))
+        order = len(heap)
+
+        end = None
+        while heap:
+            _, _, state = heapq.heappop(heap)
+            i, j, direction = state
+            g = cost[state]
+            door = goals.get((i, j))
+            if door == direction:
+                end = state
+                break
+
+            moves = []
+            if door is not None:
+                # Turn towards the goal room without moving
+                moves.append((i, j, door, g + self.turn_penalty))
+            for turn, (di, dj) in enumerate(STEPS):
+                if turn != (direction + 2) % 4 and free(i + di, j + dj):
+                    moves.append((i + di, j + dj, turn, g + 1 + (0 if turn == direction else self.turn_penalty)))
+
+            for ni, nj, turn, next_cost in moves:
+                next_state = (ni, nj, turn)
+                if next_cost < cost.get(next_state, math.inf):
+                    cost[next_state] = next_cost
+                    parent[next_state] = state
+                    heapq.heappush(heap, (next_cost + heuristic(ni, nj), order, next_state))
+                    order += 1
+
+        if end is None:
+            return None
+
+        cells = [(end[0] + STEPS[end[2]][0], end[1] + STEPS[end[2]][1])]
+        state = end
+        while state is not None:
+            if cells[-1] != state[:2]:
+                cells.append(state[:2])
+            first = state
+            state = parent[state]
+        cells.append((first[0] - STEPS[first[2]][0], first[1] - STEPS[first[2]][1]))
+        cells.reverse()
+
+        for cell in cells[1:-1]:
+            self.used.add(cell)
+            blocked[cell[0] - oi, cell[1] - oj] = True
+        return cells
+
+    def wall_face(self, key, cell, room_cell):
+        """Return the coordinate of the outer wall face of room key between cell and its neighbour room_cell."""
+        mins, maxs = self.rooms.bounds(key)
+        direction = STEPS.index((room_cell[0] - cell[0], room_cell[1] - cell[1]))
+        axis = direction % 2
+        return mins[axis] if direction < 2 else maxs[axis]
+
+
+def _path_cells(path, faces, cell_size):
+    """
+    Yield (cx, cy, reach) for the corridor cells of a path: the cell center
+    and, for each direction the corridor leaves the cell in, the coordinate
+    where it ends (the cell edge, or the room face at both ends).
+    """
+    last = len(path) - 2
+    for index in range(1, last + 1):
+        i, j = path[index]
+        cx, cy = (i + 0.5) * cell_size, (j + 0.5) * cell_size
+        reach = {}
+        for (ni, nj), face in ((path[index - 1], faces[0] if index == 1 else None),
+                               (path[index + 1], faces[1] if index == last else None)):
+            direction = STEPS.index((ni - i, nj - j))
+            if face is None:
+                face = (cx, cy)[direction % 2] + (cell_size / 2 if direction < 2 else -cell_size / 2)
+            reach[direction] = face
+        yield cx, cy, reach
+
+
+def corridor_spaces(path, faces, width, height, floor_z, cell_size):
+    """
+    Return the walkable space of a routed corridor as merged (mins, maxs)
+    boxes, from the outer wall face of the first room to that of the last.
+    """
+    half = width / 2
+    pieces = []
+    for cx, cy, reach in _path_cells(path, faces, cell_size):
+        pieces.append(((cx - half, cy - half, floor_z, cx + half, cy + half, floor_z + height), None, None))
+        for direction, end in reach.items():
+            if direction % 2 == 0:
+                x0, x1 = sorted((cx + STEPS[direction][0] * half, end))
+                pieces.append(((x0, cy - half, floor_z, x1, cy + half, floor_z + height), None, None))
+            else:
+                y0, y1 = sorted((cy + STEPS[direction][1] * half, end))
+                pieces.append(((cx - half, y0, floor_z, cx + half, y1, floor_z + height), None, None))
+
+    merged = brush_ops.merge_extents(pieces)
+    return [(list(extents[:3]), list(extents[3:])) for extents, _, _ in merged]
+
+
+def corridor_boxes(path, faces, width, height, floor_z, cell_size, thickness=16):
+    """
+    Turn a routed path into corridor brushes.
+
+    Every cell gets a floor, a ceiling and walls around a square core at
+    its center, with arms reaching out to the neighbouring path cells; the
+    arms at both ends reach the outer wall face of the room they lead to.
+    Collinear pieces are then merged, so every straight run ends up as one
+    floor, one ceiling and two wall brushes.
+
+    Args:
+        path: Cells from CorridorRouter.route(), room cells included.
+        faces: Coordinates of the outer wall faces of the first and the
+            last room (see CorridorRouter.wall_face()).
+
+    Returns a list of (mins, maxs, part) with part 'floor', 'ceiling' or 'wall'.
+    """
+    half = width / 2
+    outer = half + thickness
+    top = floor_z + height
+    pieces = []
+
+    def add(x0, y0, x1, y1, part):
+        if x0 == x1 or y0 == y1:
+            return  # an arm ending on the cell edge, where the walls fill the whole cell
+        if part == 'floor':
+            z0, z1 = floor_z - thickness, floor_z
+        elif part == 'ceiling':
+            z0, z1 = top, top + thickness
+        else:
+            z0, z1 = floor_z, top
+        pieces.append(((x0, y0, z0, x1, y1, z1), part, None))
+
+    for cx, cy, reach in _path_cells(path, faces, cell_size):
+        for part in ('floor', 'ceiling'):
+            add(cx - outer, cy - outer, cx + outer, cy + outer, part)
+        for sx in (-1, 1):
+            for sy in (-1, 1):
+                x0, x1 = sorted((cx + sx * half, cx + sx * outer))
+                y0, y1 = sorted((cy + sy * half, cy + sy * outer))
+                add(x0, y0, x1, y1, 'wall')
+
+        for direction, (dx, dy) in enumerate(STEPS):
+            if direction in reach:
+                if dx:
+                    x0, x1 = sorted((cx + dx * outer, reach[direction]))
+                    for part in ('floor', 'ceiling'):
+                        add(x0, cy - outer, x1, cy + outer, part)
+                    add(x0, cy + half, x1, cy + outer, 'wall')
+                    add(x0, cy - outer, x1, cy - half, 'wall')
+                else:
+                    y0, y1 = sorted((cy + dy * outer, reach[direction]))
+                    for part in ('floor', 'ceiling'):
+                        add(cx - outer, y0, cx + outer, y1, part)
+                    add(cx + half, y0, cx + outer, y1, 'wall')
+                    add(cx - outer, y0, cx - half, y1, 'wall')
+            elif dx:
+                x0, x1 = sorted((cx + dx * half, cx + dx * outer))
+                add(x0, cy - half, x1, cy + half, 'wall')
+            else:
+                y0, y1 = sorted((cy + dy * half, cy + dy * outer))
+                add(cx - half, y0, cx + half, y1, 'wall')
+
+    merged = brush_ops.merge_extents(pieces)
+    return [(list(extents[:3]), list(extents[3:]), part) for extents, part, _ in merged]
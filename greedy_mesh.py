@@ -0,0 +1,109 @@
+"""
+Greedy meshing
+
+Compiles a voxel grid (a boolean occupancy grid or a uint8 grid of material
+ids, see voxelize) into axis-aligned boxes, so layouts authored as grids
+(maze cells, dungeon tiles, voxelized maps) become a few large brushes
+instead of one box per cell.
+
+Every box starts at the first voxel not yet covered, in index order, and
+grows as far as it can along Z, then Y, then X, over voxels of the same
+value that are still uncovered. Walls come out as one full-height box per
+straight run and floors as one slab per rectangle. The result is not always
+the minimum number of boxes (that problem is NP-hard), but it is close for
+the rectilinear layouts the generators build, and every growth step is a
+NumPy comparison over a whole row or slab.
+"""
+
+import numpy as np
+
+from brush_ops import FACE_KEYS
+
+# Seeds tested per NumPy step while looking for the next uncovered voxel
+SEED_BLOCK = 4096
+
+
+def _run_length(mask):
+    """Return the number of leading True values in a 1D mask."""
+    if mask.all():
+        return len(mask)
+    return int(mask.argmin())
+
+
+def greedy_boxes(grid):
+    """
+    Cover the non-zero voxels of a grid with boxes of equal value.
+
+    Returns (boxes, values): an int array of voxel index extents
+    (x0, y0, z0, x1, y1, z1), upper bounds exclusive, one row per box, and
+    the grid value of every box.
+    """
+    grid = np.asarray(grid)
+    free = grid != 0
+    flat_free = free.reshape(-1)
+    seeds = np.flatnonzero(flat_free)
+
+    boxes = []
+    values = []
+    position = 0
+    while position < len(seeds):
+        # Skip to the next seed not covered by an earlier box
+        block = flat_free[seeds[position:position + SEED_BLOCK]]
+        if not block.any():
+            position += len(block)
+            continue
+        position += int(block.argmax())
+        x, y, z = np.unravel_index(seeds[position], grid.shape)
+        value = grid[x, y, z]
+
+        dz = _run_length(free[x, y, z:] & (grid[x, y, z:] == value))
+        rows = free[x, y:, z:z + dz] & (grid[x, y:, z:z + dz] == value)
+        dy = _run_length(rows.all(axis=1))
+        slabs = free[x:, y:y + dy, z:z + dz] & (grid[x:, y:y + dy, z:z + dz] == value)
+        dx = _run_length(slabs.all(axis=(1, 2)))
+
+        free[x:x + dx, y:y + dy, z:z + dz] = False
+        boxes.append((x, y, z, x + dx, y + dy, z + dz))
+        values.append(value)
+
+    return np.array(boxes, dtype=np.int64).reshape(-1, 6), np.array(values, dtype=grid.dtype)
+
+
+def grid_boxes(grid, origin, resolution):
+    """
+    Return (extents, values) of the boxes covering a grid, with extents in
+    world units for a grid whose voxel (0, 0, 0) starts at origin.
+    """
+    boxes, values = greedy_boxes(grid)
+    offset = np.tile(np.asarray(origin, dtype=float), 2)
+    return boxes * float(resolution) + offset, values
+
+
+def mesh_solids(grid, origin, resolution, make_box, materials):
+    """
+    Compile a grid into solids.
+
+    Args:
+        grid: Boolean or material id grid; zero voxels stay empty.
+        origin: World position of the outer corner of voxel (0, 0, 0).
+        resolution: Voxel size in map units.
+        make_box: Callable (mins, maxs, textures) -> solid, e.g. a
+            generator's _create_box.
+        materials: Material of every grid value: a dict, or a list where
+            materials[value - 1] is the material of id value. A single
+            string textures every box.
+
+    Returns the list of solids, one per box.
+    """
+    extents, values = grid_boxes(grid, origin, resolution)
+    solids = []
+    for box, value in zip(extents.tolist(), values.tolist()):
+        if isinstance(materials, str):
+            material = materials
+        elif isinstance(materials, dict):
+            material = materials[value]
+        else:
+            material = materials[int(value) - 1]
+        textures = {key: material for key in FACE_KEYS}
+        solids.append(make_box(box[:3], box[3:], textures))
+    return solids
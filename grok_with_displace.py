@@ -1,8 +1,9 @@
 # town_map_generator.py
 
-# Global counters for unique IDs in the .vmf file
-solid_id = 2  # Start from 2, as ID 1 is worldspawn
-side_id = 1
+from id_allocator import BOX_IDS, IdAllocator
+
+# Shared allocator for unique IDs in the .vmf file
+ids = IdAllocator(start=2)  # Start from 2, as ID 1 is worldspawn
 
 def create_brush(min_x, min_y, min_z, max_x, max_y, max_z, texture="tools/toolsnodraw", displacement_face=None, displacement_distance=0):
     """
@@ -18,7 +19,8 @@ def create_brush(min_x, min_y, min_z, max_x, max_y, max_z, texture="tools/toolsn
     Returns:
         String representing the brush in .vmf format.
     """
-    global solid_id, side_id
+    # Reserve the solid id and the ids of its six sides in one call
+    solid_id = ids.reserve(BOX_IDS)
     # Define the six planes (counterclockwise from outside)
     planes = [
         f"({min_x} {min_y} {min_z}) ({min_x} {min_y} {max_z}) ({min_x} {max_y} {min_z})",  # min X
@@ -34,6 +36,7 @@ def create_brush(min_x, min_y, min_z, max_x, max_y, max_z, texture="tools/toolsn
     
     brush_str = f'solid\n{{\n\t"id" "{solid_id}"\n'
     for i in range(6):
+        side_id = solid_id + 1 + i
         brush_str += f'\tside\n\t{{\n\t\t"id" "{side_id}"\n\t\t"plane" "{planes[i]}"\n\t\t"material" "{texture}"\n\t\t"uaxis" "{uaxes[i]}"\n\t\t"vaxis" "{vaxes[i]}"\n\t\t"rotation" "0"\n\t\t"lightmapscale" "16"\n\t\t"smoothing_groups" "0"\n'
         if displacement_face == 'top' and i == 5:
             # Add displacement info for top face (road)
@@ -51,9 +54,7 @@ def create_brush(min_x, min_y, min_z, max_x, max_y, max_z, texture="tools/toolsn
                 brush_str += f'\t\t\t\t"row{row}" "9 9 9 9 9 9 9 9"\n'
             brush_str += '\t\t\t}\n\t\t\tallowed_verts\n\t\t\t{\n\t\t\t\t"10" "-1 -1 -1 -1 -1 -1 -1 -1 -1 -1"\n\t\t\t}\n\t\t}\n'
         brush_str += '\t}\n'
-        side_id += 1
     brush_str += '}\n'
-    solid_id += 1
     return brush_str
 
 def create_building(x1, x2, y1, y2, h, front_y, door_height=96, door_width=48, window_height=64, window_width=48, wall_thickness=8):
@@ -2,11 +2,15 @@ import argparse
 import random
 import math
 
+import brush_ops
+import vmf_writer
+from id_allocator import BOX_IDS, IdAllocator
+
 class TownMapGenerator:
     def __init__(self):
         self.solids = []
         self.entities = []
-        self.next_id = 1
+        self.ids = IdAllocator()
         self.textures = {
             'road': 'CONCRETE/CONCRETEFLOOR027A',
             'building_wall': 'BRICK/BRICKWALL034A',
@@ -17,9 +21,7 @@ class TownMapGenerator:
 
     def get_next_id(self):
         """Get the next available ID and increment the counter."""
-        current_id = self.next_id
-        self.next_id += 1
-        return current_id
+        return self.ids.next()
 
     def _create_vertex(self, x, y, z):
         return f"{x} {y} {z}"
@@ -87,17 +89,17 @@ class TownMapGenerator:
             }
         ]
         
-        # Create a solid with unique ID
-        solid_id = self.get_next_id()
+        # Create a solid with unique ID, reserving the ids of its sides in the same call
+        solid_id = self.ids.reserve(BOX_IDS)
         solid = {
             "id": solid_id,
             "sides": []
         }
         
         # Add each side with unique ID
-        for side_data in sides:
+        for side_index, side_data in enumerate(sides, 1):
             side = {
-                "id": self.get_next_id(),
+                "id": solid_id + side_index,
                 "plane": side_data["plane"],
                 "material": side_data["material"],
                 "uaxis": side_data["uaxis"],
@@ -120,8 +122,14 @@ class TownMapGenerator:
         )
         self.solids.append(road)
 
-    def add_building(self, mins, maxs):
-        """Add a building with walls and roof."""
+    def add_building(self, mins, maxs, openings=()):
+        """
+        Add a building with walls and roof.
+
+        openings are (x0, y0, z0, x1, y1, z1) boxes cut out of the building
+        block, such as entrance recesses in its front; the rest of the block
+        is split into the fewest boxes around them (brush_ops.subtract).
+        """
         building_textures = {
             'top': self.textures['building_roof'],
             'front': self.textures['building_wall'],
@@ -130,10 +138,27 @@ class TownMapGenerator:
             'right': self.textures['building_wall'],
             'bottom': self.textures['building_wall']
         }
-        building = self._create_box(mins, maxs, building_textures)
-        self.solids.append(building)
+        if not openings:
+            self.solids.append(self._create_box(mins, maxs, building_textures))
+            return {'mins': mins, 'maxs': maxs}
+
+        # Only the pieces reaching the top of the block get the roof material
+        for piece in brush_ops.subtract(tuple(mins) + tuple(maxs), openings):
+            textures = dict(building_textures)
+            if piece[5] < maxs[2]:
+                textures['top'] = self.textures['building_wall']
+            self.solids.append(self._create_box(list(piece[:3]), list(piece[3:]), textures))
         return {'mins': mins, 'maxs': maxs}
 
+    def _entrance(self, mins, maxs, side, width=64, height=112, depth=32, step=16):
+        """Return the recess of an entrance in the middle of the west or east face of a building."""
+        center = (mins[1] + maxs[1]) / 2
+        if side == 'west':
+            x0, x1 = mins[0], mins[0] + depth
+        else:
+            x0, x1 = maxs[0] - depth, maxs[0]
+        return (x0, center - width / 2, mins[2] + step, x1, center + width / 2, mins[2] + step + height)
+
     def add_alley(self, mins, maxs):
         """Add a flat alley brush between buildings."""
         alley_textures = {'top': self.textures['alley'], 'bottom': self.textures['alley']}
@@ -160,13 +185,14 @@ class TownMapGenerator:
         }
         self.entities.append(entity)
 
-    def create_town(self, streets_x=3, streets_y=3):
+    def create_town(self, streets_x=3, streets_y=3, entrances=False):
         """
         Generate a town with a grid of streets and buildings.
         
         Args:
             streets_x (int): Number of streets running east-west
             streets_y (int): Number of streets running north-south
+            entrances (bool): Cut an entrance recess into the street side of every building
         """
         road_width = 128  # Width of streets
         alley_width = 64  # Width of alleyways
@@ -238,7 +264,9 @@ class TownMapGenerator:
                         building_mins[1] + building_length,
                         origin[2] + building_height
                     ]
-                    buildings.append(self.add_building(building_mins, building_maxs))
+                    buildings.append(self.add_building(
+                        building_mins, building_maxs,
+                        [self._entrance(building_mins, building_maxs, 'west')] if entrances else ()))
 
                     # Add alleyways
                     # Alley to the right
@@ -268,7 +296,9 @@ class TownMapGenerator:
                         building_mins[1] + building_length,
                         origin[2] + building_height
                     ]
-                    buildings.append(self.add_building(building_mins, building_maxs))
+                    buildings.append(self.add_building(
+                        building_mins, building_maxs,
+                        [self._entrance(building_mins, building_maxs, 'east')] if entrances else ()))
 
                     # Alley to the left
                     if x > 1:
@@ -297,7 +327,9 @@ class TownMapGenerator:
                         road_y - sidewalk_width,
                         origin[2] + building_height
                     ]
-                    buildings.append(self.add_building(building_mins, building_maxs))
+                    buildings.append(self.add_building(
+                        building_mins, building_maxs,
+                        [self._entrance(building_mins, building_maxs, 'west')] if entrances else ()))
 
                     # Alley to the right
                     if x < streets_x - 2:
@@ -326,7 +358,9 @@ class TownMapGenerator:
                         road_y - sidewalk_width,
                         origin[2] + building_height
                     ]
-                    buildings.append(self.add_building(building_mins, building_maxs))
+                    buildings.append(self.add_building(
+                        building_mins, building_maxs,
+                        [self._entrance(building_mins, building_maxs, 'east')] if entrances else ()))
 
                     # Alley to the left
                     if x > 1:
@@ -348,81 +382,43 @@ class TownMapGenerator:
 
         return buildings
 
-    def generate_vmf(self, filename="town.vmf"):
+    def merge_brushes(self):
+        """Fuse adjacent road, alley and sidewalk brushes with matching extents and materials."""
+        before = len(self.solids)
+        self.solids = brush_ops.merge_boxes(self.solids, self._create_box)
+        return before - len(self.solids)
+
+    def cull_hidden_faces(self):
+        """Texture faces hidden by neighbouring brushes with nodraw; returns the number culled."""
+        return brush_ops.cull_hidden_faces(self.solids)
+
+    def move_detail_brushes(self, max_size=256):
+        """Move sidewalks and other small brushes that don't seal the map into a func_detail entity."""
+        self.solids, detail = brush_ops.split_detail(self.solids, max_size=max_size)
+        if detail:
+            self.entities.append({"id": self.get_next_id(), "classname": "func_detail", "solids": detail})
+        return len(detail)
+
+    def generate_vmf(self, filename="town.vmf", verbose=False):
         """Save the town layout to a .vmf file (Valve Map Format)."""
-        with open(filename, 'w') as f:
-            # Write VMF header
-            f.write("versioninfo\n{\n")
-            f.write("\t\"editorversion\" \"400\"\n")
-            f.write("\t\"editorbuild\" \"8864\"\n")
-            f.write("\t\"mapversion\" \"1\"\n")
-            f.write("\t\"formatversion\" \"100\"\n")
-            f.write("\t\"prefab\" \"0\"\n")
-            f.write("}\n")
-            
-            # Write visgroups
-            f.write("visgroups\n{\n}\n")
-            
-            # Write viewsettings
-            f.write("viewsettings\n{\n")
-            f.write("\t\"bSnapToGrid\" \"1\"\n")
-            f.write("\t\"bShowGrid\" \"1\"\n")
-            f.write("\t\"bShowLogicalGrid\" \"0\"\n")
-            f.write("\t\"nGridSpacing\" \"64\"\n")
-            f.write("}\n")
-            
-            # Write world entity
-            f.write("world\n{\n")
-            f.write("\t\"id\" \"1\"\n")
-            f.write("\t\"mapversion\" \"1\"\n")
-            f.write("\t\"classname\" \"worldspawn\"\n")
-            f.write("\t\"skyname\" \"sky_day01_01\"\n")
-            f.write("\t\"maxpropscreenwidth\" \"-1\"\n")
-            f.write("\t\"detailvbsp\" \"detail.vbsp\"\n")
-            f.write("\t\"detailmaterial\" \"detail/detailsprites\"\n")
-            
-            # Write solid brushes for world
-            for solid in self.solids:
-                f.write("\tsolid\n\t{\n")
-                f.write(f"\t\t\"id\" \"{solid['id']}\"\n")
-                
-                # Write sides
-                for side in solid["sides"]:
-                    f.write("\t\tside\n\t\t{\n")
-                    f.write(f"\t\t\t\"id\" \"{side['id']}\"\n")
-                    f.write(f"\t\t\t\"plane\" \"{side['plane']}\"\n")
-                    f.write(f"\t\t\t\"material\" \"{side['material']}\"\n")
-                    f.write(f"\t\t\t\"uaxis\" \"{side['uaxis']}\"\n")
-                    f.write(f"\t\t\t\"vaxis\" \"{side['vaxis']}\"\n")
-                    f.write(f"\t\t\t\"rotation\" \"{side['rotation']}\"\n")
-                    f.write(f"\t\t\t\"lightmapscale\" \"{side['lightmapscale']}\"\n")
-                    f.write(f"\t\t\t\"smoothing_groups\" \"{side['smoothing_groups']}\"\n")
-                    f.write("\t\t}\n")
-                
-                f.write("\t}\n")
-            
-            f.write("}\n")
-            
-            # Write entities
-            for entity in self.entities:
-                f.write("entity\n{\n")
-                for key, value in entity.items():
-                    if key != "id":  # id is handled separately
-                        f.write(f"\t\"{key}\" \"{value}\"\n")
-                f.write(f"\t\"id\" \"{entity['id']}\"\n")
-                f.write("}\n")
-            
-            # Write cameras
-            f.write("cameras\n{\n")
-            f.write("\t\"activecamera\" \"-1\"\n")
-            f.write("}\n")
-            
-            # Write cordon
-            f.write("cordon\n{\n")
-            f.write("\t\"mins\" \"(-1024 -1024 -1024)\"\n")
-            f.write("\t\"maxs\" \"(1024 1024 1024)\"\n")
-            f.write("\t\"active\" \"0\"\n")
-            f.write("}\n")
+        world = [
+            ('id', '1'),
+            ('mapversion', '1'),
+            ('classname', 'worldspawn'),
+            ('skyname', 'sky_day01_01'),
+            ('maxpropscreenwidth', '-1'),
+            ('detailvbsp', 'detail.vbsp'),
+            ('detailmaterial', 'detail/detailsprites')
+        ]
+        viewsettings = [
+            ('bSnapToGrid', '1'),
+            ('bShowGrid', '1'),
+            ('bShowLogicalGrid', '0'),
+            ('nGridSpacing', '64')
+        ]
+        return vmf_writer.write_vmf(filename, self.solids, self.entities, verbose=verbose,
+                                    world=world, viewsettings=viewsettings,
+                                    entity_formatter=vmf_writer.format_entity_id_last)
 
 def main():
     parser = argparse.ArgumentParser(description='Generate a Source Engine town VMF file.')
@@ -430,6 +426,15 @@ def main():
     parser.add_argument('--output', type=str, default=None, help='Output file path (if not specified, name.vmf will be used)')
     parser.add_argument('--streets-x', type=int, default=3, help='Number of streets running east-west')
     parser.add_argument('--streets-y', type=int, default=3, help='Number of streets running north-south')
+    parser.add_argument('--entrances', action='store_true',
+                        help='Cut an entrance recess into the street side of every building')
+    parser.add_argument('--merge-brushes', action='store_true',
+                        help='Fuse adjacent brushes with identical extents and materials before saving')
+    parser.add_argument('--cull-faces', action='store_true',
+                        help='Texture faces hidden by neighbouring brushes with nodraw before saving')
+    parser.add_argument('--detail-brushes', action='store_true',
+                        help='Move brushes that do not seal the map into func_detail before saving')
+    parser.add_argument('--verbose', action='store_true', help='Report output size and write throughput')
 
     args = parser.parse_args()
 
@@ -437,11 +442,23 @@ def main():
     town_gen = TownMapGenerator()
     
     # Generate the town
-    town_gen.create_town(streets_x=args.streets_x, streets_y=args.streets_y)
+    town_gen.create_town(streets_x=args.streets_x, streets_y=args.streets_y, entrances=args.entrances)
+    
+    if args.merge_brushes:
+        removed = town_gen.merge_brushes()
+        print(f"Merged brushes: {removed} removed, {len(town_gen.solids)} remaining")
+    
+    if args.cull_faces:
+        culled = town_gen.cull_hidden_faces()
+        print(f"Culled {culled} hidden faces")
+    
+    if args.detail_brushes:
+        moved = town_gen.move_detail_brushes()
+        print(f"Moved {moved} brushes to func_detail")
     
     # Save the map as VMF
     output_path = args.output if args.output else f"{args.name}.vmf"
-    town_gen.generate_vmf(output_path)
+    town_gen.generate_vmf(output_path, verbose=args.verbose)
     print(f"Town map generation complete. Output saved to: {output_path}")
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+"""
+Shared id allocator
+
+Hands out contiguous blocks of VMF ids (solids, sides and entities). A box
+reserves all seven of its ids (the solid and its six sides) in one call,
+so bulk generation pays one Python call per brush instead of one per id.
+
+Allocation is guarded by a lock, so one allocator can be shared by worker
+threads. For worker processes, split() carves disjoint sub-ranges off the
+parent allocator up front; each sub-allocator is picklable, refuses to
+allocate past the end of its range, and can be merged back into the parent.
+"""
+
+import threading
+
+# Ids used by one axis-aligned box: the solid and its six sides
+BOX_IDS = 7
+
+
+class IdAllocator:
+    """Thread-safe allocator of contiguous id ranges."""
+
+    def __init__(self, start=1, stop=None):
+        """
+        Args:
+            start: First id handed out.
+            stop: Exclusive upper bound of the range, or None for unbounded.
+        """
+        self.start = start
+        self.next_id = start
+        self.stop = stop
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"IdAllocator(next_id={self.next_id}, stop={self.stop})"
+
+    def reserve(self, count):
+        """Reserve count consecutive ids and return the first one."""
+        with self._lock:
+            first = self.next_id
+            if self.stop is not None and first + count > self.stop:
+                raise RuntimeError(f"Id range exhausted: cannot reserve {count} ids from {first} (stop {self.stop})")
+            self.next_id = first + count
+            return first
+
+    def next(self):
+        """Return a single new id."""
+        return self.reserve(1)
+
+    def split(self, size, parts):
+        """
+        Reserve parts disjoint ranges of size ids each and return one
+        sub-allocator per range, e.g. for worker processes.
+        """
+        first = self.reserve(size * parts)
+        return [IdAllocator(first + k * size, first + (k + 1) * size) for k in range(parts)]
+
+    def merge(self, other):
+        """
+        Fold another allocator's usage into this one, so ids handed out by
+        either are never handed out again by this allocator.
+        """
+        with self._lock:
+            self.next_id = max(self.next_id, other.next_id)
+        return self
+
+    @property
+    def used(self):
+        """Number of ids handed out so far."""
+        return self.next_id - self.start
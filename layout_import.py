@@ -0,0 +1,283 @@
+"""
+Layout import
+
+Turns floor plans drawn as text grids or PNG masks into brushes. Every
+character (or pixel) is one square cell; a legend maps symbols (or
+'#rrggbb' colors) to what the cell holds:
+
+    'floor'   material of the floor slab (missing: no floor)
+    'wall'    material of a wall column standing in the cell
+    'height'  height of the wall above the floor (missing: up to the ceiling)
+    'entity'  one of ENTITY_KINDS, placed in the middle of the cell
+
+Cells with neither floor nor wall are left out of the map, so the plan has
+to be closed by walls. Materials are material names or keys of the
+generator's texture table ('wall', 'concrete', ...).
+
+Brushes come from run-length encoding: every row of a layer (floors, full
+walls, low walls of each height, ceilings) is cut into runs of equal
+value, and runs that repeat unchanged on the following rows are merged into
+one rectangle. A room is a handful of brushes however many cells it spans,
+and the whole conversion is a NumPy pass plus one step per run.
+"""
+
+import json
+import struct
+import zlib
+
+import numpy as np
+
+ENTITY_KINDS = ('player_start', 'light', 'health', 'ammo', 'npc')
+
+DEFAULT_TEXT_LEGEND = {
+    '#': {'wall': 'wall'},
+    '=': {'floor': 'floor', 'wall': 'concrete', 'height': 64},
+    '.': {'floor': 'floor'},
+    'P': {'floor': 'floor', 'entity': 'player_start'},
+    'L': {'floor': 'floor', 'entity': 'light'},
+    'H': {'floor': 'floor', 'entity': 'health'},
+    'A': {'floor': 'floor', 'entity': 'ammo'},
+    'N': {'floor': 'floor', 'entity': 'npc'}
+}
+
+DEFAULT_IMAGE_LEGEND = {
+    '#000000': {'wall': 'wall'},
+    '#808080': {'floor': 'floor', 'wall': 'concrete', 'height': 64},
+    '#ffffff': {'floor': 'floor'},
+    '#00ff00': {'floor': 'floor', 'entity': 'player_start'},
+    '#ffff00': {'floor': 'floor', 'entity': 'light'},
+    '#0000ff': {'floor': 'floor', 'entity': 'health'},
+    '#00ffff': {'floor': 'floor', 'entity': 'ammo'},
+    '#ff0000': {'floor': 'floor', 'entity': 'npc'}
+}
+
+# Channels per pixel of the PNG color types
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def read_text_layout(filename):
+    """Return the cells of a text floor plan as a 2D array of characters, padding short rows with spaces."""
+    with open(filename, 'r', encoding='utf-8') as f:
+        lines = [line.rstrip('\r\n') for line in f]
+    while lines and not lines[-1].strip():
+        lines.pop()
+    width = max((len(line) for line in lines), default=0)
+    return np.array([list(line.ljust(width)) for line in lines], dtype='<U1').reshape(len(lines), width)
+
+
+def _paeth(left, up, up_left):
+    estimate = left + up - up_left
+    distances = abs(estimate - left), abs(estimate - up), abs(estimate - up_left)
+    if distances[0] <= distances[1] and distances[0] <= distances[2]:
+        return left
+    return up if distances[1] <= distances[2] else up_left
+
+
+def read_png(filename):
+    """
+    Decode an 8-bit, non-interlaced PNG into a (height, width, 4) RGBA
+    uint8 array, without any imaging library.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if data[:8] != b'\x89PNG\r\n\x1a\n':
+        raise ValueError(f"{filename} is not a PNG file")
+
+    chunks = {}
+    position = 8
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        chunks.setdefault(kind, []).append(data[position + 8:position + 8 + length])
+        position += 12 + length
+    width, height, depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', chunks[b'IHDR'][0])
+    if depth != 8 or interlace or color_type not in PNG_CHANNELS:
+        raise ValueError(f"{filename}: only 8-bit non-interlaced PNG files are supported")
+
+    channels = PNG_CHANNELS[color_type]
+    stride = width * channels
+    raw = np.frombuffer(zlib.decompress(b''.join(chunks[b'IDAT'])), dtype=np.uint8).reshape(height, stride + 1)
+    pixels = np.zeros((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.uint8)
+    for row in range(height):
+        kind, line = raw[row, 0], raw[row, 1:]
+        if kind == 0:
+            current = line
+        elif kind == 1:
+            current = np.cumsum(line.reshape(width, channels), axis=0, dtype=np.uint8).reshape(-1)
+        elif kind == 2:
+            current = line + previous
+        else:
+            # Average and Paeth depend on the pixel just decoded
+            values = line.tolist()
+            above = previous.tolist()
+            for i in range(stride):
+                left = values[i - channels] if i >= channels else 0
+                if kind == 3:
+                    values[i] = (values[i] + (left + above[i]) // 2) & 255
+                else:
+                    up_left = above[i - channels] if i >= channels else 0
+                    values[i] = (values[i] + _paeth(left, above[i], up_left)) & 255
+            current = np.array(values, dtype=np.uint8)
+        pixels[row] = current
+        previous = pixels[row]
+
+    pixels = pixels.reshape(height, width, channels)
+    if color_type == 3:
+        palette = np.frombuffer(chunks[b'PLTE'][0], dtype=np.uint8).reshape(-1, 3)
+        alpha = np.full(len(palette), 255, dtype=np.uint8)
+        if b'tRNS' in chunks:
+            transparency = np.frombuffer(chunks[b'tRNS'][0], dtype=np.uint8)
+            alpha[:len(transparency)] = transparency
+        return np.concatenate([palette, alpha[:, None]], axis=1)[pixels[:, :, 0]]
+    if color_type in (0, 4):
+        pixels = np.concatenate([np.repeat(pixels[:, :, :1], 3, axis=2), pixels[:, :, 1:]], axis=2)
+    if pixels.shape[2] == 3:
+        pixels = np.concatenate([pixels, np.full((height, width, 1), 255, dtype=np.uint8)], axis=2)
+    return pixels
+
+
+def read_image_layout(filename):
+    """
+    Return the cells of a PNG floor plan as a 2D array of '#rrggbb' colors;
+    transparent pixels become ' ' (no cell).
+    """
+    pixels = read_png(filename)
+    packed = (pixels[:, :, 0].astype(np.int64) << 16) | (pixels[:, :, 1].astype(np.int64) << 8) | pixels[:, :, 2]
+    colors, inverse = np.unique(packed, return_inverse=True)
+    names = np.array([f"#{color:06x}" for color in colors.tolist()], dtype='<U7')
+    cells = names[inverse.reshape(packed.shape)]
+    cells[pixels[:, :, 3] == 0] = ' '
+    return cells
+
+
+def load_legend(filename):
+    """Read a legend from a JSON object mapping symbols or colors to cell dicts."""
+    with open(filename, 'r', encoding='utf-8') as f:
+        legend = json.load(f)
+    return {symbol.lower() if symbol.startswith('#') and len(symbol) == 7 else symbol: cell
+            for symbol, cell in legend.items()}
+
+
+def row_runs(labels):
+    """
+    Run-length encode every row of a 2D label array.
+
+    Returns (rows, starts, ends, values) arrays of the runs of non-zero
+    labels, ends exclusive, in row order.
+    """
+    labels = np.asarray(labels)
+    height, width = labels.shape
+    change = np.ones((height, width), dtype=bool)
+    change[:, 1:] = labels[:, 1:] != labels[:, :-1]
+    rows, starts = np.nonzero(change)
+    flat = rows * width + starts
+    ends = np.minimum(np.append(flat[1:], height * width), (rows + 1) * width) - rows * width
+    values = labels[rows, starts]
+    keep = values != 0
+    return rows[keep], starts[keep], ends[keep], values[keep]
+
+
+def run_rectangles(labels):
+    """
+    Cover the non-zero cells of a 2D label array with rectangles of equal
+    label, merging each row's runs with identical runs on the rows below.
+
+    Returns a list of (row0, col0, row1, col1, value), upper bounds exclusive.
+    """
+    rectangles = []
+    previous = {}  # (start, end, value) -> first row, for rectangles reaching the previous row
+    current = {}  # the same for rectangles reaching the current row
+    current_row = None
+    for row, start, end, value in zip(*(array.tolist() for array in row_runs(labels))):
+        if row != current_row:
+            # Rectangles that did not continue on the current row end above it
+            _close(previous, current_row, rectangles)
+            if current_row is not None and row != current_row + 1:
+                _close(current, current_row + 1, rectangles)
+                current = {}
+            previous, current, current_row = current, {}, row
+        key = (start, end, value)
+        current[key] = previous.pop(key, row)
+    if current_row is not None:
+        _close(previous, current_row, rectangles)
+        _close(current, current_row + 1, rectangles)
+    return rectangles
+
+
+def _close(rectangles_by_run, end_row, rectangles):
+    """Append the open rectangles of rectangles_by_run, ending at end_row (exclusive)."""
+    for (start, end, value), first_row in rectangles_by_run.items():
+        rectangles.append((first_row, start, end_row, end, value))
+
+
+def layout_boxes(cells, legend, cell_size=64, wall_height=256, floor_z=0, thickness=16):
+    """
+    Build the boxes of a floor plan.
+
+    Args:
+        cells: 2D array of symbols; row 0 is the north edge of the map.
+        legend: Symbol -> cell dict (see the module docstring).
+        cell_size: Size of a cell in map units.
+        wall_height: Height from the top of the floor to the ceiling.
+        floor_z: Height of the bottom of the floor slab.
+        thickness: Thickness of floor and ceiling slabs.
+
+    Returns (boxes, entities): boxes are (mins, maxs, role, material) with
+    role 'floor', 'wall' or 'ceiling', entities are (kind, position).
+    """
+    cells = np.asarray(cells)
+    missing = sorted(set(np.unique(cells).tolist()) - set(legend) - {' '})
+    if missing:
+        raise ValueError(f"Symbols missing from the legend: {', '.join(repr(symbol) for symbol in missing)}")
+
+    height = cells.shape[0]
+    top = floor_z + thickness
+    ceiling = top + wall_height
+
+    # One label layer per brush role; labels index into the matching value list
+    layers = {'floor': [], 'wall': [], 'ceiling': []}
+    symbol_labels = {role: {} for role in layers}
+    entities = []
+    for symbol, cell in legend.items():
+        wall = cell.get('wall')
+        floor = cell.get('floor')
+        full_wall = wall and cell.get('height') is None
+        pieces = {
+            # Full walls run from the bottom of the floor to the top of the ceiling and seal the map
+            'floor': (floor_z, top, floor) if floor and not full_wall else None,
+            'wall': (floor_z, ceiling + thickness, wall) if full_wall else
+                    (top, top + cell['height'], wall) if wall else None,
+            'ceiling': (ceiling, ceiling + thickness, 'ceiling') if floor and not full_wall else None
+        }
+        for role, piece in pieces.items():
+            if piece is None:
+                continue
+            if piece not in layers[role]:
+                layers[role].append(piece)
+            symbol_labels[role][symbol] = layers[role].index(piece) + 1
+        kind = cell.get('entity')
+        if kind is not None and kind not in ENTITY_KINDS:
+            raise ValueError(f"Unknown entity {kind!r} for symbol {symbol!r}; use one of {', '.join(ENTITY_KINDS)}")
+
+    boxes = []
+    for role, pieces in layers.items():
+        labels = np.zeros(cells.shape, dtype=np.int32)
+        for symbol, label in symbol_labels[role].items():
+            labels[cells == symbol] = label
+        for row0, col0, row1, col1, label in run_rectangles(labels):
+            z0, z1, material = pieces[label - 1]
+            boxes.append((
+                [col0 * cell_size, (height - row1) * cell_size, z0],
+                [col1 * cell_size, (height - row0) * cell_size, z1],
+                role, material
+            ))
+
+    for symbol, cell in legend.items():
+        kind = cell.get('entity')
+        if kind is None:
+            continue
+        z = ceiling - 32 if kind == 'light' else top + (32 if kind == 'player_start' else 16)
+        for row, col in np.argwhere(cells == symbol).tolist():
+            entities.append((kind, [(col + 0.5) * cell_size, (height - row - 0.5) * cell_size, z]))
+
+    return boxes, entities
@@ -0,0 +1,202 @@
+"""
+Leak check
+
+Finds leaks (entities that can reach the void outside the map) before the
+map goes through vbsp, which only reports them after a full compile.
+
+The sealing world brushes are voxelized into an occupancy grid with one
+empty voxel of padding all around (see voxelize). A breadth-first flood
+fill starts in that padding, i.e. in the void, and spreads through empty
+voxels; every point entity whose voxel the fill reaches leaks. One fill
+answers the question for all entities at once, and on a sealed map it
+never gets past the outside of the walls. Each voxel remembers the step
+that reached it, so the shortest way from a leaking entity to the void can
+be traced back and written as a pointfile (.lin) for Hammer.
+
+The fill moves a whole frontier of voxels per NumPy step, so big maps take
+seconds. Openings narrower than the resolution are not seen; 16 units
+matches the thinnest walls the generators build.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import vmf_reader
+import voxelize
+
+# Materials of brushes that vbsp does not count as sealing
+NON_SEALING_MATERIALS = (
+    'TOOLS/TOOLSHINT', 'TOOLS/TOOLSSKIP', 'TOOLS/TOOLSTRIGGER', 'TOOLS/TOOLSAREAPORTAL',
+    'TOOLS/TOOLSCLIP', 'TOOLS/TOOLSPLAYERCLIP', 'TOOLS/TOOLSNPCCLIP', 'NATURE/WATER'
+)
+
+# Flood fill steps as (axis, direction); a voxel stores 1 + the index of the step that reached it
+STEPS = ((0, 1), (0, -1), (1, 1), (1, -1), (2, 1), (2, -1))
+SEED = len(STEPS) + 1
+
+
+def seals(solid):
+    """Return True if a world brush keeps the void out."""
+    return not any(side['material'].upper().startswith(NON_SEALING_MATERIALS) for side in solid['sides'])
+
+
+def entity_origins(entities):
+    """Return (entity, (x, y, z)) for every entity with an origin."""
+    found = []
+    for entity in entities:
+        origin = entity.get('origin')
+        if origin and entity.get('classname') != 'worldspawn':
+            found.append((entity, tuple(float(value) for value in origin.split())))
+    return found
+
+
+def flood_void(solid):
+    """
+    Flood fill the empty voxels of a grid from its boundary.
+
+    Returns a flat uint8 array: 0 for voxels the fill never reached,
+    SEED for boundary voxels, otherwise 1 + the index in STEPS of the step
+    that reached the voxel.
+    """
+    boundary = np.ones(solid.shape, dtype=bool)
+    boundary[1:-1, 1:-1, 1:-1] = False
+    return flood_fill(solid, np.flatnonzero(boundary.reshape(-1) & ~solid.reshape(-1)))
+
+
+def flood_fill(solid, seeds):
+    """
+    Flood fill the empty voxels of a grid from the flat indices in seeds,
+    recording the steps like flood_void.
+    """
+    shape = solid.shape
+    strides = (shape[1] * shape[2], shape[2], 1)
+    blocked = solid.reshape(-1)
+    reached = np.zeros(blocked.size, dtype=np.uint8)
+
+    seeds = np.asarray(seeds, dtype=np.int64)
+    reached[seeds[~blocked[seeds]]] = SEED
+    frontier = np.flatnonzero(reached)  # each seed once
+
+    while frontier.size:
+        found = []
+        for step, (axis, direction) in enumerate(STEPS):
+            coordinate = frontier // strides[axis] % shape[axis] + direction
+            following = frontier[(coordinate >= 0) & (coordinate < shape[axis])] + direction * strides[axis]
+            following = following[~blocked[following] & (reached[following] == 0)]
+            reached[following] = step + 1
+            found.append(following)
+        frontier = np.concatenate(found)
+    return reached
+
+
+def trace_path(reached, shape, start):
+    """
+    Return the voxels from start back to the boundary along the steps
+    recorded by flood_void, keeping only the corners of the path.
+    """
+    strides = (shape[1] * shape[2], shape[2], 1)
+    index = int(np.ravel_multi_index(start, shape))
+    path = [start]
+    previous_step = None
+    while reached[index] != SEED:
+        step = int(reached[index]) - 1
+        axis, direction = STEPS[step]
+        index -= direction * strides[axis]
+        voxel = tuple(int(value) for value in np.unravel_index(index, shape))
+        if step == previous_step:
+            path[-1] = voxel
+        else:
+            path.append(voxel)
+        previous_step = step
+    return path
+
+
+def find_leaks(solids, entities, resolution=16):
+    """
+    Check a map for leaks.
+
+    Args:
+        solids: World solids.
+        entities: Entity dicts; every entity with an origin is checked.
+        resolution: Voxel size in map units.
+
+    Returns a dict with the 'leaks' as (entity, path) pairs, path being the
+    world points from the entity to the void, the entities whose origin is
+    'in_solid' (which vbsp ignores), the number of entities 'checked' and
+    the grid 'shape'.
+    """
+    grid, origin, _ = voxelize.voxelize_solids([solid for solid in solids if solid.get('sides') and seals(solid)],
+                                               resolution)
+    reached = flood_void(grid)
+
+    leaks = []
+    in_solid = []
+    origins = entity_origins(entities)
+    for entity, point in origins:
+        index = voxelize.voxel_index(point, origin, resolution)
+        if not all(0 <= index[axis] < grid.shape[axis] for axis in range(3)):
+            leaks.append((entity, [point]))
+        elif grid[index]:
+            in_solid.append(entity)
+        elif reached[np.ravel_multi_index(index, grid.shape)]:
+            path = trace_path(reached, grid.shape, index)
+            leaks.append((entity, [point] + [voxelize.voxel_center(voxel, origin, resolution) for voxel in path]))
+
+    return {
+        'leaks': leaks,
+        'in_solid': in_solid,
+        'checked': len(origins),
+        'shape': grid.shape
+    }
+
+
+def write_pointfile(path, filename):
+    """Write a leak path as a Hammer pointfile, one 'x y z' point per line."""
+    with open(filename, 'w') as f:
+        f.writelines(f"{x:g} {y:g} {z:g}\n" for x, y, z in path)
+
+
+def print_report(report, limit=10):
+    """Print a leak report, listing at most limit leaking entities."""
+    leaks = report['leaks']
+    shape = report['shape']
+    if leaks:
+        print(f"LEAK: {len(leaks)} of {report['checked']} entities reach the void "
+              f"({shape[0]}x{shape[1]}x{shape[2]} voxels)")
+    else:
+        print(f"No leaks: {report['checked']} entities checked ({shape[0]}x{shape[1]}x{shape[2]} voxels)")
+    for entity, path in leaks[:limit]:
+        x, y, z = path[0]
+        print(f"  {entity.get('classname')} at ({x:g} {y:g} {z:g}): {len(path)} point path to the void")
+    if len(leaks) > limit:
+        print(f"  ... and {len(leaks) - limit} more")
+    if report['in_solid']:
+        print(f"  {len(report['in_solid'])} entities are inside solid brushes and were skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find leaks in a .vmf file without compiling it.')
+    parser.add_argument('input', type=str, help='Path to the .vmf file to check')
+    parser.add_argument('--resolution', type=float, default=16, help='Voxel size in map units')
+    parser.add_argument('--pointfile', type=str, default=None,
+                        help='Where to write the path of the first leak (default: the input with a .lin extension)')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum number of leaking entities to list')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solids, entities = vmf_reader.read_vmf(args.input)
+    report = find_leaks(solids, entities, args.resolution)
+    print_report(report, limit=args.limit)
+
+    if report['leaks']:
+        pointfile = args.pointfile or os.path.splitext(args.input)[0] + '.lin'
+        write_pointfile(report['leaks'][0][1], pointfile)
+        print(f"Leak path written to {pointfile}")
+    print(f"Analysis took {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Perfect maze generation
+
+Mazes are stored as two NumPy boolean arrays of shape (width, height):
+east[x, y] is True when there is a wall between cell (x, y) and (x + 1, y),
+north[x, y] when there is a wall between (x, y) and (x, y + 1). The last
+column of east and the last row of north are the outer walls; the outer
+west and south walls are implicit.
+
+All algorithms produce perfect mazes (every cell reachable, exactly one
+path between any two cells) and are iterative, so 1000x1000 grids work
+without hitting the recursion limit. Randomness comes from a
+random.Random-like object, which keeps output reproducible with --seed.
+
+wall_runs() turns the arrays into long wall rectangles, merging runs of
+collinear wall segments into a single brush.
+"""
+
+import bisect
+import random
+
+import numpy as np
+
+
+def new_walls(width, height):
+    """Return (east, north) arrays with every wall standing."""
+    return np.ones((width, height), dtype=bool), np.ones((width, height), dtype=bool)
+
+
+def _carve(east, north, height, a, b):
+    """Remove the wall between neighbouring flat cell indices a and b."""
+    if b == a + height:
+        east[a] = False
+    elif a == b + height:
+        east[b] = False
+    elif b == a + 1:
+        north[a] = False
+    else:
+        north[b] = False
+
+
+def _neighbours(cell, width, height):
+    """Return the flat indices of the cells next to cell."""
+    x, y = divmod(cell, height)
+    found = []
+    if x > 0:
+        found.append(cell - height)
+    if x < width - 1:
+        found.append(cell + height)
+    if y > 0:
+        found.append(cell - 1)
+    if y < height - 1:
+        found.append(cell + 1)
+    return found
+
+
+def backtracker(width, height, rng=random):
+    """
+    Depth-first search backtracker with an explicit stack.
+
+    Produces long, winding corridors with few dead ends.
+    """
+    east, north = new_walls(width, height)
+    flat_east, flat_north = east.reshape(-1), north.reshape(-1)
+
+    visited = bytearray(width * height)
+    start = rng.randrange(width * height)
+    visited[start] = 1
+    stack = [start]
+
+    while stack:
+        cell = stack[-1]
+        options = [n for n in _neighbours(cell, width, height) if not visited[n]]
+        if not options:
+            stack.pop()
+            continue
+        chosen = options[rng.randrange(len(options))]
+        _carve(flat_east, flat_north, height, cell, chosen)
+        visited[chosen] = 1
+        stack.append(chosen)
+
+    return east, north
+
+
+def kruskal(width, height, rng=random):
+    """
+    Randomized Kruskal: walls are visited in random order and removed when
+    the cells on both sides are not yet connected (union-find).
+
+    Produces many short dead ends.
+    """
+    east, north = new_walls(width, height)
+    cells = np.arange(width * height).reshape(width, height)
+
+    # Candidate walls as flat cell indices (a, b); walls 0..k-1 are east walls
+    east_a = cells[:-1, :].reshape(-1)
+    north_a = cells[:, :-1].reshape(-1)
+    first = np.concatenate([east_a, north_a])
+    second = np.concatenate([east_a + height, north_a + 1])
+    order = np.random.default_rng(rng.getrandbits(64)).permutation(len(first))
+
+    parent = list(range(width * height))
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]  # path halving
+            cell = parent[cell]
+        return cell
+
+    carved = []
+    remaining = width * height - 1
+    for wall, a, b in zip(order.tolist(), first[order].tolist(), second[order].tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            carved.append(wall)
+            remaining -= 1
+            if not remaining:
+                break
+
+    carved = np.array(carved, dtype=np.int64)
+    east_count = len(east_a)
+    flat_east, flat_north = east.reshape(-1), north.reshape(-1)
+    flat_east[east_a[carved[carved < east_count]]] = False
+    flat_north[north_a[carved[carved >= east_count] - east_count]] = False
+    return east, north
+
+
+def wilson(width, height, rng=random):
+    """
+    Wilson's algorithm: loop-erased random walks from every cell not yet in
+    the maze until they hit it. Produces a uniformly random spanning tree,
+    so the maze has no directional bias. Slower than the others on large
+    grids while the tree is still small.
+    """
+    east, north = new_walls(width, height)
+    flat_east, flat_north = east.reshape(-1), north.reshape(-1)
+
+    count = width * height
+    in_tree = bytearray(count)
+    in_tree[rng.randrange(count)] = 1
+    # Exit taken from each cell on the current walk; revisits overwrite it,
+    # which erases the loops
+    exit_to = [0] * count
+
+    for start in range(count):
+        if in_tree[start]:
+            continue
+
+        cell = start
+        while not in_tree[cell]:
+            options = _neighbours(cell, width, height)
+            exit_to[cell] = options[rng.randrange(len(options))]
+            cell = exit_to[cell]
+
+        cell = start
+        while not in_tree[cell]:
+            in_tree[cell] = 1
+            _carve(flat_east, flat_north, height, cell, exit_to[cell])
+            cell = exit_to[cell]
+
+    return east, north
+
+
+ALGORITHMS = {
+    'backtracker': backtracker,
+    'kruskal': kruskal,
+    'wilson': wilson
+}
+
+
+def generate_maze(width, height, algorithm='backtracker', rng=random):
+    """Generate a perfect maze with one of ALGORITHMS; returns (east, north)."""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown maze algorithm {algorithm!r}, expected one of {sorted(ALGORITHMS)}")
+    return ALGORITHMS[algorithm](width, height, rng)
+
+
+def link_tiles(bounds, rng=random):
+    """
+    Pick the passages that join the separate perfect mazes of a set of
+    tiles into one perfect maze.
+
+    bounds are the (i0, i1, j0, j1) cell ranges of the tiles, covering the
+    grid without gaps or overlaps. A random spanning tree over neighbouring
+    tiles (Kruskal's algorithm on the shuffled tile borders) gets one
+    passage per border, at a random cell along it, so there is still
+    exactly one path between any two cells.
+
+    Returns (wall, x, y) triples: the 'east' or 'north' wall of cell (x, y)
+    to remove.
+    """
+    borders = []
+    for a, (ai0, ai1, aj0, aj1) in enumerate(bounds):
+        for b, (bi0, bi1, bj0, bj1) in enumerate(bounds):
+            if ai1 == bi0 and max(aj0, bj0) < min(aj1, bj1):
+                borders.append((a, b, 'east', ai1 - 1, (max(aj0, bj0), min(aj1, bj1))))
+            elif aj1 == bj0 and max(ai0, bi0) < min(ai1, bi1):
+                borders.append((a, b, 'north', aj1 - 1, (max(ai0, bi0), min(ai1, bi1))))
+    rng.shuffle(borders)
+
+    parent = list(range(len(bounds)))
+
+    def find(tile):
+        while parent[tile] != tile:
+            parent[tile] = parent[parent[tile]]
+            tile = parent[tile]
+        return tile
+
+    links = []
+    for a, b, wall, line, (low, high) in borders:
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        parent[root_a] = root_b
+        along = rng.randrange(low, high)
+        links.append((wall, line, along) if wall == 'east' else (wall, along, line))
+    return links
+
+
+def _runs(mask):
+    """Return (rows, starts, ends) of the runs of True along axis 1 of a 2D mask (ends exclusive)."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    steps = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(steps == 1)
+    _, ends = np.nonzero(steps == -1)
+    return rows, starts, ends
+
+
+def wall_runs(east, north, cell_size, thickness, bounds=None):
+    """
+    Merge the maze walls into long rectangles (x0, y0, x1, y1) in map units.
+
+    Walls along the Y axis (including the outer west and east walls) run
+    the full length of each straight segment; walls along the X axis are
+    split where a Y wall meets them and stop at its face, so no two
+    rectangles overlap. Outer walls lie inside the maze area, inner walls
+    are centered on the grid lines.
+
+    Args:
+        bounds: Optional (i0, i1, j0, j1) cell range; only the walls owned
+            by that tile are returned (grid lines i0..i1-1, plus the last
+            line for the tile at the edge of the maze).
+    """
+    width, height = east.shape
+    if bounds is None:
+        bounds = (0, width, 0, height)
+    i0, i1, j0, j1 = bounds
+    half = thickness / 2
+    maze_width, maze_length = width * cell_size, height * cell_size
+
+    # Wall segments on every grid line, outer walls included
+    y_walls = np.ones((width + 1, height), dtype=bool)  # line X, cell row y
+    y_walls[1:, :] = east
+    x_walls = np.ones((width, height + 1), dtype=bool)  # cell column x, line Y
+    x_walls[:, 1:] = north
+
+    # Grid points touched by a Y wall: X walls end there
+    posts = np.zeros((width + 1, height + 1), dtype=bool)
+    posts[:, :-1] |= y_walls
+    posts[:, 1:] |= y_walls
+
+    def y_wall_x0(lines):
+        return np.clip(lines * cell_size - half, 0, maze_width - thickness)
+
+    def x_wall_y0(lines):
+        return np.clip(lines * cell_size - half, 0, maze_length - thickness)
+
+    rects = []
+
+    # Y walls: straight runs along each owned vertical grid line
+    line_stop = i1 + 1 if i1 == width else i1
+    lines, starts, ends = _runs(y_walls[i0:line_stop, j0:j1])
+    x0 = y_wall_x0(lines + i0)
+    rects.append(np.stack([x0, (starts + j0) * cell_size, x0 + thickness, (ends + j0) * cell_size], axis=1))
+
+    # X walls: runs along each owned horizontal grid line, broken at posts
+    line_stop = j1 + 1 if j1 == height else j1
+    segments = x_walls[i0:i1, j0:line_stop].T  # (line, column)
+    tile_posts = posts[i0:i1 + 1, j0:line_stop].T
+    previous = np.zeros_like(segments)
+    previous[:, 1:] = segments[:, :-1]
+    following = np.zeros_like(segments)
+    following[:, :-1] = segments[:, 1:]
+    run_start = segments & (~previous | tile_posts[:, :-1])
+    run_end = segments & (~following | tile_posts[:, 1:])
+    lines, starts = np.nonzero(run_start)
+    _, ends = np.nonzero(run_end)
+    ends = ends + 1
+
+    # Stop at the face of the Y wall standing on a post
+    x_start = np.where(tile_posts[lines, starts], y_wall_x0(starts + i0) + thickness, (starts + i0) * cell_size)
+    x_end = np.where(tile_posts[lines, ends], y_wall_x0(ends + i0), (ends + i0) * cell_size)
+    y0 = x_wall_y0(lines + j0)
+    rects.append(np.stack([x_start, y0, x_end, y0 + thickness], axis=1))
+
+    rects = np.concatenate(rects).astype(float)
+    return [tuple(int(v) if v.is_integer() else v for v in rect) for rect in rects[rects[:, 2] > rects[:, 0]].tolist()]
+
+
+def generate_layered_maze(width, height, levels, algorithm='backtracker', rng=random, stairs_per_level=1,
+                          stair_span=1):
+    """
+    Generate a maze of stacked levels connected by stairwells.
+
+    Every level is a perfect maze of its own and each pair of neighbouring
+    levels gets stairs_per_level stairwells; with one stairwell per pair
+    the whole 3D maze is still a perfect maze. Generation is linear in the
+    number of cells.
+
+    A stairwell runs north over stair_span cells, from (x, y) to
+    (x, y + stair_span - 1), which are connected on the lower level; the
+    cells have to be free of walls between them, so stairs longer than a
+    cell keep every level a perfect maze.
+
+    Returns (east, north, up): east and north are (levels, width, height)
+    wall arrays as for generate_maze, up[level, x, y] is True where a stair
+    starting in cell (x, y) leads from level to level + 1. A stairwell cell
+    is never reused by the next pair of levels, so stairs don't run into
+    each other.
+    """
+    east = np.empty((levels, width, height), dtype=bool)
+    north = np.empty((levels, width, height), dtype=bool)
+    for level in range(levels):
+        east[level], north[level] = generate_maze(width, height, algorithm, rng)
+
+    up = np.zeros((max(levels - 1, 0), width, height), dtype=bool)
+    count = min(stairs_per_level, width * height // 2)
+    for level in range(levels - 1):
+        taken = set()
+        if level > 0:
+            for cell in np.flatnonzero(up[level - 1]).tolist():
+                taken.update(range(cell, cell + stair_span))
+        # Flat cell indices are x * height + y, so a stairwell covers consecutive indices
+        candidates = [cell for cell in range(width * height)
+                      if cell % height + stair_span <= height
+                      and not north[level].reshape(-1)[cell:cell + stair_span - 1].any()]
+        cells = []
+        for cell in rng.sample(candidates, min(count + len(taken), len(candidates))):
+            span = range(cell, cell + stair_span)
+            if len(cells) < count and taken.isdisjoint(span):
+                cells.append(cell)
+                taken.update(span)
+        up[level].reshape(-1)[cells] = True
+
+    return east, north, up
+
+
+def cell_interior(x, y, width, height, cell_size, thickness):
+    """Return the (x0, y0, x1, y1) floor area of a cell between the walls produced by wall_runs."""
+    half = thickness / 2
+    return (
+        x * cell_size + (thickness if x == 0 else half),
+        y * cell_size + (thickness if y == 0 else half),
+        (x + 1) * cell_size - (thickness if x == width - 1 else half),
+        (y + 1) * cell_size - (thickness if y == height - 1 else half)
+    )
+
+
+def split_around(rect, holes):
+    """
+    Split the rectangle (x0, y0, x1, y1) into rectangles covering it except
+    for the holes (rectangles inside it that don't overlap each other).
+
+    A line sweeps along Y over the holes' edges, keeping the X gaps between
+    the holes it crosses. A gap only ends where a hole next to it starts or
+    ends; a hole opens two gaps where it starts and one where it ends, and
+    every gap becomes one piece, so a slab with k holes becomes at most
+    3k + 1 pieces.
+    """
+    x0, y0, x1, y1 = rect
+    # Hole ends (0) before hole starts (1) on the same line, so gaps can close and reopen there
+    events = sorted([(hole[1], 1, hole[0], hole[2]) for hole in holes] +
+                    [(hole[3], 0, hole[0], hole[2]) for hole in holes])
+    gaps = {x0: (x1, y0)}  # start -> (end, y the gap opened at)
+    starts = [x0]
+    pieces = []
+
+    def close(start, y):
+        end, opened = gaps.pop(start)
+        del starts[bisect.bisect_left(starts, start)]
+        if y > opened:
+            pieces.append((start, opened, end, y))
+        return end
+
+    def open_gap(start, end, y):
+        if start < end:
+            gaps[start] = (end, y)
+            bisect.insort(starts, start)
+
+    for y, starting, hole_x0, hole_x1 in events:
+        if starting:
+            # The gap the hole lies in splits in two
+            start = starts[bisect.bisect_right(starts, hole_x0) - 1]
+            end = close(start, y)
+            open_gap(start, hole_x0, y)
+            open_gap(hole_x1, end, y)
+        else:
+            # The gaps on both sides of the hole join across it
+            index = bisect.bisect_left(starts, hole_x0) - 1
+            start = hole_x0
+            if index >= 0 and gaps[starts[index]][0] == hole_x0:
+                start = starts[index]
+                close(start, y)
+            end = close(hole_x1, y) if hole_x1 in gaps else hole_x1
+            open_gap(start, end, y)
+
+    for start in list(starts):
+        close(start, y1)
+    return pieces
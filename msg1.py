@@ -4,9 +4,31 @@ import random
 import math
 from datetime import datetime
 
+import numpy as np
+
+import brush_ops
+import convex_brush
+import corridor_planner
+import corridor_router
+import greedy_mesh
+import layout_import
+import leak_check
+import maze_algorithms
+import overlap_report
+import parallel_tiles
+import poisson_disk
+import reachability
+import vmf_writer
+import voxelize
+from id_allocator import BOX_IDS, IdAllocator
+from spatial_index import SpatialIndex
+
+# Most areas (regions between areaportals) vbsp accepts in one map
+MAX_MAP_AREAS = 256
+
 class SourceMapGenerator:
     def __init__(self):
-        self.next_id = 1
+        self.ids = IdAllocator()
         self.entities = []
         self.solids = []
         self.visgroups = []
@@ -15,6 +37,22 @@ class SourceMapGenerator:
         self.active_visgroup = 0
         self.map_name = "generated_map"
         self.optimization_level = "standard"  # standard, high, extreme
+        self.solid_sink = None  # vmf_writer.SolidSpill or PipelinedWriter when enabled
+        self.holding_solids = False  # keep solids in memory despite the sink until their walls are carved
+        
+        # Bounds of every solid added so far, keyed by solid id, for placement queries
+        self.index = SpatialIndex()
+        self._box_bounds = {}  # bounds of boxes created but not yet added
+        self.junctions = []  # (mins, maxs) of wall openings left for carve_junctions()
+        
+        # Walkable spaces and the openings between them, for place_visibility_portals()
+        self.spaces = []  # (mins, maxs, area, kind) with kind 'room' or 'corridor'
+        self.openings = []  # (mins, maxs, axis) of doorways, corridor mouths and windows
+        self.area_count = 0
+        self.areaportals = []  # (mins, maxs) of the func_areaportal brushes placed
+        
+        # Room footprints for routing corridors around rooms
+        self.router = corridor_router.CorridorRouter()
         
         # Default textures
         self.textures = {
@@ -32,6 +70,7 @@ class SourceMapGenerator:
             'water': 'NATURE/WATERFLOOR001A',
             'nodraw': 'TOOLS/TOOLSNODRAW',
             'hint': 'TOOLS/TOOLSHINT',
+            'areaportal': 'TOOLS/TOOLSAREAPORTAL',
             'skip': 'TOOLS/TOOLSSKIP',
             'null': 'TOOLS/TOOLSNULL'
         }
@@ -51,9 +90,74 @@ class SourceMapGenerator:
         
     def _get_next_id(self):
         """Get the next available ID and increment the counter."""
-        id_val = self.next_id
-        self.next_id += 1
-        return id_val
+        return self.ids.next()
+    
+    def _set_solid_sink(self, sink):
+        """Route finished solids to sink, handing over any solids already generated."""
+        if self.solid_sink is not None:
+            raise RuntimeError("A spill or pipeline writer is already enabled")
+        self.solid_sink = sink
+        if self.solids:
+            sink.add(self.solids)
+            self.solids = []
+        return sink
+    
+    def enable_spill(self, directory=None):
+        """
+        Enable spill mode: finished solids are serialized to a temporary
+        world-section file instead of being kept in self.solids, so memory
+        stays flat regardless of brush count. Entities are still kept in
+        memory and the final VMF is assembled by concatenation in save_vmf.
+        """
+        return self._set_solid_sink(vmf_writer.SolidSpill(directory))
+    
+    def enable_pipeline(self, filename, queue_size=16):
+        """
+        Enable pipelined output: finished solids are pushed in batches into a
+        bounded queue and written to filename by a background thread while
+        the scenario keeps generating. Call save_vmf(filename) at the end to
+        write the entities and close the file. The optimization level must be
+        set before this is called, since the world block is written first.
+        """
+        writer = vmf_writer.PipelinedWriter(filename, world=self._world_properties(), queue_size=queue_size)
+        return self._set_solid_sink(writer)
+    
+    def _add_solids(self, solids):
+        """Hand finished solids to the spill/pipeline writer, or keep them in self.solids."""
+        self._index_solids(solids)
+        if self.solid_sink is not None and not self.holding_solids:
+            self.solid_sink.add(solids)
+        else:
+            self.solids.extend(solids)
+    
+    def _hold_solids(self):
+        """
+        Keep new solids in self.solids even with a spill/pipeline writer
+        enabled, so that the doorways of corridors added later can still be
+        cut into the room walls. Scenarios with corridors hold their solids
+        and call _release_solids() once every corridor is known; spill and
+        pipeline then only save memory while the map is written.
+        """
+        self.holding_solids = True
+    
+    def _release_solids(self):
+        """Carve the pending openings, then hand the held solids to the spill/pipeline writer."""
+        if self.junctions:
+            self.carve_junctions()
+        self.holding_solids = False
+        if self.solid_sink is not None and self.solids:
+            self.solid_sink.add(self.solids)
+            self.solids = []
+    
+    def _index_solids(self, solids):
+        """Register the bounds of solids in the spatial index, skipping hint and other non-solid tool brushes."""
+        for solid in solids:
+            bounds = self._box_bounds.pop(solid['id'], None)
+            if not brush_ops.is_occluder([side['material'] for side in solid['sides']]):
+                continue
+            if bounds is None:
+                bounds = brush_ops.solid_bounds(solid)
+            self.index.insert(solid['id'], *bounds)
     
     def _create_light_template(self, position, brightness=300, color=(255, 255, 255)):
         """Create a light entity template."""
@@ -174,10 +278,10 @@ class SourceMapGenerator:
         """Create a vertex at the given coordinates."""
         return f"({x} {y} {z})"
     
-    def _create_face(self, vertices, texture, u_axis, v_axis, rotation=0, u_scale=0.25, v_scale=0.25):
+    def _create_face(self, vertices, texture, u_axis, v_axis, rotation=0, u_scale=0.25, v_scale=0.25, face_id=None):
         """Create a face with the given vertices and texture."""
         face = {
-            'id': self._get_next_id(),
+            'id': face_id if face_id is not None else self._get_next_id(),
             'plane': ' '.join(vertices),
             'material': texture,
             'uaxis': f"[{u_axis[0]} {u_axis[1]} {u_axis[2]} 0] {u_scale}",
@@ -190,7 +294,9 @@ class SourceMapGenerator:
     
     def _create_box(self, mins, maxs, textures):
         """Create a cube (brush) with the given dimensions and textures."""
-        box_id = self._get_next_id()
+        # Reserve the ids of the solid and its six faces in one call
+        box_id = self.ids.reserve(BOX_IDS)
+        self._box_bounds[box_id] = (tuple(mins), tuple(maxs))
         
         # Extract coordinates
         x1, y1, z1 = mins
@@ -212,22 +318,22 @@ class SourceMapGenerator:
         faces = [
             # Bottom face (floor)
             self._create_face([v[0], v[1], v[2], v[3]], textures.get('bottom', self.textures['floor']), 
-                             [1, 0, 0], [0, -1, 0]),
+                             [1, 0, 0], [0, -1, 0], face_id=box_id + 1),
             # Top face (ceiling)
             self._create_face([v[7], v[6], v[5], v[4]], textures.get('top', self.textures['ceiling']), 
-                             [1, 0, 0], [0, -1, 0]),
+                             [1, 0, 0], [0, -1, 0], face_id=box_id + 2),
             # Front face
             self._create_face([v[4], v[5], v[1], v[0]], textures.get('front', self.textures['wall']), 
-                             [1, 0, 0], [0, 0, -1]),
+                             [1, 0, 0], [0, 0, -1], face_id=box_id + 3),
             # Back face
             self._create_face([v[3], v[2], v[6], v[7]], textures.get('back', self.textures['wall']), 
-                             [1, 0, 0], [0, 0, -1]),
+                             [1, 0, 0], [0, 0, -1], face_id=box_id + 4),
             # Left face
             self._create_face([v[0], v[3], v[7], v[4]], textures.get('left', self.textures['wall']), 
-                             [0, 1, 0], [0, 0, -1]),
+                             [0, 1, 0], [0, 0, -1], face_id=box_id + 5),
             # Right face
             self._create_face([v[5], v[6], v[2], v[1]], textures.get('right', self.textures['wall']), 
-                             [0, 1, 0], [0, 0, -1])
+                             [0, 1, 0], [0, 0, -1], face_id=box_id + 6)
         ]
         
         # Create solid (brush)
@@ -238,31 +344,70 @@ class SourceMapGenerator:
         
         return solid
     
-    def add_room(self, position, size, textures=None):
-        """Add a room to the map."""
-        if textures is None:
-            textures = {
-                'bottom': self.textures['floor'],
-                'top': self.textures['ceiling'],
-                'front': self.textures['wall'],
-                'back': self.textures['wall'],
-                'left': self.textures['wall'],
-                'right': self.textures['wall']
-            }
-        
-        x, y, z = position
-        width, length, height = size
-        
-        # Calculate inner dimensions
-        inner_mins = [x, y, z]
-        inner_maxs = [x + width, y + length, z + height]
-        
-        # Wall thickness
-        thickness = 16
-        
-        # Create outer walls (4 walls, floor and ceiling)
-        walls = []
+    def _create_convex(self, brush):
+        """Create a solid from a convex_brush brush (ramps, roof slopes)."""
+        solid_id = self.ids.reserve(1 + len(brush))
+        self._box_bounds[solid_id] = tuple(map(tuple, convex_brush.brush_bounds(brush)))
         
+        faces = [
+            self._create_face([self._create_vertex(*point) for point in points], material, u_axis, v_axis,
+                              face_id=solid_id + 1 + index)
+            for index, (points, material, u_axis, v_axis) in enumerate(convex_brush.brush_sides(brush))
+        ]
+        return {
+            'id': solid_id,
+            'sides': faces
+        }
+    
+    def _ramp_textures(self, textures):
+        """Return box face materials with the same defaults as _create_box."""
+        materials = {key: self.textures['wall'] for key in brush_ops.FACE_KEYS}
+        materials.update(bottom=self.textures['floor'], top=self.textures['ceiling'])
+        materials.update(textures)
+        return materials
+    
+    def add_ramp(self, mins, maxs, direction, textures=None):
+        """Add a ramp filling the box (mins, maxs), rising towards direction ('east', 'west', 'north' or 'south')."""
+        brush = convex_brush.ramps([(mins, maxs)], [direction], self._ramp_textures(textures or {}),
+                                   (textures or {}).get('top', self.textures['floor']))[0]
+        solid = self._create_convex(brush)
+        self._add_solids([solid])
+        return solid
+    
+    def scatter_positions(self, mins, maxs, count, spacing=96, margin=32, rng=random):
+        """
+        Pick up to count spots on the floor of the space mins..maxs
+        (mins[2] is the floor height), at least spacing apart and margin
+        away from its walls, by Poisson-disk sampling (see poisson_disk).
+        Spots where a player-sized footprint would overlap a brush in the
+        spatial index are rejected. Returns [x, y, floor] positions.
+        """
+        if count <= 0:
+            return []
+        floor = mins[2]
+        
+        def clear(x, y):
+            return not self.index.overlaps([x - 16, y - 16, floor], [x + 16, y + 16, floor + 72])
+        
+        points = poisson_disk.poisson_disk([mins[0] + margin, mins[1] + margin], [maxs[0] - margin, maxs[1] - margin],
+                                           spacing, rng, accept=clear)
+        return [[x, y, floor] for x, y in rng.sample(points, min(count, len(points)))]
+    
+    def add_voxel_grid(self, grid, origin, resolution, materials):
+        """
+        Add the brushes of a voxel grid, merged into large boxes by greedy
+        meshing (see greedy_mesh.mesh_solids for the arguments). Returns the
+        number of brushes added.
+        """
+        solids = greedy_mesh.mesh_solids(grid, origin, resolution, self._create_box, materials)
+        self._add_solids(solids)
+        return len(solids)
+    
+    def _room_textures(self, textures):
+        """
+        Return the texture dicts of a room's floor, ceiling and front, back,
+        left and right walls for the current optimization level.
+        """
         # Apply optimization - use nodraw texture for faces that aren't visible
         if self.optimization_level in ["high", "extreme"]:
             # Floor - top face visible, bottom face invisible
@@ -330,6 +475,37 @@ class SourceMapGenerator:
             left_wall_textures = {'front': textures['left'], 'back': textures['left']}
             right_wall_textures = {'front': textures['right'], 'back': textures['right']}
         
+        return (floor_textures, ceiling_textures, front_wall_textures, back_wall_textures,
+                left_wall_textures, right_wall_textures)
+    
+    def add_room(self, position, size, textures=None, key=None):
+        """Add a room to the map; key is its corridor router key (see _register_room)."""
+        if textures is None:
+            textures = {
+                'bottom': self.textures['floor'],
+                'top': self.textures['ceiling'],
+                'front': self.textures['wall'],
+                'back': self.textures['wall'],
+                'left': self.textures['wall'],
+                'right': self.textures['wall']
+            }
+        
+        x, y, z = position
+        width, length, height = size
+        
+        # Calculate inner dimensions
+        inner_mins = [x, y, z]
+        inner_maxs = [x + width, y + length, z + height]
+        
+        # Wall thickness
+        thickness = 16
+        
+        # Create outer walls (4 walls, floor and ceiling)
+        walls = []
+        
+        (floor_textures, ceiling_textures, front_wall_textures, back_wall_textures,
+         left_wall_textures, right_wall_textures) = self._room_textures(textures)
+        
         # Floor
         floor = self._create_box(
             [inner_mins[0] - thickness, inner_mins[1] - thickness, inner_mins[2] - thickness],
@@ -378,143 +554,280 @@ class SourceMapGenerator:
         )
         walls.append(right_wall)
         
-        # Add hint brushes for visibility optimization
-        if self.optimization_level == "extreme":
-            # Add hint brushes at strategic locations
-            hint_thickness = 1
-            
-            # Horizontal hint brush in the middle of the room
-            hint_h = self._create_box(
-                [inner_mins[0], inner_mins[1] + length/2 - hint_thickness/2, inner_mins[2]],
-                [inner_maxs[0], inner_mins[1] + length/2 + hint_thickness/2, inner_maxs[2]],
-                {'front': self.textures['hint'], 'back': self.textures['hint']}
-            )
-            walls.append(hint_h)
-            
-            # Vertical hint brush in the middle of the room
-            hint_v = self._create_box(
-                [inner_mins[0] + width/2 - hint_thickness/2, inner_mins[1], inner_mins[2]],
-                [inner_mins[0] + width/2 + hint_thickness/2, inner_maxs[1], inner_maxs[2]],
-                {'front': self.textures['hint'], 'back': self.textures['hint']}
-            )
-            walls.append(hint_v)
-        
         # Add all walls to the solids list
-        self.solids.extend(walls)
+        self._add_solids(walls)
         
         # Return the inner dimensions of the room
-        return {
-            'mins': inner_mins,
-            'maxs': inner_maxs,
-            'center': [
-                (inner_mins[0] + inner_maxs[0]) / 2,
-                (inner_mins[1] + inner_maxs[1]) / 2,
-                (inner_mins[2] + inner_maxs[2]) / 2
-            ]
-        }
+        return self._register_room(inner_mins, inner_maxs, thickness, key)
     
-    def add_corridor(self, room1, room2, width=96, height=128, textures=None):
-        """Add a corridor connecting two rooms."""
+    def add_room_with_doorway(self, position, size, textures=None, doorways=None, door_width=96, door_height=128):
+        """
+        Add a room with doorway cutouts in the walls.
+        
+        doorways maps 'south', 'north', 'west' and 'east' (the Y-, Y+, X- and
+        X+ walls) to True for a door in the middle of that wall, to the
+        coordinate of the door center along the wall (X for south/north, Y
+        for west/east), or to a list of such coordinates for several doors.
+        Walls with doorways are cut into the fewest boxes around the openings
+        (see brush_ops.subtract).
+        """
         if textures is None:
             textures = {
                 'bottom': self.textures['floor'],
                 'top': self.textures['ceiling'],
-                'wall': self.textures['wall']
+                'front': self.textures['wall'],
+                'back': self.textures['wall'],
+                'left': self.textures['wall'],
+                'right': self.textures['wall']
             }
+        if doorways is None:
+            doorways = {}
         
-        # Get room centers
-        c1 = room1['center']
-        c2 = room2['center']
+        x, y, z = position
+        width, length, height = size
+        inner_mins = [x, y, z]
+        inner_maxs = [x + width, y + length, z + height]
+        thickness = 16
         
-        # Determine the primary direction of the corridor
-        dx = abs(c2[0] - c1[0])
-        dy = abs(c2[1] - c1[1])
+        (floor_textures, ceiling_textures, front_wall_textures, back_wall_textures,
+         left_wall_textures, right_wall_textures) = self._room_textures(textures)
+        
+        walls = [
+            self._create_box(
+                [inner_mins[0] - thickness, inner_mins[1] - thickness, inner_mins[2] - thickness],
+                [inner_maxs[0] + thickness, inner_maxs[1] + thickness, inner_mins[2]],
+                floor_textures
+            ),
+            self._create_box(
+                [inner_mins[0] - thickness, inner_mins[1] - thickness, inner_maxs[2]],
+                [inner_maxs[0] + thickness, inner_maxs[1] + thickness, inner_maxs[2] + thickness],
+                ceiling_textures
+            )
+        ]
         
-        corridor_mins = [0, 0, 0]
-        corridor_maxs = [0, 0, 0]
+        # (side, textures, wall mins, wall maxs, axis the wall runs along)
+        sides = [
+            ('south', front_wall_textures,
+             [inner_mins[0] - thickness, inner_mins[1] - thickness, inner_mins[2]],
+             [inner_maxs[0] + thickness, inner_mins[1], inner_maxs[2]], 0),
+            ('north', back_wall_textures,
+             [inner_mins[0] - thickness, inner_maxs[1], inner_mins[2]],
+             [inner_maxs[0] + thickness, inner_maxs[1] + thickness, inner_maxs[2]], 0),
+            ('west', left_wall_textures,
+             [inner_mins[0] - thickness, inner_mins[1], inner_mins[2]],
+             [inner_mins[0], inner_maxs[1], inner_maxs[2]], 1),
+            ('east', right_wall_textures,
+             [inner_maxs[0], inner_mins[1], inner_mins[2]],
+             [inner_maxs[0] + thickness, inner_maxs[1], inner_maxs[2]], 1)
+        ]
         
-        # Create corridor along the primary axis
-        if dx > dy:  # X-axis corridor
-            corridor_mins = [
-                min(c1[0], c2[0]),
-                min(c1[1], c2[1]) - width / 2,
-                min(room1['mins'][2], room2['mins'][2])
-            ]
-            corridor_maxs = [
-                max(c1[0], c2[0]),
-                max(c1[1], c2[1]) + width / 2,
-                min(room1['mins'][2], room2['mins'][2]) + height
-            ]
-        else:  # Y-axis corridor
-            corridor_mins = [
-                min(c1[0], c2[0]) - width / 2,
-                min(c1[1], c2[1]),
-                min(room1['mins'][2], room2['mins'][2])
-            ]
-            corridor_maxs = [
-                max(c1[0], c2[0]) + width / 2,
-                max(c1[1], c2[1]),
-                min(room1['mins'][2], room2['mins'][2]) + height
-            ]
+        for side, wall_textures, wall_mins, wall_maxs, axis in sides:
+            doors = doorways.get(side)
+            if doors is None or doors is False:
+                doors = []
+            elif doors is True:
+                doors = [(inner_mins[axis] + inner_maxs[axis]) / 2]
+            elif not isinstance(doors, (list, tuple)):
+                doors = [doors]
+            
+            holes = []
+            for center in doors:
+                hole_mins, hole_maxs = list(wall_mins), list(wall_maxs)
+                hole_mins[axis], hole_maxs[axis] = center - door_width / 2, center + door_width / 2
+                hole_maxs[2] = inner_mins[2] + door_height
+                holes.append(hole_mins + hole_maxs)
+                self.openings.append((hole_mins, hole_maxs, 1 - axis))
+            
+            for piece in brush_ops.subtract(wall_mins + wall_maxs, holes):
+                walls.append(self._create_box(list(piece[:3]), list(piece[3:]), wall_textures))
         
-        # Wall thickness
+        self._add_solids(walls)
+        
+        return self._register_room(inner_mins, inner_maxs, thickness)
+    
+    def _new_area(self):
+        """Return a fresh area number for place_visibility_portals()."""
+        self.area_count += 1
+        return self.area_count - 1
+    
+    def _reserve_room(self, key, inner_mins, inner_maxs, thickness):
+        """Add a room's footprint, walls included, to the corridor router so corridors route around it."""
+        self.router.add_room(key, inner_mins, inner_maxs,
+                             [inner_mins[0] - thickness, inner_mins[1] - thickness, inner_mins[2] - thickness],
+                             [inner_maxs[0] + thickness, inner_maxs[1] + thickness, inner_maxs[2] + thickness])
+    
+    def _register_room(self, inner_mins, inner_maxs, thickness, key=None):
+        """
+        Register a room with the corridor router and return its description.
+        A key reserved earlier (see _reserve_room) is kept; otherwise the
+        room gets the next free one.
+        """
+        if key is None:
+            key = len(self.router.inner)
+        self.spaces.append((list(inner_mins), list(inner_maxs), self._new_area(), 'room'))
+        self._reserve_room(key, inner_mins, inner_maxs, thickness)
+        return {
+            'key': key,
+            'mins': inner_mins,
+            'maxs': inner_maxs,
+            'center': [
+                (inner_mins[0] + inner_maxs[0]) / 2,
+                (inner_mins[1] + inner_maxs[1]) / 2,
+                (inner_mins[2] + inner_maxs[2]) / 2
+            ]
+        }
+    
+    def _add_corridor_segment(self, mins, maxs, axis, textures):
+        """
+        Add the floor, ceiling and side walls around the corridor space
+        mins..maxs, which runs along axis (0 for X, 1 for Y).
+        """
         thickness = 16
+        self.spaces.append((list(mins), list(maxs), self._new_area(), 'corridor'))
         
         # Create corridor walls, floor, and ceiling
         corridor_walls = []
         
         # Floor
         floor = self._create_box(
-            [corridor_mins[0], corridor_mins[1], corridor_mins[2] - thickness],
-            [corridor_maxs[0], corridor_maxs[1], corridor_mins[2]],
+            [mins[0], mins[1], mins[2] - thickness],
+            [maxs[0], maxs[1], mins[2]],
             {'top': textures['bottom'], 'bottom': textures['bottom']}
         )
         corridor_walls.append(floor)
         
         # Ceiling
         ceiling = self._create_box(
-            [corridor_mins[0], corridor_mins[1], corridor_maxs[2]],
-            [corridor_maxs[0], corridor_maxs[1], corridor_maxs[2] + thickness],
+            [mins[0], mins[1], maxs[2]],
+            [maxs[0], maxs[1], maxs[2] + thickness],
             {'top': textures['top'], 'bottom': textures['top']}
         )
         corridor_walls.append(ceiling)
         
         # Walls (depending on orientation)
-        if dx > dy:  # X-axis corridor
+        if axis == 0:  # X-axis corridor
             # North wall
             north_wall = self._create_box(
-                [corridor_mins[0], corridor_maxs[1], corridor_mins[2]],
-                [corridor_maxs[0], corridor_maxs[1] + thickness, corridor_maxs[2]],
+                [mins[0], maxs[1], mins[2]],
+                [maxs[0], maxs[1] + thickness, maxs[2]],
                 {'front': textures['wall'], 'back': textures['wall']}
             )
             corridor_walls.append(north_wall)
             
             # South wall
             south_wall = self._create_box(
-                [corridor_mins[0], corridor_mins[1] - thickness, corridor_mins[2]],
-                [corridor_maxs[0], corridor_mins[1], corridor_maxs[2]],
+                [mins[0], mins[1] - thickness, mins[2]],
+                [maxs[0], mins[1], maxs[2]],
                 {'front': textures['wall'], 'back': textures['wall']}
             )
             corridor_walls.append(south_wall)
         else:  # Y-axis corridor
             # East wall
             east_wall = self._create_box(
-                [corridor_maxs[0], corridor_mins[1], corridor_mins[2]],
-                [corridor_maxs[0] + thickness, corridor_maxs[1], corridor_maxs[2]],
+                [maxs[0], mins[1], mins[2]],
+                [maxs[0] + thickness, maxs[1], maxs[2]],
                 {'front': textures['wall'], 'back': textures['wall']}
             )
             corridor_walls.append(east_wall)
             
             # West wall
             west_wall = self._create_box(
-                [corridor_mins[0] - thickness, corridor_mins[1], corridor_mins[2]],
-                [corridor_mins[0], corridor_maxs[1], corridor_maxs[2]],
+                [mins[0] - thickness, mins[1], mins[2]],
+                [mins[0], maxs[1], maxs[2]],
                 {'front': textures['wall'], 'back': textures['wall']}
             )
             corridor_walls.append(west_wall)
         
         # Add all corridor walls to the solids list
-        self.solids.extend(corridor_walls)
+        self._add_solids(corridor_walls)
+        return corridor_walls
+    
+    def add_corridor(self, room1, room2, width=96, height=128, textures=None, walls=(None, None)):
+        """
+        Add a corridor connecting two rooms.
+        
+        Rooms created by add_room or add_room_with_doorway are connected by
+        a corridor routed around the other rooms and corridors (see
+        corridor_router), running from wall to wall; its width is capped at
+        the router's cell size minus the walls. Other rooms, or rooms the
+        router finds no way between, get a straight corridor along the axis
+        with the larger offset: from wall to wall where the rooms face each
+        other over at least the corridor width, otherwise between the room
+        centers.
+        
+        walls optionally names the wall of each room the routed corridor
+        has to use, as an index into corridor_router.STEPS (0 east, 1 north,
+        2 west, 3 south).
+        
+        The openings where the corridor meets the room walls are recorded
+        and cut by carve_junctions().
+        """
+        if textures is None:
+            textures = {
+                'bottom': self.textures['floor'],
+                'top': self.textures['ceiling'],
+                'wall': self.textures['wall']
+            }
+        
+        if 'key' in room1 and 'key' in room2:
+            corridor = self._add_routed_corridor(room1, room2, width, height, textures, walls)
+            if corridor is not None:
+                return corridor
+        
+        # Get room centers
+        c1 = room1['center']
+        c2 = room2['center']
+        
+        # Determine the primary direction of the corridor
+        dx = abs(c2[0] - c1[0])
+        dy = abs(c2[1] - c1[1])
+        
+        corridor_mins = [0, 0, 0]
+        corridor_maxs = [0, 0, 0]
+        
+        # Create corridor along the primary axis
+        if dx > dy:  # X-axis corridor
+            corridor_mins = [
+                min(c1[0], c2[0]),
+                min(c1[1], c2[1]) - width / 2,
+                min(room1['mins'][2], room2['mins'][2])
+            ]
+            corridor_maxs = [
+                max(c1[0], c2[0]),
+                max(c1[1], c2[1]) + width / 2,
+                min(room1['mins'][2], room2['mins'][2]) + height
+            ]
+        else:  # Y-axis corridor
+            corridor_mins = [
+                min(c1[0], c2[0]) - width / 2,
+                min(c1[1], c2[1]),
+                min(room1['mins'][2], room2['mins'][2])
+            ]
+            corridor_maxs = [
+                max(c1[0], c2[0]) + width / 2,
+                max(c1[1], c2[1]),
+                min(room1['mins'][2], room2['mins'][2]) + height
+            ]
+        
+        # Run straight from wall to wall when the rooms face each other across a gap wide enough
+        axis = 0 if dx > dy else 1
+        other = 1 - axis
+        thickness = 16
+        near, far = sorted((room1, room2), key=lambda room: room['center'][axis])
+        start, end = near['maxs'][axis] + thickness, far['mins'][axis] - thickness
+        low = max(room1['mins'][other], room2['mins'][other]) + width / 2
+        high = min(room1['maxs'][other], room2['maxs'][other]) - width / 2
+        if start < end and low <= high:
+            center = min(max((c1[other] + c2[other]) / 2, low), high)
+            corridor_mins[axis], corridor_maxs[axis] = start, end
+            corridor_mins[other], corridor_maxs[other] = center - width / 2, center + width / 2
+            mouth_mins, mouth_maxs = list(corridor_mins), list(corridor_maxs)
+            mouth_mins[axis] -= thickness
+            mouth_maxs[axis] += thickness
+            for room in (room1, room2):
+                self._add_junction(room, mouth_mins, mouth_maxs, axis)
+        
+        self._add_corridor_segment(corridor_mins, corridor_maxs, axis, textures)
         
         return {
             'mins': corridor_mins,
@@ -526,19 +839,104 @@ class SourceMapGenerator:
             ]
         }
     
+    def _add_routed_corridor(self, room1, room2, width, height, textures, walls=(None, None)):
+        """Route a corridor between two registered rooms; returns None if there is no way through."""
+        thickness = 16
+        router = self.router
+        width = min(width, router.cell_size - 2 * thickness)
+        path = router.route(room1['key'], room2['key'], width, walls)
+        if path is None:
+            return None
+        
+        faces = (router.wall_face(room1['key'], path[1], path[0]),
+                 router.wall_face(room2['key'], path[-2], path[-1]))
+        floor_z = min(room1['mins'][2], room2['mins'][2])
+        part_textures = {
+            'floor': {'top': textures['bottom'], 'bottom': textures['bottom']},
+            'ceiling': {'top': textures['top'], 'bottom': textures['top']},
+            'wall': {side: textures['wall'] for side in ('front', 'back', 'left', 'right')}
+        }
+        
+        boxes = corridor_router.corridor_boxes(path, faces, width, height, floor_z, router.cell_size, thickness)
+        self._add_solids([self._create_box(mins, maxs, part_textures[part]) for mins, maxs, part in boxes])
+        area = self._new_area()
+        self.spaces.extend((mins, maxs, area, 'corridor')
+                           for mins, maxs in corridor_router.corridor_spaces(path, faces, width, height, floor_z,
+                                                                             router.cell_size))
+        
+        # The corridor space from the end cells to the inside of the room walls
+        size = router.cell_size
+        for room, cell, room_cell, face in ((room1, path[1], path[0], faces[0]), (room2, path[-2], path[-1], faces[1])):
+            axis = 0 if room_cell[0] != cell[0] else 1
+            inside = face + (room_cell[axis] - cell[axis]) * thickness
+            center = [(cell[0] + 0.5) * size, (cell[1] + 0.5) * size]
+            mouth_mins = [center[0] - width / 2, center[1] - width / 2, floor_z]
+            mouth_maxs = [center[0] + width / 2, center[1] + width / 2, floor_z + height]
+            mouth_mins[axis], mouth_maxs[axis] = min(center[axis], inside), max(center[axis], inside)
+            self._add_junction(room, mouth_mins, mouth_maxs, axis)
+        
+        points = [[(i + 0.5) * size, (j + 0.5) * size, floor_z] for i, j in path[1:-1]]
+        corridor_mins = [min(box[0][k] for box in boxes) for k in range(3)]
+        corridor_maxs = [max(box[1][k] for box in boxes) for k in range(3)]
+        corridor_mins[2], corridor_maxs[2] = floor_z, floor_z + height
+        return {
+            'mins': corridor_mins,
+            'maxs': corridor_maxs,
+            'center': [
+                (corridor_mins[0] + corridor_maxs[0]) / 2,
+                (corridor_mins[1] + corridor_maxs[1]) / 2,
+                (corridor_mins[2] + corridor_maxs[2]) / 2
+            ],
+            'path': points
+        }
+    
+    def _add_junction(self, room, mins, maxs, axis, thickness=16):
+        """
+        Record the opening where the corridor space mins..maxs, running along
+        axis, passes through the wall of room on the side it comes from.
+        """
+        opening_mins = [max(mins[k], room['mins'][k]) for k in range(3)]
+        opening_maxs = [min(maxs[k], room['maxs'][k]) for k in range(3)]
+        if mins[axis] < room['mins'][axis]:
+            opening_mins[axis], opening_maxs[axis] = room['mins'][axis] - thickness, room['mins'][axis]
+        else:
+            opening_mins[axis], opening_maxs[axis] = room['maxs'][axis], room['maxs'][axis] + thickness
+        
+        if (mins[axis] <= opening_mins[axis] and opening_maxs[axis] <= maxs[axis]
+                and all(opening_mins[k] < opening_maxs[k] for k in range(3))):
+            self.junctions.append((opening_mins, opening_maxs))
+            self.openings.append((opening_mins, opening_maxs, axis))
+    
     def add_window(self, wall_face, position, size=(64, 64), texture=None):
-        """Add a window to a wall."""
+        """
+        Add a window to a wall.
+        
+        wall_face is the face of the wall the window is in: 'front' or 'back'
+        for walls along X, 'left' or 'right' for walls along Y. The opening is
+        cut through the wall brushes around position by carve_junctions(),
+        which the scenarios run when they finish; the pane fills the middle
+        of the opening.
+        """
         if texture is None:
             texture = self.textures['glass']
         
-        # Create window brush
-        window = self._create_box(
-            [position[0] - size[0] / 2, position[1] - 4, position[2] - size[1] / 2],
-            [position[0] + size[0] / 2, position[1] + 4, position[2] + size[1] / 2],
-            {'front': texture, 'back': texture, 'top': texture, 'bottom': texture, 'left': texture, 'right': texture}
-        )
-        
-        self.solids.append(window)
+        axis = 0 if wall_face in ('left', 'right') else 1  # across the wall
+        along = 1 - axis
+        mins = [0, 0, position[2] - size[1] / 2]
+        maxs = [0, 0, position[2] + size[1] / 2]
+        mins[along], maxs[along] = position[along] - size[0] / 2, position[along] + size[0] / 2
+        mins[axis], maxs[axis] = position[axis] - 4, position[axis] + 4
+        
+        # Open every wall the pane sits in over its full thickness
+        for key in self.index.query_box(mins, maxs):
+            wall_mins, wall_maxs = self.index.bounds(key)
+            opening_mins, opening_maxs = list(mins), list(maxs)
+            opening_mins[axis], opening_maxs[axis] = wall_mins[axis], wall_maxs[axis]
+            self.junctions.append((opening_mins, opening_maxs))
+            self.openings.append((opening_mins, opening_maxs, axis))
+        
+        window = self._create_box(mins, maxs, {face: texture for face in brush_ops.FACE_KEYS})
+        self._add_solids([window])
     
     def add_door(self, position, size=(64, 4, 128), angles=(0, 0, 0)):
         """Add a door entity to the map."""
@@ -604,21 +1002,27 @@ class SourceMapGenerator:
         
         self.entities.append(worldspawn)
     
-    def create_simple_room_scenario(self, room_count=3, connect_all=True):
-        """Create a simple scenario with multiple rooms connected by corridors."""
+    def create_simple_room_scenario(self, room_count=3, connect_all=True, extra_corridors=0):
+        """
+        Create a simple scenario with multiple rooms connected by corridors.
+        
+        The corridors form a minimum spanning tree over the nearest
+        neighbours of each room, plus extra_corridors short ones that
+        close loops (see corridor_planner).
+        """
         rooms = []
         base_room_size = [512, 512, 256]  # width, length, height
         base_position = [0, 0, 64]  # starting position
+        self._hold_solids()
+        
+        wall_thickness = 16
+        room_spacing = 2 * self.router.cell_size  # minimum gap between rooms, leaves a free row of routing cells
         
         # Create rooms in a somewhat circular pattern
         for i in range(room_count):
             angle = (2 * math.pi * i) / room_count
             distance = 1024  # Distance from center
             
-            # Calculate position for this room
-            pos_x = base_position[0] + distance * math.cos(angle)
-            pos_y = base_position[1] + distance * math.sin(angle)
-            
             # Randomize room size slightly
             size_factor = random.uniform(0.8, 1.2)
             room_size = [
@@ -627,6 +1031,20 @@ class SourceMapGenerator:
                 base_room_size[2]
             ]
             
+            # Push the room outwards along its ray until it is clear of existing geometry
+            while True:
+                pos_x = base_position[0] + distance * math.cos(angle)
+                pos_y = base_position[1] + distance * math.sin(angle)
+                
+                margin = wall_thickness + room_spacing
+                if not self.index.overlaps(
+                    [pos_x - margin, pos_y - margin, base_position[2] - margin],
+                    [pos_x + room_size[0] + margin, pos_y + room_size[1] + margin,
+                     base_position[2] + room_size[2] + margin]
+                ):
+                    break
+                distance += base_room_size[0] / 2
+            
             # Randomize textures
             textures = {
                 'bottom': random.choice([self.textures['floor'], self.textures['concrete'], self.textures['dirt']]),
@@ -648,35 +1066,21 @@ class SourceMapGenerator:
                 room['center'][2] + 100
             ], brightness=300, color=(255, 255, 200))
             
-            # Add some items
+            # Add some items and NPCs, spread over the floor
+            spawns = []
             if random.random() > 0.5:
-                self.add_health([
-                    room['center'][0] + random.uniform(-100, 100),
-                    room['center'][1] + random.uniform(-100, 100),
-                    room['center'][2] + 16
-                ])
-            
+                spawns.append(self.add_health)
             if random.random() > 0.5:
-                self.add_ammo([
-                    room['center'][0] + random.uniform(-100, 100),
-                    room['center'][1] + random.uniform(-100, 100),
-                    room['center'][2] + 16
-                ])
-            
-            # Add NPCs
+                spawns.append(self.add_ammo)
             if random.random() > 0.7:
-                self.add_npc([
-                    room['center'][0] + random.uniform(-100, 100),
-                    room['center'][1] + random.uniform(-100, 100),
-                    room['center'][2] + 16
-                ])
+                spawns.append(self.add_npc)
+            for add, (x, y, z) in zip(spawns, self.scatter_positions(room['mins'], room['maxs'], len(spawns))):
+                add([x, y, z + 16])
         
         # Connect rooms with corridors if requested
         if connect_all and len(rooms) > 1:
-            for i in range(len(rooms)):
-                # Connect each room to the next room
-                next_room = (i + 1) % len(rooms)  # Circular connection for the last room
-                
+            links = corridor_planner.plan_corridors([room['center'] for room in rooms], extra_corridors)
+            for i, next_room in links:
                 # Randomize corridor width slightly
                 corridor_width = random.uniform(80, 120)
                 corridor_height = random.uniform(120, 160)
@@ -691,6 +1095,9 @@ class SourceMapGenerator:
                 # Add corridor
                 self.add_corridor(rooms[i], rooms[next_room], width=corridor_width, height=corridor_height, textures=corridor_textures)
         
+        # Open the room walls where the corridors arrive
+        self._release_solids()
+        
         # Add player start to the first room
         if rooms:
             self.add_player_start([
@@ -701,8 +1108,8 @@ class SourceMapGenerator:
         
         return rooms
 
-    def create_arena_scenario(self, size=(2048, 2048, 512), npc_count=6):
-        """Create a large arena for combat scenarios."""
+    def _create_arena_shell(self, size):
+        """Create the arena room with its player start and lights."""
         # Create a large open space
         arena_textures = {
             'bottom': self.textures['concrete'],
@@ -715,33 +1122,6 @@ class SourceMapGenerator:
         
         arena = self.add_room([0, 0, 64], size, arena_textures)
         
-        # Add some cover objects
-        cover_count = random.randint(5, 10)
-        for i in range(cover_count):
-            angle = (2 * math.pi * i) / cover_count
-            distance = random.uniform(300, size[0] / 2 - 100)
-            
-            cover_x = arena['center'][0] + distance * math.cos(angle)
-            cover_y = arena['center'][1] + distance * math.sin(angle)
-            
-            # Randomize cover size
-            cover_size = [
-                random.uniform(64, 128),
-                random.uniform(64, 128),
-                random.uniform(64, 128)
-            ]
-            
-            # Create a box for cover
-            cover = self._create_box(
-                [cover_x - cover_size[0]/2, cover_y - cover_size[1]/2, arena['mins'][2]],
-                [cover_x + cover_size[0]/2, cover_y + cover_size[1]/2, arena['mins'][2] + cover_size[2]],
-                {'front': self.textures['concrete'], 'back': self.textures['concrete'], 
-                 'left': self.textures['concrete'], 'right': self.textures['concrete'],
-                 'top': self.textures['concrete'], 'bottom': self.textures['concrete']}
-            )
-            
-            self.solids.append(cover)
-        
         # Add player start
         self.add_player_start([
             arena['center'][0],
@@ -764,6 +1144,50 @@ class SourceMapGenerator:
                 arena['center'][2] + 200
             ], brightness=500, color=(255, 255, 200))
         
+        return arena
+    
+    def create_arena_scenario(self, size=(2048, 2048, 512), npc_count=6):
+        """Create a large arena for combat scenarios."""
+        arena = self._create_arena_shell(size)
+        
+        # Add some cover objects
+        cover_count = random.randint(5, 10)
+        for i in range(cover_count):
+            angle = (2 * math.pi * i) / cover_count
+            
+            # Retry a few random spots along the ray if the box would collide
+            for attempt in range(8):
+                distance = random.uniform(300, size[0] / 2 - 100)
+                
+                cover_x = arena['center'][0] + distance * math.cos(angle)
+                cover_y = arena['center'][1] + distance * math.sin(angle)
+                
+                # Randomize cover size
+                cover_size = [
+                    random.uniform(64, 128),
+                    random.uniform(64, 128),
+                    random.uniform(64, 128)
+                ]
+                
+                if not self.index.overlaps(
+                    [cover_x - cover_size[0]/2, cover_y - cover_size[1]/2, arena['mins'][2]],
+                    [cover_x + cover_size[0]/2, cover_y + cover_size[1]/2, arena['mins'][2] + cover_size[2]]
+                ):
+                    break
+            else:
+                continue
+            
+            # Create a box for cover
+            cover = self._create_box(
+                [cover_x - cover_size[0]/2, cover_y - cover_size[1]/2, arena['mins'][2]],
+                [cover_x + cover_size[0]/2, cover_y + cover_size[1]/2, arena['mins'][2] + cover_size[2]],
+                {'front': self.textures['concrete'], 'back': self.textures['concrete'], 
+                 'left': self.textures['concrete'], 'right': self.textures['concrete'],
+                 'top': self.textures['concrete'], 'bottom': self.textures['concrete']}
+            )
+            
+            self._add_solids([cover])
+        
         # Add NPCs in a circular pattern
         for i in range(npc_count):
             angle = (2 * math.pi * i) / npc_count
@@ -790,200 +1214,914 @@ class SourceMapGenerator:
         
         return arena
 
-    def create_maze_scenario(self, maze_size=5, cell_size=256):
-        """Create a simple maze-like structure."""
+    def create_maze_scenario(self, maze_size=5, cell_size=256, algorithm='backtracker'):
+        """
+        Create a perfect maze of maze_size x maze_size cells.
+        
+        algorithm is one of maze_algorithms.ALGORITHMS: 'backtracker' (long
+        winding corridors), 'kruskal' (many short dead ends) or 'wilson'
+        (uniformly random, unbiased).
+        """
+        self.create_maze_tile((0, maze_size, 0, maze_size), maze_size, cell_size, algorithm=algorithm)
+        
+        wall_thickness = 16
+        return {
+            'mins': [0, 0, 0],
+            'maxs': [maze_size * cell_size, maze_size * cell_size, wall_thickness + cell_size],
+            'center': [maze_size * cell_size / 2, maze_size * cell_size / 2, (wall_thickness + cell_size) / 2]
+        }
+    
+    def create_maze_tile(self, bounds, maze_size=5, cell_size=256, algorithm='backtracker', walls=None,
+                         links=None, rng=random):
+        """
+        Create the part of the maze covering cells [i0, i1) x [j0, j1).
+        
+        A maze generated as a single tile covering the whole grid is the plain
+        maze scenario; parallel generation builds one tile per worker. walls
+        is the (east, north) wall arrays of the whole maze. Without it, a
+        maze of the tile's cells is generated with algorithm, walled off from
+        the other tiles except for the passages in links (see
+        maze_algorithms.link_tiles), so every worker generates its own part.
+        Random choices are drawn from rng.
+        """
+        i0, i1, j0, j1 = bounds
         wall_thickness = 16
+        tile_cells = (i1 - i0) * (j1 - j0)
+        share = tile_cells / (maze_size * maze_size)
         
-        # Create the base floor and ceiling
+        # Create the base floor and ceiling under this tile
         floor = self._create_box(
-            [0, 0, 0],
-            [maze_size * cell_size, maze_size * cell_size, wall_thickness],
+            [i0 * cell_size, j0 * cell_size, 0],
+            [i1 * cell_size, j1 * cell_size, wall_thickness],
             {'top': self.textures['floor'], 'bottom': self.textures['floor']}
         )
-        self.solids.append(floor)
+        self._add_solids([floor])
         
         ceiling = self._create_box(
-            [0, 0, wall_thickness + cell_size],
-            [maze_size * cell_size, maze_size * cell_size, wall_thickness * 2 + cell_size],
+            [i0 * cell_size, j0 * cell_size, wall_thickness + cell_size],
+            [i1 * cell_size, j1 * cell_size, wall_thickness * 2 + cell_size],
             {'top': self.textures['ceiling'], 'bottom': self.textures['ceiling']}
         )
-        self.solids.append(ceiling)
-        
-        # Create maze walls
-        # This is a very simple maze generation - for a real maze, you would use
-        # algorithms like Depth-First Search or Prim's algorithm
-        for i in range(maze_size):
-            for j in range(maze_size):
-                # Add some random walls
-                if random.random() > 0.7 and i < maze_size - 1:
-                    # Vertical wall
-                    wall = self._create_box(
-                        [(i+1) * cell_size - wall_thickness/2, j * cell_size, wall_thickness],
-                        [(i+1) * cell_size + wall_thickness/2, (j+1) * cell_size, wall_thickness + cell_size],
-                        {'front': self.textures['wall'], 'back': self.textures['wall']}
-                    )
-                    self.solids.append(wall)
-                
-                if random.random() > 0.7 and j < maze_size - 1:
-                    # Horizontal wall
-                    wall = self._create_box(
-                        [i * cell_size, (j+1) * cell_size - wall_thickness/2, wall_thickness],
-                        [(i+1) * cell_size, (j+1) * cell_size + wall_thickness/2, wall_thickness + cell_size],
-                        {'front': self.textures['wall'], 'back': self.textures['wall']}
-                    )
-                    self.solids.append(wall)
-        
-        # Add outer walls
-        for i in range(maze_size):
-            # North wall
-            wall = self._create_box(
-                [i * cell_size, 0, wall_thickness],
-                [(i+1) * cell_size, wall_thickness, wall_thickness + cell_size],
-                {'front': self.textures['wall'], 'back': self.textures['wall']}
-            )
-            self.solids.append(wall)
-            
-            # South wall
-            wall = self._create_box(
-                [i * cell_size, maze_size * cell_size - wall_thickness, wall_thickness],
-                [(i+1) * cell_size, maze_size * cell_size, wall_thickness + cell_size],
-                {'front': self.textures['wall'], 'back': self.textures['wall']}
-            )
-            self.solids.append(wall)
-            
-            # West wall
-            wall = self._create_box(
-                [0, i * cell_size, wall_thickness],
-                [wall_thickness, (i+1) * cell_size, wall_thickness + cell_size],
-                {'front': self.textures['wall'], 'back': self.textures['wall']}
-            )
-            self.solids.append(wall)
-            
-            # East wall
-            wall = self._create_box(
-                [maze_size * cell_size - wall_thickness, i * cell_size, wall_thickness],
-                [maze_size * cell_size, (i+1) * cell_size, wall_thickness + cell_size],
-                {'front': self.textures['wall'], 'back': self.textures['wall']}
-            )
-            self.solids.append(wall)
-        
-        # Add player start
-        self.add_player_start([
-            cell_size / 2, 
-            cell_size / 2, 
-            wall_thickness + 32
+        self._add_solids([ceiling])
+        
+        # Create maze walls: a perfect maze, with collinear wall segments
+        # merged into long brushes
+        if walls is None and links is None:
+            walls = maze_algorithms.generate_maze(maze_size, maze_size, algorithm, rng)
+        elif walls is None:
+            walls = maze_algorithms.new_walls(maze_size, maze_size)
+            walls[0][i0:i1, j0:j1], walls[1][i0:i1, j0:j1] = maze_algorithms.generate_maze(i1 - i0, j1 - j0,
+                                                                                          algorithm, rng)
+            for wall, x, y in links:
+                walls[0 if wall == 'east' else 1][x, y] = False
+        east, north = walls
+        
+        wall_textures = {'front': self.textures['wall'], 'back': self.textures['wall']}
+        self._add_solids([
+            self._create_box([x0, y0, wall_thickness], [x1, y1, wall_thickness + cell_size], wall_textures)
+            for x0, y0, x1, y1 in maze_algorithms.wall_runs(east, north, cell_size, wall_thickness, bounds)
         ])
         
+        # Add player start in the first cell
+        if i0 == 0 and j0 == 0:
+            self.add_player_start([
+                cell_size / 2, 
+                cell_size / 2, 
+                wall_thickness + 32
+            ])
+        
         # Add some lights
-        for i in range(maze_size):
-            for j in range(maze_size):
-                if random.random() > 0.7:
+        for i in range(i0, i1):
+            for j in range(j0, j1):
+                if rng.random() > 0.7:
                     self.add_light([
                         (i + 0.5) * cell_size,
                         (j + 0.5) * cell_size,
                         wall_thickness + cell_size - 32
                     ], brightness=200, color=(255, 255, 200))
         
-        # Add some items
-        for i in range(5):
-            item_x = random.randint(1, maze_size - 1) * cell_size + cell_size / 2
-            item_y = random.randint(1, maze_size - 1) * cell_size + cell_size / 2
-            
-            if random.random() > 0.5:
-                self.add_health([item_x, item_y, wall_thickness + 16])
-            else:
-                self.add_ammo([item_x, item_y, wall_thickness + 16])
+        # Add some items (5 over the whole maze, spread over the tiles by area)
+        item_cells = (range(max(i0, 1), min(i1, maze_size)), range(max(j0, 1), min(j1, maze_size)))
+        if item_cells[0] and item_cells[1]:
+            for i in range(max(1, round(5 * share))):
+                item_x = rng.choice(item_cells[0]) * cell_size + cell_size / 2
+                item_y = rng.choice(item_cells[1]) * cell_size + cell_size / 2
+                
+                if rng.random() > 0.5:
+                    self.add_health([item_x, item_y, wall_thickness + 16])
+                else:
+                    self.add_ammo([item_x, item_y, wall_thickness + 16])
                 
         # Add some doors to make navigation easier in the maze
-        for i in range(3):  # Add a few random doors
-            door_x = random.randint(1, maze_size - 2) * cell_size + cell_size / 2
-            door_y = random.randint(1, maze_size - 2) * cell_size + cell_size / 2
-            # Random orientation (horizontal or vertical)
-            if random.random() > 0.5:
-                door_angles = (0, 90, 0)  # Horizontal door
-            else:
-                door_angles = (0, 0, 0)   # Vertical door
-            
-            self.add_door(
-                [door_x, door_y, wall_thickness + cell_size / 2],
-                (64, 8, 96),  # Width, thickness, height
-                door_angles
+        door_cells = (range(max(i0, 1), min(i1, maze_size - 1)), range(max(j0, 1), min(j1, maze_size - 1)))
+        if door_cells[0] and door_cells[1]:
+            for i in range(max(1, round(3 * share))):  # Add a few random doors
+                door_x = rng.choice(door_cells[0]) * cell_size + cell_size / 2
+                door_y = rng.choice(door_cells[1]) * cell_size + cell_size / 2
+                # Random orientation (horizontal or vertical)
+                if rng.random() > 0.5:
+                    door_angles = (0, 90, 0)  # Horizontal door
+                else:
+                    door_angles = (0, 0, 0)   # Vertical door
+                
+                self.add_door(
+                    [door_x, door_y, wall_thickness + cell_size / 2],
+                    (64, 8, 96),  # Width, thickness, height
+                    door_angles
+                )
+    
+    def create_layered_maze_scenario(self, maze_size=5, levels=3, cell_size=256, algorithm='backtracker',
+                                     stairs_per_level=1, step_height=16, stair_style='steps'):
+        """
+        Create a maze of stacked levels connected by stairwells.
+        
+        Levels share their slabs: the ceiling of one level is the floor of
+        the next, built as a few large brushes around the stairwell holes.
+        A stair climbs along +Y in one half of its cell; the slab above is
+        open over the stair, and the other half of the cell on the upper
+        level is where the stair comes out. With stair_style 'ramp' every
+        stair is a single sloped brush instead of a flight of steps; a ramp
+        runs over two cells, since one cell is too short for a slope the
+        player can walk up (see convex_brush.MIN_WALKABLE_NORMAL_Z).
+        """
+        wall_thickness = 16
+        level_height = cell_size + wall_thickness  # floor top to floor top
+        stair_span = 2 if stair_style == 'ramp' else 1
+        east, north, up = maze_algorithms.generate_layered_maze(maze_size, maze_size, levels, algorithm,
+                                                                random, stairs_per_level, stair_span)
+        
+        def stair_strip(x, y):
+            x0, y0, x1, _ = maze_algorithms.cell_interior(x, y, maze_size, maze_size, cell_size, wall_thickness)
+            y1 = maze_algorithms.cell_interior(x, y + stair_span - 1, maze_size, maze_size, cell_size, wall_thickness)[3]
+            return x0, y0, (x0 + x1) / 2, y1
+        
+        # Slabs: the base floor, one between each pair of levels and the roof
+        slab = (0, 0, maze_size * cell_size, maze_size * cell_size)
+        slab_textures = {'top': self.textures['floor'], 'bottom': self.textures['ceiling']}
+        slabs = []
+        for index in range(levels + 1):
+            z = index * level_height
+            holes = []
+            if 0 < index < levels:
+                holes = [stair_strip(x, y) for x, y in zip(*np.nonzero(up[index - 1]))]
+            slabs.extend(
+                self._create_box([x0, y0, z], [x1, y1, z + wall_thickness], slab_textures)
+                for x0, y0, x1, y1 in maze_algorithms.split_around(slab, holes)
             )
+        self._add_solids(slabs)
+        
+        wall_textures = {'front': self.textures['wall'], 'back': self.textures['wall']}
+        step_textures = {'top': self.textures['floor'], 'bottom': self.textures['nodraw']}
+        steps = max(1, math.ceil(level_height / step_height))
+        
+        for level in range(levels):
+            floor_z = level * level_height + wall_thickness
+            
+            self._add_solids([
+                self._create_box([x0, y0, floor_z], [x1, y1, floor_z + cell_size], wall_textures)
+                for x0, y0, x1, y1 in maze_algorithms.wall_runs(east[level], north[level], cell_size, wall_thickness)
+            ])
+            
+            # Stairs up to the next level, all steps of the level in one batch
+            if level < levels - 1 and stair_style == 'ramp':
+                ramp_boxes = []
+                for x, y in zip(*np.nonzero(up[level])):
+                    x0, y0, x1, y1 = stair_strip(x, y)
+                    ramp_boxes.append(([x0, y0, floor_z], [x1, y1, floor_z + level_height]))
+                brushes = convex_brush.ramps(ramp_boxes, ['north'] * len(ramp_boxes), self._ramp_textures(step_textures),
+                                             self.textures['floor'])
+                self._add_solids([self._create_convex(brush) for brush in brushes])
+            elif level < levels - 1:
+                stair_boxes = []
+                for x, y in zip(*np.nonzero(up[level])):
+                    x0, y0, x1, y1 = stair_strip(x, y)
+                    depth = (y1 - y0) / steps
+                    stair_boxes.extend(
+                        self._create_box([x0, y0 + k * depth, floor_z],
+                                         [x1, y0 + (k + 1) * depth, floor_z + (k + 1) * level_height / steps],
+                                         step_textures)
+                        for k in range(steps)
+                    )
+                self._add_solids(stair_boxes)
             
+            # Lights and a few items on every level
+            for i in range(maze_size):
+                for j in range(maze_size):
+                    if random.random() > 0.7:
+                        self.add_light([(i + 0.5) * cell_size, (j + 0.5) * cell_size, floor_z + cell_size - 32],
+                                       brightness=200, color=(255, 255, 200))
+            
+            for _ in range(3):
+                item_x = (random.randrange(maze_size) + 0.75) * cell_size
+                item_y = (random.randrange(maze_size) + 0.5) * cell_size
+                if random.random() > 0.5:
+                    self.add_health([item_x, item_y, floor_z + 16])
+                else:
+                    self.add_ammo([item_x, item_y, floor_z + 16])
+        
+        # Player start in the first cell, beside any stair
+        self.add_player_start([cell_size * 0.75, cell_size / 2, wall_thickness + 32])
+        
         return {
             'mins': [0, 0, 0],
-            'maxs': [maze_size * cell_size, maze_size * cell_size, wall_thickness + cell_size],
-            'center': [maze_size * cell_size / 2, maze_size * cell_size / 2, (wall_thickness + cell_size) / 2]
+            'maxs': [maze_size * cell_size, maze_size * cell_size, levels * level_height + wall_thickness],
+            'levels': levels,
+            'stairs': [list(zip(*np.nonzero(up[level]))) for level in range(levels - 1)]
         }
     
-    def save_vmf(self, filename):
-        """Save the map to a VMF file."""
-        with open(filename, 'w') as f:
-            # Write file header
-            f.write('versioninfo\n{\n\t"editorversion" "400"\n\t"editorbuild" "8864"\n\t"mapversion" "1"\n')
-            f.write('\t"formatversion" "100"\n\t"prefab" "0"\n}\n')
+    def _partition_space(self, bounds, min_leaf):
+        """
+        Split the rectangle bounds (x0, y0, x1, y1) into a BSP tree whose
+        leaves are at least min_leaf units on each side.
+        
+        Uses an explicit stack instead of recursion. Returns the node list:
+        each node is a dict with 'bounds', and for inner nodes 'axis',
+        'split' and the indices of its two 'children'.
+        """
+        nodes = [{'bounds': bounds}]
+        stack = [0]
+        while stack:
+            index = stack.pop()
+            x0, y0, x1, y1 = nodes[index]['bounds']
+            can_split = (x1 - x0 >= 2 * min_leaf, y1 - y0 >= 2 * min_leaf)
+            if not any(can_split):
+                continue
             
-            # Write visgroups
-            f.write('visgroups\n{\n}\n')
+            # Split across the longer side (randomly when the node is square)
+            if all(can_split):
+                axis = 0 if (x1 - x0, random.random()) > (y1 - y0, 0.5) else 1
+            else:
+                axis = 0 if can_split[0] else 1
+            low, high = nodes[index]['bounds'][axis], nodes[index]['bounds'][axis + 2]
+            split = round(random.uniform(low + min_leaf, high - min_leaf) / 16) * 16
             
-            # Write viewsettings
-            f.write('viewsettings\n{\n\t"bSnapToGrid" "1"\n\t"bShowGrid" "1"\n\t"bShowLogicalGrid" "0"\n')
-            f.write('\t"nGridSpacing" "64"\n\t"bShow3DGrid" "0"\n}\n')
+            first, second = list(nodes[index]['bounds']), list(nodes[index]['bounds'])
+            first[axis + 2] = split
+            second[axis] = split
+            nodes[index].update(axis=axis, split=split, children=(len(nodes), len(nodes) + 1))
+            nodes.append({'bounds': tuple(first)})
+            nodes.append({'bounds': tuple(second)})
+            stack.extend(nodes[index]['children'])
+        
+        return nodes
+    
+    def create_dungeon_scenario(self, size=(8192, 8192), min_leaf=768, room_height=256, corridor_width=96,
+                                corridor_height=128):
+        """
+        Create a dungeon by recursively partitioning the floor area with a
+        BSP tree, placing a room with doorways in every leaf and joining the
+        two halves of every split with a corridor.
+        
+        The corridor of a split joins the pair of rooms facing each other
+        across the split line with the widest shared span. Planned room and
+        corridor boxes go into a spatial index, so a corridor that would cut
+        through other geometry is rejected in constant time and the next
+        pair is tried. Rooms and corridors are only built once every doorway
+        is known.
+        
+        A split where no such pair fits (small leaves, wide corridors) is
+        joined by a corridor routed around the other rooms and corridors
+        (see corridor_router), between the closest pair of rooms across the
+        split that the router finds a way between; a split it cannot join
+        either is reported. Otherwise the BSP tree gives a connected dungeon
+        with one corridor per split. Large sizes produce thousands of rooms
+        in seconds, but Hammer and vbsp only accept maps within +/-16384
+        units.
+        """
+        thickness = 16
+        floor_z = 64
+        nodes = self._partition_space((0, 0, size[0], size[1]), min_leaf)
+        
+        # Rooms inside the leaves, with random margins that leave room for walls and corridors
+        rooms = {}
+        # Leaves are at least min_leaf - 8 long (splits snap to 16), so next to every leaf on one side of a split
+        # lies one on the other side sharing half of that; margins up to facing_margin leave a corridor's width
+        # of it between the rooms
+        facing_margin = ((min_leaf - 16) / 2 - corridor_width - 2 * thickness) / 2
+        max_margin = max(2 * thickness, min(min_leaf // 8, int(facing_margin // 16) * 16))
+        for index, node in enumerate(nodes):
+            if 'children' in node:
+                continue
+            x0, y0, x1, y1 = node['bounds']
+            margins = [round(random.uniform(2 * thickness, max_margin) / 16) * 16 for _ in range(4)]
+            rooms[index] = {
+                'mins': [x0 + margins[0], y0 + margins[1], floor_z],
+                'maxs': [x1 - margins[2], y1 - margins[3], floor_z + room_height],
+                'doorways': {}
+            }
+        
+        # Leaves below every node, children before parents
+        leaves = {}
+        for index in reversed(range(len(nodes))):
+            children = nodes[index].get('children')
+            leaves[index] = leaves[children[0]] + leaves[children[1]] if children else [index]
+        
+        planned = SpatialIndex(cell_size=min_leaf)
+        for key, room in rooms.items():
+            planned.insert(key, [room['mins'][0] - thickness, room['mins'][1] - thickness, room['mins'][2]],
+                         [room['maxs'][0] + thickness, room['maxs'][1] + thickness, room['maxs'][2]])
+        
+        clearance = corridor_width / 2 + thickness
+        corridors = []
+        unjoined = []  # (below, above) leaves of the splits left for the router
+        for node in nodes:
+            if 'children' not in node:
+                continue
+            axis, split = node['axis'], node['split']
+            other = 1 - axis
+            # Leaves touching the split line from either side
+            below = [leaf for leaf in leaves[node['children'][0]] if nodes[leaf]['bounds'][axis + 2] == split]
+            above = [leaf for leaf in leaves[node['children'][1]] if nodes[leaf]['bounds'][axis] == split]
             
-            # Write world entity
-            f.write('world\n{\n\t"id" "1"\n\t"mapversion" "1"\n\t"classname" "worldspawn"\n')
-            f.write('\t"skyname" "sky_day01_01"\n\t"sounds" "1"\n\t"MaxRange" "4096"\n')
+            candidates = []
+            for a in below:
+                for b in above:
+                    low = max(rooms[a]['mins'][other], rooms[b]['mins'][other]) + clearance
+                    high = min(rooms[a]['maxs'][other], rooms[b]['maxs'][other]) - clearance
+                    if low <= high:
+                        candidates.append((high - low, a, b, (low + high) / 2))
             
-            # Add optimization entities if needed
-            if self.optimization_level in ["high", "extreme"]:
-                f.write('\t"detailmaterial" "detail/detailsprites"\n\t"detailvbsp" "detail.vbsp"\n')
+            for _, a, b, center in sorted(candidates, reverse=True):
+                mins = [0, 0, floor_z]
+                maxs = [0, 0, floor_z + corridor_height]
+                mins[axis], maxs[axis] = rooms[a]['maxs'][axis] + thickness, rooms[b]['mins'][axis] - thickness
+                mins[other], maxs[other] = center - corridor_width / 2, center + corridor_width / 2
+                
+                wall_mins, wall_maxs = list(mins), list(maxs)
+                wall_mins[other] -= thickness
+                wall_maxs[other] += thickness
+                if maxs[axis] <= mins[axis] or planned.overlaps(wall_mins, wall_maxs):
+                    continue
                 
-                if self.optimization_level == "extreme":
-                    f.write('\t"vrad_brush_cast_shadows" "1"\n\t"vrad_patch_shadows" "1"\n')
-                    f.write('\t"vrad_patch_emitlight" "1"\n\t"vrad_force_non_rad" "1"\n')
-                    f.write('\t"_light_env_maxdist" "2000"\n\t"_light_maxs" "1500"\n')
+                planned.insert(('corridor', len(corridors)), wall_mins, wall_maxs)
+                corridors.append((mins, maxs, axis))
+                rooms[a]['doorways']['east' if axis == 0 else 'north'] = center
+                rooms[b]['doorways']['west' if axis == 0 else 'south'] = center
+                break
+            else:
+                unjoined.append((below, above))
+        
+        # Build the geometry; routed corridors cut their doorways once the room walls exist
+        if unjoined:
+            self._hold_solids()
+        built = []
+        built_by_leaf = {}
+        for leaf, room in rooms.items():
+            size_xyz = [room['maxs'][k] - room['mins'][k] for k in range(3)]
+            built.append(self.add_room_with_doorway(room['mins'], size_xyz, doorways=room['doorways'],
+                                                    door_width=corridor_width, door_height=corridor_height))
+            built_by_leaf[leaf] = built[-1]
             
-            # Write solids
-            for solid in self.solids:
-                f.write('\tsolid\n\t{\n\t\t"id" "' + str(solid['id']) + '"\n')
+            center = built[-1]['center']
+            self.add_light([center[0], center[1], room['maxs'][2] - 32], brightness=300, color=(255, 255, 200))
+            spawns = []
+            if random.random() > 0.6:
+                spawns.append(self.add_health)
+            if random.random() > 0.8:
+                spawns.append(self.add_npc)
+            for add, (x, y, z) in zip(spawns, self.scatter_positions(built[-1]['mins'], built[-1]['maxs'],
+                                                                     len(spawns))):
+                add([x, y, z + 16])
+        
+        corridor_textures = {'bottom': self.textures['floor'], 'top': self.textures['ceiling'],
+                             'wall': self.textures['wall']}
+        for mins, maxs, axis in corridors:
+            self._add_corridor_segment(mins, maxs, axis, corridor_textures)
+        
+        routed = 0
+        if unjoined:
+            for mins, maxs, axis in corridors:
+                self.router.block(mins, maxs)
+            for below, above in unjoined:
+                pairs = sorted((math.dist(built_by_leaf[a]['center'], built_by_leaf[b]['center']), a, b)
+                               for a in below for b in above)
+                for _, a, b in pairs:
+                    if self._add_routed_corridor(built_by_leaf[a], built_by_leaf[b], corridor_width,
+                                                 corridor_height, corridor_textures) is not None:
+                        routed += 1
+                        break
+            self._release_solids()
+            if routed < len(unjoined):
+                print(f"Warning: {len(unjoined) - routed} dungeon splits could not be joined by a corridor")
+        
+        if built:
+            self.add_player_start([built[0]['center'][0], built[0]['center'][1], floor_z + 32])
+        
+        return {'rooms': built, 'corridors': corridors, 'routed': routed}
+    
+    def _room_grid_cell(self, i, j, spacing, seed):
+        """
+        Return the layout of the room in lattice cell (i, j) without adding it.
+        
+        Every random choice comes from a generator seeded by the cell, so any
+        tile can recompute the rooms of its neighbours to connect to them.
+        """
+        rng = random.Random(f"{seed}:room:{i}:{j}")
+        size_factor = rng.uniform(0.6, 1.0)
+        width = 512 * size_factor
+        length = 512 * size_factor
+        height = 256
+        
+        # Center the room in its lattice cell with a little jitter
+        slack = (spacing - width) / 4
+        x = i * spacing + (spacing - width) / 2 + rng.uniform(-slack, slack)
+        y = j * spacing + (spacing - length) / 2 + rng.uniform(-slack, slack)
+        z = 64
+        
+        return {
+            'rng': rng,
+            'position': [x, y, z],
+            'size': [width, length, height],
+            'mins': [x, y, z],
+            'maxs': [x + width, y + length, z + height],
+            'center': [x + width / 2, y + length / 2, z + height / 2]
+        }
+    
+    def create_room_grid_scenario(self, grid_size=(4, 4), spacing=1024, seed=0):
+        """Create rooms on a regular lattice, each connected to its east and north neighbours."""
+        self._hold_solids()
+        rooms = self.create_room_grid_tile((0, grid_size[0], 0, grid_size[1]), grid_size, spacing, seed)
+        self._release_solids()
+        return rooms
+    
+    def create_room_grid_tile(self, bounds, grid_size=(4, 4), spacing=1024, seed=0, rng=None):
+        """
+        Create the rooms of lattice cells [i0, i1) x [j0, j1) and their
+        corridors. rng is not used: every room draws from a generator seeded
+        by its cell, so neighbouring tiles agree on it.
+        """
+        i0, i1, j0, j1 = bounds
+        rooms = []
+        
+        # Neighbouring rooms can be as little as 224 units apart, too close for a free lane of 160-unit cells
+        if not self.router.inner:
+            self.router = corridor_router.CorridorRouter(cell_size=128)
+        
+        # Reserve the tile's rooms and the ring of rooms around it first, so corridors route around all of them
+        for i in range(max(i0 - 1, 0), min(i1 + 1, grid_size[0])):
+            for j in range(max(j0 - 1, 0), min(j1 + 1, grid_size[1])):
+                cell = self._room_grid_cell(i, j, spacing, seed)
+                self._reserve_room(('room_grid', i, j), cell['mins'], cell['maxs'], 16)
+        
+        for i in range(i0, i1):
+            for j in range(j0, j1):
+                cell = self._room_grid_cell(i, j, spacing, seed)
+                rng = cell['rng']
                 
-                # Write sides (faces)
-                for side in solid['sides']:
-                    f.write('\t\tside\n\t\t{\n\t\t\t"id" "' + str(side['id']) + '"\n')
-                    f.write('\t\t\t"plane" "' + side['plane'] + '"\n')
-                    f.write('\t\t\t"material" "' + side['material'] + '"\n')
-                    f.write('\t\t\t"uaxis" "' + side['uaxis'] + '"\n')
-                    f.write('\t\t\t"vaxis" "' + side['vaxis'] + '"\n')
-                    f.write('\t\t\t"rotation" "' + side['rotation'] + '"\n')
-                    f.write('\t\t\t"lightmapscale" "' + side['lightmapscale'] + '"\n')
-                    f.write('\t\t\t"smoothing_groups" "' + side['smoothing_groups'] + '"\n')
-                    f.write('\t\t}\n')
+                textures = {
+                    'bottom': rng.choice([self.textures['floor'], self.textures['concrete'], self.textures['dirt']]),
+                    'top': rng.choice([self.textures['ceiling'], self.textures['concrete']]),
+                    'front': rng.choice([self.textures['wall'], self.textures['brick'], self.textures['concrete']]),
+                    'back': rng.choice([self.textures['wall'], self.textures['brick'], self.textures['concrete']]),
+                    'left': rng.choice([self.textures['wall'], self.textures['brick'], self.textures['concrete']]),
+                    'right': rng.choice([self.textures['wall'], self.textures['brick'], self.textures['concrete']])
+                }
                 
-                f.write('\t}\n')
-            
-            f.write('}\n')
-            
-            # Write entities
-            for entity in self.entities:
-                if entity['id'] == 1:  # Skip worldspawn, already written
-                    continue
+                room = self.add_room(cell['position'], cell['size'], textures, key=('room_grid', i, j))
+                rooms.append(room)
+                
+                self.add_light([room['center'][0], room['center'][1], room['center'][2] + 100],
+                               brightness=300, color=(255, 255, 200))
+                
+                spawns = []
+                if rng.random() > 0.5:
+                    spawns.append(self.add_health)
+                if rng.random() > 0.7:
+                    spawns.append(self.add_npc)
+                for add, (x, y, z) in zip(spawns, self.scatter_positions(room['mins'], room['maxs'], len(spawns),
+                                                                         rng=rng)):
+                    add([x, y, z + 16])
+                
+                # Each room owns the corridors to its east and north neighbours, running between the facing walls
+                for ni, nj, walls in ((i + 1, j, (0, 2)), (i, j + 1, (1, 3))):
+                    if ni < grid_size[0] and nj < grid_size[1]:
+                        neighbour = dict(self._room_grid_cell(ni, nj, spacing, seed), key=('room_grid', ni, nj))
+                        self.add_corridor(room, neighbour, width=96, height=128, walls=walls)
+                
+                if i == 0 and j == 0:
+                    self.add_player_start([room['center'][0], room['center'][1], room['mins'][2] + 32])
+        
+        return rooms
+    
+    def create_arena_tile(self, bounds, size=(2048, 2048, 512), cell_size=256, cover_density=0.1,
+                          npc_density=0.05, pickup_density=0.08, rng=random):
+        """
+        Populate the part of an arena floor covering cells [i0, i1) x [j0, j1)
+        with cover boxes, NPCs and pickups. The arena shell itself is created
+        once by the caller (see create_tiled_scenario). Random choices are
+        drawn from rng.
+        """
+        i0, i1, j0, j1 = bounds
+        floor_z = 64
+        spawns = []
+        
+        for i in range(i0, i1):
+            for j in range(j0, j1):
+                cell_x = i * cell_size
+                cell_y = j * cell_size
+                
+                if rng.random() < cover_density:
+                    cover_size = [rng.uniform(64, 128), rng.uniform(64, 128), rng.uniform(64, 128)]
+                    cover_x = cell_x + rng.uniform(cover_size[0] / 2, cell_size - cover_size[0] / 2)
+                    cover_y = cell_y + rng.uniform(cover_size[1] / 2, cell_size - cover_size[1] / 2)
                     
-                f.write('entity\n{\n\t"id" "' + str(entity['id']) + '"\n')
+                    cover = self._create_box(
+                        [cover_x - cover_size[0]/2, cover_y - cover_size[1]/2, floor_z],
+                        [cover_x + cover_size[0]/2, cover_y + cover_size[1]/2, floor_z + cover_size[2]],
+                        {'front': self.textures['concrete'], 'back': self.textures['concrete'], 
+                         'left': self.textures['concrete'], 'right': self.textures['concrete'],
+                         'top': self.textures['concrete'], 'bottom': self.textures['concrete']}
+                    )
+                    self._add_solids([cover])
                 
-                # Write entity properties
-                for key, value in entity.items():
-                    if key != 'id':  # Skip ID, already written
-                        f.write('\t"' + key + '" "' + value + '"\n')
+                if rng.random() < npc_density:
+                    spawns.append(self.add_npc)
                 
-                f.write('}\n')
+                if rng.random() < pickup_density:
+                    spawns.append(self.add_health if rng.random() > 0.5 else self.add_ammo)
+        
+        # Spread NPCs and pickups over the tile once all cover is in place
+        tile_mins = [i0 * cell_size, j0 * cell_size, floor_z]
+        tile_maxs = [i1 * cell_size, j1 * cell_size, floor_z]
+        for add, (x, y, z) in zip(spawns, self.scatter_positions(tile_mins, tile_maxs, len(spawns), rng=rng)):
+            add([x, y, z + 16])
+    
+    def create_voxel_scenario(self, filename, headroom=80):
+        """
+        Build a map from a voxel grid saved by voxelize (--output), with the
+        player start on the first floor voxel that has headroom units of
+        free space above it.
+        """
+        grid, origin, resolution, names = voxelize.load_grid(filename)
+        count = self.add_voxel_grid(grid, origin, resolution, names or self.textures['wall'])
+        
+        # A standing spot is an empty voxel on a solid one, under enough empty voxels
+        clearance = max(int(math.ceil(headroom / resolution)), 1)
+        solid = grid != 0
+        depth = solid.shape[2] - clearance
+        standable = solid[:, :, :depth].copy()
+        for k in range(1, clearance + 1):
+            standable &= ~solid[:, :, k:k + depth]
+        spots = np.argwhere(standable)
+        if len(spots):
+            x, y, z = spots[0]
+            self.add_player_start([origin[0] + (x + 0.5) * resolution, origin[1] + (y + 0.5) * resolution,
+                                   origin[2] + (z + 1) * resolution + 16])
+        return count
+    
+    def create_layout_scenario(self, filename, legend_file=None, cell_size=64, wall_height=256):
+        """
+        Build a map from a floor plan drawn as a text grid or a PNG mask
+        (see layout_import). legend_file is a JSON legend whose entries
+        replace or extend the default legend for the file type.
+        """
+        image = filename.lower().endswith('.png')
+        if image:
+            cells = layout_import.read_image_layout(filename)
+            legend = dict(layout_import.DEFAULT_IMAGE_LEGEND)
+        else:
+            cells = layout_import.read_text_layout(filename)
+            legend = dict(layout_import.DEFAULT_TEXT_LEGEND)
+        if legend_file:
+            legend.update(layout_import.load_legend(legend_file))
+        
+        boxes, entities = layout_import.layout_boxes(cells, legend, cell_size, wall_height)
+        solids = []
+        for mins, maxs, _, material in boxes:
+            material = self.textures.get(material, material)
+            solids.append(self._create_box(mins, maxs, {face: material for face in brush_ops.FACE_KEYS}))
+        self._add_solids(solids)
+        
+        add_entity = {
+            'player_start': self.add_player_start,
+            'light': self.add_light,
+            'health': self.add_health,
+            'ammo': self.add_ammo,
+            'npc': self.add_npc
+        }
+        for kind, position in entities:
+            add_entity[kind](position)
+        
+        return {'brushes': len(solids), 'cells': cells.shape, 'entities': len(entities)}
+    
+    def create_tiled_scenario(self, scenario, tiles=(2, 2), workers=None, seed=0, **params):
+        """
+        Generate a scenario as a grid of spatial tiles, each built in a separate
+        worker process with its own pre-reserved range of ids. Tile outputs are
+        merged in tile order, so the result only depends on the seed and the
+        tile layout, not on the number of workers.
+        
+        Supported scenarios: 'maze' (maze_size, cell_size, algorithm), 'room_grid'
+        (grid_size, spacing) and 'arena' (size, cell_size and densities).
+        """
+        if scenario == 'maze':
+            maze_size = params.setdefault('maze_size', 5)
+            cells = (maze_size, maze_size)
+            # Every worker generates the maze of its own tile; the passages
+            # joining the tiles into one perfect maze are picked up front
+            params['links'] = maze_algorithms.link_tiles(parallel_tiles.plan_tiles(cells, tiles),
+                                                         random.Random(f"{seed}:maze"))
+        elif scenario == 'room_grid':
+            cells = tuple(params.setdefault('grid_size', (4, 4)))
+            params['seed'] = seed
+        elif scenario == 'arena':
+            size = params.setdefault('size', (2048, 2048, 512))
+            cell_size = params.setdefault('cell_size', 256)
+            cells = (int(size[0] // cell_size), int(size[1] // cell_size))
+            self._create_arena_shell(size)
+        else:
+            raise ValueError(f"Scenario {scenario!r} does not support tiled generation")
+        
+        # Corridors between tiles end at rooms built by other workers, so walls are carved after the merge
+        if scenario == 'room_grid':
+            self._hold_solids()
+        bounds = parallel_tiles.generate_tiles(self, scenario, cells, tiles, params, workers=workers, seed=seed)
+        self._release_solids()
+        return bounds
+    
+    def merge_brushes(self):
+        """
+        Coalesce adjacent axis-aligned brushes that share a face, have the
+        same extents on the other axes and identical per-face materials.
+        Returns the number of brushes removed.
+        """
+        if self.solid_sink is not None:
+            raise RuntimeError("Brushes already handed to the spill/pipeline writer cannot be merged")
+        
+        before = len(self.solids)
+        self.solids = brush_ops.merge_boxes(self.solids, self._create_box)
+        
+        # Merged brushes replace the ones they were built from
+        self.index.clear()
+        self._index_solids(self.solids)
+        self._box_bounds.clear()
+        return before - len(self.solids)
+    
+    def carve_junctions(self):
+        """
+        Cut the doorways recorded by add_corridor and the openings of
+        add_window out of the walls.
+        
+        Each opening looks up the wall brushes it overlaps in the spatial
+        index, so the work grows with the number of junctions, not with
+        brushes times corridors; the affected walls are replaced by the
+        fewest boxes around their openings, cut for all walls together by
+        brush_ops.subtract_many. Returns the number of wall brushes split.
+        """
+        if self.solid_sink is not None and not self.holding_solids:
+            raise RuntimeError("Brushes already handed to the spill/pipeline writer cannot be carved")
+        
+        holes = {}
+        for mins, maxs in self.junctions:
+            for key in self.index.query_box(mins, maxs):
+                holes.setdefault(key, []).append(tuple(mins) + tuple(maxs))
+        self.junctions = []
+        if not holes:
+            return 0
+        
+        # Cut every wall at once, then splice the pieces in where the walls were
+        walls = []
+        for position, solid in enumerate(self.solids):
+            box = brush_ops.solid_box(solid) if solid['id'] in holes else None
+            if box is not None:
+                walls.append((position, solid['id'], box[0], dict(zip(brush_ops.FACE_KEYS, box[1]))))
+        
+        owners = [index for index, wall in enumerate(walls) for _ in holes[wall[1]]]
+        cuts = [hole for wall in walls for hole in holes[wall[1]]]
+        pieces, sources = brush_ops.subtract_many([wall[2] for wall in walls], cuts, owners)
+        ends = np.searchsorted(sources, np.arange(len(walls)), side='right').tolist()
+        pieces = brush_ops.extents_tuples(pieces)
+        
+        replaced = {}
+        start = 0
+        for (position, key, _, textures), end in zip(walls, ends):
+            replaced[position] = [self._create_box(list(piece[:3]), list(piece[3:]), textures)
+                                  for piece in pieces[start:end]]
+            start = end
+            self.index.remove(key)
+            self._index_solids(replaced[position])
+        
+        solids = []
+        for position, solid in enumerate(self.solids):
+            solids.extend(replaced.get(position, (solid,)))
+        carved = len(walls)
+        
+        self.solids = solids
+        return carved
+    
+    def cull_hidden_faces(self):
+        """
+        Retexture faces that are completely covered by neighbouring brushes
+        (walls standing on floors, corridor ends buried in room walls...)
+        with nodraw. Returns the number of faces culled.
+        """
+        if self.solid_sink is not None:
+            raise RuntimeError("Brushes already handed to the spill/pipeline writer cannot be culled")
+        
+        return brush_ops.cull_hidden_faces(self.solids, self.textures['nodraw'])
+    
+    def place_visibility_portals(self):
+        """
+        Put a func_areaportal into every doorway that separates two areas
+        and a hint brush across every corridor mouth.
+        
+        Rooms and corridors are the nodes of the area graph, the recorded
+        openings its edges. Spaces that overlap without a wall between them
+        (a straight corridor running into a room) are one area, and so is
+        everything behind an opening into unregistered space. A corridor
+        joins the area of the first room it opens into, so it takes one
+        portal, at its other end. An opening between two different areas
+        gets an areaportal filling it, so the engine can stop drawing what
+        lies behind a closed-off doorway. The hint brush sits a corridor
+        width into the corridor, so vvis splits the corridor where its view
+        of the room starts.
+        
+        Openings not carved yet (see carve_junctions) are skipped, and a map
+        that would need more than MAX_MAP_AREAS areas gets hint brushes only.
+        
+        Returns (areaportals, hints) placed.
+        """
+        spaces = SpatialIndex(cell_size=1024)
+        for key, (mins, maxs, _, _) in enumerate(self.spaces):
+            spaces.insert(key, mins, maxs)
+        
+        outside = self.area_count  # everything not covered by a registered space
+        parent = list(range(self.area_count + 1))
+        
+        def find(area):
+            while parent[area] != area:
+                parent[area] = parent[parent[area]]
+                area = parent[area]
+            return area
+        
+        def space_at(point):
+            for key in spaces.query_box(point, point, touching=True):
+                return key
+            return None
+        
+        for key, (mins, maxs, area, _) in enumerate(self.spaces):
+            for other in spaces.query_box(mins, maxs):
+                parent[find(self.spaces[other][2])] = find(area)
+        
+        # The spaces on both sides of every opening, probed just outside its two faces
+        pending = {(tuple(mins), tuple(maxs)) for mins, maxs in self.junctions}
+        sides = {}
+        for mins, maxs, axis in self.openings:
+            opening = (tuple(mins), tuple(maxs), axis)
+            if opening in sides or opening[:2] in pending:
+                continue
+            probe = [(mins[k] + maxs[k]) / 2 for k in range(3)]
+            found = []
+            for coordinate in (mins[axis] - 1, maxs[axis] + 1):
+                probe[axis] = coordinate
+                found.append(space_at(probe))
+            sides[opening] = found
+            if None in found:
+                for key in found:
+                    parent[find(outside if key is None else self.spaces[key][2])] = find(outside)
+        
+        # Join every corridor to the first room it opens into
+        has_room = {find(area) for _, _, area, kind in self.spaces if kind == 'room'}
+        for found in sides.values():
+            if None in found:
+                continue
+            for corridor, room in (found, found[::-1]):
+                if self.spaces[corridor][3] != 'corridor' or self.spaces[room][3] != 'room':
+                    continue
+                if find(self.spaces[corridor][2]) not in has_room:
+                    parent[find(self.spaces[corridor][2])] = find(self.spaces[room][2])
+        
+        areas = len({find(area) for area in range(self.area_count + 1)})
+        use_portals = areas <= MAX_MAP_AREAS
+        if not use_portals:
+            print(f"Warning: {areas} areas exceed the limit of {MAX_MAP_AREAS}; placing hint brushes only")
+        
+        portals = 0
+        hints = []
+        hint_boxes = set()  # both hints of a short corridor can land in its middle
+        for (mins, maxs, axis), found in sides.items():
+            if None in found:
+                continue
+            if use_portals and find(self.spaces[found[0]][2]) != find(self.spaces[found[1]][2]):
+                self._add_areaportal(list(mins), list(maxs))
+                portals += 1
             
-            # Write cameras
-            for camera in self.cameras:
-                f.write('cameras\n{\n\t"activecamera" "-1"\n}\n')
+            for key, face, step in ((found[0], mins[axis], -1), (found[1], maxs[axis], 1)):
+                space_mins, space_maxs, _, kind = self.spaces[key]
+                if kind != 'corridor':
+                    continue
+                # A corridor width in, but never past the middle of the corridor piece
+                lateral = max(maxs[k] - mins[k] for k in range(2) if k != axis)
+                end = space_maxs[axis] if step > 0 else space_mins[axis]
+                depth = min(lateral, abs(end - face) / 2)
+                hint_mins, hint_maxs = list(mins), list(maxs)
+                hint_mins[axis] = hint_maxs[axis] = face + step * depth
+                hint_maxs[axis] += 1
+                if (tuple(hint_mins), tuple(hint_maxs)) in hint_boxes:
+                    continue
+                hint_boxes.add((tuple(hint_mins), tuple(hint_maxs)))
+                faces = ('left', 'right') if axis == 0 else ('front', 'back')
+                hints.append(self._create_box(hint_mins, hint_maxs, {
+                    face_key: self.textures['hint'] if face_key in faces else self.textures['skip']
+                    for face_key in brush_ops.FACE_KEYS
+                }))
+        
+        self._add_solids(hints)
+        return portals, len(hints)
+    
+    def _add_areaportal(self, mins, maxs):
+        """Add a func_areaportal entity filling the box mins..maxs."""
+        brush = self._create_box(mins, maxs, {face: self.textures['areaportal'] for face in brush_ops.FACE_KEYS})
+        self._box_bounds.pop(brush['id'], None)  # entity brush, not part of the world index
+        self.entities.append({
+            'id': self._get_next_id(),
+            'classname': 'func_areaportal',
+            'StartOpen': '1',
+            'PortalVersion': '1',
+            'solids': [brush]
+        })
+        self.areaportals.append((mins, maxs))
+    
+    def move_detail_brushes(self, max_size=256):
+        """
+        Move brushes that don't seal the world (small free-standing boxes and
+        everything inside a room, see brush_ops.split_detail) into a
+        func_detail entity, so vbsp does not cut visleafs around them.
+        Brushes framing an areaportal stay in the world. Returns the number
+        of brushes moved.
+        """
+        if self.solid_sink is not None:
+            raise RuntimeError("Brushes already handed to the spill/pipeline writer cannot be moved to func_detail")
+        
+        self.solids, detail = brush_ops.split_detail(self.solids, self.router.inner.values(), max_size,
+                                                     keep=self.areaportals)
+        if detail:
+            self.entities.append({
+                'id': self._get_next_id(),
+                'classname': 'func_detail',
+                'solids': detail
+            })
+        return len(detail)
+    
+    def _world_properties(self):
+        """Return the worldspawn key/value pairs written at the top of the world block."""
+        world = list(vmf_writer.DEFAULT_WORLD)
+        
+        # Add optimization entities if needed
+        if self.optimization_level in ["high", "extreme"]:
+            world += [('detailmaterial', 'detail/detailsprites'), ('detailvbsp', 'detail.vbsp')]
             
-            # Write cordon
-            f.write('cordon\n{\n\t"mins" "(-1024 -1024 -1024)"\n\t"maxs" "(1024 1024 1024)"\n')
-            f.write('\t"active" "0"\n}\n')
+            if self.optimization_level == "extreme":
+                world += [
+                    ('vrad_brush_cast_shadows', '1'), ('vrad_patch_shadows', '1'),
+                    ('vrad_patch_emitlight', '1'), ('vrad_force_non_rad', '1'),
+                    ('_light_env_maxdist', '2000'), ('_light_maxs', '1500')
+                ]
+        
+        return world
+    
+    def _point_entities(self):
+        """Return the entities to write after the world block."""
+        # Skip worldspawn, it is written as the world block
+        return (entity for entity in self.entities if entity['id'] != 1)
+    
+    def iter_vmf_chunks(self, batch_size=vmf_writer.DEFAULT_BATCH_SIZE):
+        """Generate the VMF text of the map in large chunks (for streaming to a pipe, socket or compressor)."""
+        if isinstance(self.solid_sink, vmf_writer.PipelinedWriter):
+            raise RuntimeError("Solids are being written by the pipeline writer; use save_vmf instead")
+        
+        entities = self._point_entities()
+        
+        # Solids already spilled to disk are copied over after the in-memory ones
+        spilled = self.solid_sink.iter_chunks() if self.solid_sink is not None else ()
+        
+        return vmf_writer.iter_vmf_chunks(
+            self.solids,
+            entities,
+            world=self._world_properties(),
+            cameras=len(self.cameras),
+            batch_size=batch_size,
+            solid_chunks=spilled
+        )
+    
+    def save_vmf(self, filename, verbose=False, buffer_size=vmf_writer.DEFAULT_BUFFER_SIZE):
+        """Save the map to a VMF file."""
+        if self.junctions:
+            print(f"Warning: {len(self.junctions)} wall openings were never carved (see carve_junctions); "
+                  f"the corridors behind them end at solid walls")
+        if isinstance(self.solid_sink, vmf_writer.PipelinedWriter):
+            # The world block is already on disk; only the tail remains
+            if os.path.abspath(filename) != os.path.abspath(self.solid_sink.filename):
+                raise ValueError(f"Pipeline output is {self.solid_sink.filename}, not {filename}")
+            tail = vmf_writer.iter_tail_chunks(self._point_entities(), cameras=len(self.cameras))
+            return self.solid_sink.finish(tail, verbose=verbose)
+        
+        written = vmf_writer.write_chunks(self.iter_vmf_chunks(), filename, buffer_size=buffer_size, verbose=verbose)
+        
+        if verbose and self.solid_sink is not None:
+            print(f"Assembled {self.solid_sink.count} spilled solids into {filename}")
+        
+        return written
 
 def main():
     parser = argparse.ArgumentParser(description='Generate a Source Engine map (.vmf) file.')
@@ -991,26 +2129,116 @@ def main():
     parser.add_argument('--output', type=str, default=None, help='Output file path (if not specified, name.vmf will be used)')
     parser.add_argument('--optimization', type=str, choices=['standard', 'high', 'extreme'], default='standard', 
                         help='Optimization level for the map')
-    parser.add_argument('--scenario', type=str, choices=['rooms', 'arena', 'maze'], default='rooms',
+    parser.add_argument('--scenario', type=str,
+                        choices=['rooms', 'arena', 'maze', 'layered_maze', 'room_grid', 'dungeon', 'voxels', 'layout'],
+                        default='rooms',
                         help='Type of map scenario to generate')
     parser.add_argument('--room-count', type=int, default=3, help='Number of rooms to generate (for rooms scenario)')
+    parser.add_argument('--extra-corridors', type=int, default=0,
+                        help='Corridors added on top of the spanning tree to create loops (for rooms scenario)')
     parser.add_argument('--npc-count', type=int, default=6, help='Number of NPCs to spawn (for arena scenario)')
     parser.add_argument('--maze-size', type=int, default=5, help='Size of the maze (for maze scenario)')
+    parser.add_argument('--maze-algorithm', type=str, choices=sorted(maze_algorithms.ALGORITHMS), default='backtracker',
+                        help='Perfect maze algorithm (for maze scenario)')
+    parser.add_argument('--levels', type=int, default=3, help='Number of stacked levels (for layered_maze scenario)')
+    parser.add_argument('--stairs-per-level', type=int, default=1,
+                        help='Stairwells between each pair of levels (for layered_maze scenario)')
+    parser.add_argument('--ramps', action='store_true',
+                        help='Build stairwells as single sloped ramps instead of steps (for layered_maze scenario)')
+    parser.add_argument('--dungeon-size', type=int, default=8192, help='Side length of the dungeon area (for dungeon scenario)')
+    parser.add_argument('--min-leaf', type=int, default=768,
+                        help='Minimum side of a BSP leaf, i.e. the room pitch (for dungeon scenario)')
+    parser.add_argument('--grid-size', type=int, default=4, help='Rooms per side of the lattice (for room_grid scenario)')
+    parser.add_argument('--grid-file', type=str, default=None,
+                        help='Voxel grid (.npz) saved by voxelize.py --output (for voxels scenario)')
+    parser.add_argument('--layout-file', type=str, default=None,
+                        help='Floor plan as a text grid or a PNG mask (for layout scenario)')
+    parser.add_argument('--legend', type=str, default=None,
+                        help='JSON legend mapping layout symbols or #rrggbb colors to cells (for layout scenario)')
+    parser.add_argument('--cell-size', type=int, default=64, help='Size of a layout cell in units (for layout scenario)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible maps')
+    parser.add_argument('--tiles', type=int, default=1,
+                        help='Split maze, arena and room_grid scenarios into N x N tiles generated in parallel')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for tiled generation (default: CPU count)')
+    parser.add_argument('--merge-brushes', action='store_true',
+                        help='Fuse adjacent brushes with identical extents and materials before saving')
+    parser.add_argument('--cull-faces', action='store_true',
+                        help='Texture faces hidden by neighbouring brushes with nodraw before saving')
+    parser.add_argument('--check-overlaps', action='store_true',
+                        help='Report intersecting brushes before saving')
+    parser.add_argument('--check-leaks', action='store_true',
+                        help='Flood fill the map from its entities and report leaks before saving '
+                             '(the path of the first leak goes to a .lin pointfile next to the output)')
+    parser.add_argument('--check-reachability', action='store_true',
+                        help='Flood fill the map from the player start and report unreachable items and NPCs')
+    parser.add_argument('--min-reachable', type=float, default=0.9,
+                        help='Fail generation if less of the floor than this share is reachable (with --check-reachability)')
+    parser.add_argument('--relocate-unreachable', action='store_true',
+                        help='Move unreachable items and NPCs to the nearest reachable floor (with --check-reachability)')
+    parser.add_argument('--detail-brushes', action='store_true',
+                        help='Move brushes that do not seal the world into func_detail before saving')
+    parser.add_argument('--vis-portals', action='store_true',
+                        help='Place areaportals in doorways and hint brushes at corridor mouths '
+                             '(always on with --optimization extreme)')
+    parser.add_argument('--verbose', action='store_true', help='Report output size and write throughput')
+    parser.add_argument('--spill', action='store_true',
+                        help='Serialize finished solids to a temporary file as they are produced (bounded memory)')
+    parser.add_argument('--spill-dir', type=str, default=None, help='Directory for the spill file (default: system temp)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Write solids on a background thread while the scenario is still generating')
     
     args = parser.parse_args()
     
+    if args.seed is not None:
+        random.seed(args.seed)
+    seed = args.seed if args.seed is not None else random.randrange(1 << 30)
+    
     # Create map generator
     map_gen = SourceMapGenerator()
     map_gen.map_name = args.name
     map_gen.optimization_level = args.optimization
     
+    output_path = args.output if args.output else f"{args.name}.vmf"
+    
+    if args.spill and args.pipeline:
+        parser.error('--spill and --pipeline cannot be combined')
+    in_memory_options = (
+        ('--merge-brushes', 'merge_brushes'),
+        ('--check-overlaps', 'check_overlaps'),
+        ('--cull-faces', 'cull_faces'),
+        ('--check-leaks', 'check_leaks'),
+        ('--check-reachability', 'check_reachability'),
+        ('--detail-brushes', 'detail_brushes')
+    )
+    for flag, attr in in_memory_options:
+        if getattr(args, attr) and (args.spill or args.pipeline):
+            parser.error(f'{flag} needs all brushes in memory and cannot be combined with --spill or --pipeline')
+    if args.scenario == 'voxels' and not args.grid_file:
+        parser.error('the voxels scenario needs --grid-file')
+    if args.scenario == 'layout' and not args.layout_file:
+        parser.error('the layout scenario needs --layout-file')
+    if args.spill:
+        map_gen.enable_spill(args.spill_dir)
+    elif args.pipeline:
+        map_gen.enable_pipeline(output_path)
+    
     # Add worldspawn entity
     map_gen.add_worldspawn()
     
     # Generate scenario
-    if args.scenario == 'rooms':
+    if args.tiles > 1 and args.scenario in parallel_tiles.TILE_METHODS:
+        # Generate the scenario in parallel tiles
+        params = {
+            'maze': {'maze_size': args.maze_size, 'algorithm': args.maze_algorithm},
+            'arena': {},
+            'room_grid': {'grid_size': (args.grid_size, args.grid_size)}
+        }[args.scenario]
+        map_gen.create_tiled_scenario(args.scenario, tiles=(args.tiles, args.tiles), workers=args.workers,
+                                      seed=seed, **params)
+        
+    elif args.scenario == 'rooms':
         # Create a simple scenario with multiple rooms connected by corridors
-        map_gen.create_simple_room_scenario(room_count=args.room_count)
+        map_gen.create_simple_room_scenario(room_count=args.room_count, extra_corridors=args.extra_corridors)
         
     elif args.scenario == 'arena':
         # Create a large arena for combat
@@ -1018,11 +2246,73 @@ def main():
         
     elif args.scenario == 'maze':
         # Create a simple maze-like structure
-        map_gen.create_maze_scenario(maze_size=args.maze_size)
+        map_gen.create_maze_scenario(maze_size=args.maze_size, algorithm=args.maze_algorithm)
+        
+    elif args.scenario == 'layered_maze':
+        # Create stacked maze levels connected by stairwells
+        map_gen.create_layered_maze_scenario(maze_size=args.maze_size, levels=args.levels,
+                                             algorithm=args.maze_algorithm, stairs_per_level=args.stairs_per_level,
+                                             stair_style='ramp' if args.ramps else 'steps')
+        
+    elif args.scenario == 'dungeon':
+        # Create a BSP-partitioned dungeon
+        map_gen.create_dungeon_scenario(size=(args.dungeon_size, args.dungeon_size), min_leaf=args.min_leaf)
+        
+    elif args.scenario == 'room_grid':
+        # Create rooms on a lattice connected to their neighbours
+        map_gen.create_room_grid_scenario(grid_size=(args.grid_size, args.grid_size), seed=seed)
+        
+    elif args.scenario == 'voxels':
+        # Compile a voxel grid into as few brushes as possible
+        brushes = map_gen.create_voxel_scenario(args.grid_file)
+        print(f"Compiled the voxel grid into {brushes} brushes")
+        
+    elif args.scenario == 'layout':
+        # Import a floor plan drawn as text or an image
+        layout = map_gen.create_layout_scenario(args.layout_file, legend_file=args.legend, cell_size=args.cell_size)
+        print(f"Imported a {layout['cells'][1]}x{layout['cells'][0]} cell layout as {layout['brushes']} brushes "
+              f"and {layout['entities']} entities")
+    
+    if args.merge_brushes:
+        removed = map_gen.merge_brushes()
+        print(f"Merged brushes: {removed} removed, {len(map_gen.solids)} remaining")
+    
+    if args.cull_faces:
+        culled = map_gen.cull_hidden_faces()
+        print(f"Culled {culled} hidden faces")
+    
+    if args.vis_portals or args.optimization == 'extreme':
+        portals, hints = map_gen.place_visibility_portals()
+        print(f"Placed {portals} areaportals and {hints} hint brushes")
+    
+    if args.detail_brushes:
+        moved = map_gen.move_detail_brushes()
+        print(f"Moved {moved} brushes to func_detail")
+    
+    # Checks run last, on the world exactly as it is saved
+    if args.check_overlaps:
+        detail = [solid for entity in map_gen.entities if entity.get('classname') == 'func_detail'
+                  for solid in entity['solids']]
+        overlap_report.print_report(overlap_report.overlap_report(map_gen.solids + detail))
+    
+    if args.check_leaks:
+        leaks = leak_check.find_leaks(map_gen.solids, map_gen.entities)
+        leak_check.print_report(leaks)
+        if leaks['leaks']:
+            pointfile = os.path.splitext(output_path)[0] + '.lin'
+            leak_check.write_pointfile(leaks['leaks'][0][1], pointfile)
+            print(f"Leak path written to {pointfile}")
+    
+    if args.check_reachability:
+        report = reachability.check_reachability(map_gen.solids, map_gen.entities,
+                                                 relocate=args.relocate_unreachable)
+        reachability.print_report(report)
+        if report['share'] < args.min_reachable:
+            parser.exit(1, f"Only {report['share']:.0%} of the floor is reachable from the player start "
+                           f"(--min-reachable {args.min_reachable:g}); no map written\n")
     
     # Save the map to a VMF file
-    output_path = args.output if args.output else f"{args.name}.vmf"
-    map_gen.save_vmf(output_path)
+    map_gen.save_vmf(output_path, verbose=args.verbose)
     print(f"Map generation complete. Output saved to: {output_path}")
 
 
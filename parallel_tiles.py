@@ -0,0 +1,148 @@
+"""
+Parallel tiled scenario generation
+
+Splits a scenario's cell grid into rectangular tiles and builds each tile in
+a separate worker process with SourceMapGenerator's *_tile methods. Every
+tile gets a disjoint, pre-reserved range of ids split off the generator's
+IdAllocator (solids, sides and entities share one id space), so workers
+never need to coordinate. The results are
+merged back in tile order, which makes the output depend only on the seed
+and the tile layout.
+"""
+
+import multiprocessing
+import os
+import random
+
+from id_allocator import BOX_IDS
+
+# Generator method that builds one tile of each scenario, called as method(bounds, rng=rng, **params)
+TILE_METHODS = {
+    'maze': 'create_maze_tile',
+    'room_grid': 'create_room_grid_tile',
+    'arena': 'create_arena_tile'
+}
+
+# A routed corridor with t turns is at most 4 + 3 * t boxes (see corridor_router.corridor_boxes). room_grid
+# corridors run between facing walls of neighbouring lattice cells, so they are straight or make one jog of
+# two turns; the budget allows for a detour of two more.
+CORRIDOR_TURNS = 4
+CORRIDOR_BOXES = 4 + 3 * CORRIDOR_TURNS
+
+# Upper bounds on the boxes and entities built per grid cell
+CELL_BOXES = {
+    'maze': 6,                           # inner walls and outer wall runs
+    'room_grid': 6 + 2 * CORRIDOR_BOXES, # a room and the corridors to its east and north neighbours
+    'arena': 1                           # a cover box
+}
+CELL_ENTITIES = {
+    'maze': 6,       # a light, items and doors
+    'room_grid': 3,  # a light, a health kit and an NPC
+    'arena': 2       # an NPC and a pickup
+}
+IDS_PER_CELL = {scenario: CELL_BOXES[scenario] * BOX_IDS + CELL_ENTITIES[scenario] for scenario in CELL_BOXES}
+
+# Ids per tile on top of the cells: floors, ceilings and the player start
+IDS_PER_TILE = 256
+
+
+def split_range(count, parts):
+    """Split range(count) into at most parts contiguous (start, stop) pairs of near-equal size."""
+    parts = max(1, min(parts, count))
+    edges = [count * k // parts for k in range(parts + 1)]
+    return [(edges[k], edges[k + 1]) for k in range(parts)]
+
+
+def plan_tiles(cells, tiles):
+    """Return the (i0, i1, j0, j1) cell bounds of every tile, in row-major tile order."""
+    return [
+        (i0, i1, j0, j1)
+        for j0, j1 in split_range(cells[1], tiles[1])
+        for i0, i1 in split_range(cells[0], tiles[0])
+    ]
+
+
+def _run_tile(job):
+    """Worker entry point: build one tile inside its reserved id range."""
+    import msg1
+
+    gen = msg1.SourceMapGenerator()
+    gen.optimization_level = job['optimization_level']
+    gen.textures = job['textures']
+    # The tile's allocator raises if the tile outgrows its reserved range
+    gen.ids = job['ids']
+
+    # A generator per tile, so the result does not depend on which worker runs it and
+    # tiles built inline leave the caller's random state alone
+    rng = random.Random(job['seed_key'])
+    try:
+        getattr(gen, TILE_METHODS[job['scenario']])(job['bounds'], rng=rng, **job['params'])
+    except RuntimeError as e:
+        raise RuntimeError(f"Tile {job['bounds']} of the {job['scenario']} scenario outgrew its id range "
+                           f"{gen.ids.start}..{gen.ids.stop}; pass a larger ids_per_tile") from e
+
+    return gen.solids, gen.entities, gen.ids, gen.index.boxes, gen.junctions, gen.spaces, gen.openings, gen.area_count
+
+
+def _merge(gen, results):
+    """Append tile results to gen in the order they are produced."""
+    for solids, entities, ids, bounds, junctions, spaces, openings, area_count in results:
+        # Reuse the bounds the worker indexed instead of parsing them again
+        gen._box_bounds.update(bounds)
+        gen._add_solids(solids)
+        gen.entities.extend(entities)
+        gen.ids.merge(ids)
+        gen.junctions.extend(junctions)
+        # Area numbers are per tile; shift them past the ones already merged
+        gen.spaces.extend((mins, maxs, area + gen.area_count, kind) for mins, maxs, area, kind in spaces)
+        gen.area_count += area_count
+        gen.openings.extend(openings)
+
+
+def generate_tiles(gen, scenario, cells, tiles, params, workers=None, seed=0, ids_per_tile=None):
+    """
+    Build scenario over a cells[0] x cells[1] grid split into tiles[0] x tiles[1]
+    tiles and merge the results into gen.
+
+    Args:
+        gen: SourceMapGenerator receiving the merged solids and entities.
+        scenario: Key of TILE_METHODS.
+        params: Keyword arguments for the tile method.
+        workers: Number of worker processes (default: CPU count); with 1
+            worker or a single CPU the tiles are built inline.
+        seed: Seed shared by all tiles.
+        ids_per_tile: Size of the id range reserved for each tile.
+
+    Returns a list with the bounds of every tile.
+    """
+    if scenario not in TILE_METHODS:
+        raise ValueError(f"Scenario {scenario!r} does not support tiled generation")
+
+    bounds = plan_tiles(cells, tiles)
+    if ids_per_tile is None:
+        largest = max((i1 - i0) * (j1 - j0) for i0, i1, j0, j1 in bounds)
+        ids_per_tile = largest * IDS_PER_CELL[scenario] + IDS_PER_TILE
+
+    jobs = []
+    tile_ids = gen.ids.split(ids_per_tile, len(bounds))
+    for index, tile_bounds in enumerate(bounds):
+        jobs.append({
+            'scenario': scenario,
+            'bounds': tile_bounds,
+            'params': params,
+            'optimization_level': gen.optimization_level,
+            'textures': gen.textures,
+            'ids': tile_ids[index],
+            'seed_key': f"{seed}:{scenario}:{index}"
+        })
+
+    workers = workers or os.cpu_count() or 1
+    # Worker processes only pay off with more than one CPU to run them on
+    if workers == 1 or len(jobs) == 1 or (os.cpu_count() or 1) == 1:
+        _merge(gen, map(_run_tile, jobs))
+    else:
+        with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+            # imap keeps tile order, so merging is deterministic
+            _merge(gen, pool.imap(_run_tile, jobs))
+
+    return bounds
@@ -0,0 +1,110 @@
+"""
+Poisson-disk sampling
+
+Scatters points over a rectangle so that no two are closer than a given
+radius, without the clumps and gaps of uniform random positions: items and
+NPCs spread over a room instead of piling up around its center.
+
+Bridson's algorithm: every accepted point becomes active and tries up to k
+candidates around it; a point that produces no valid candidate is retired.
+Candidates sit evenly spaced on the circle just outside the radius (Martin
+Roberts' variant) rather than at random in the ring out to twice the
+radius, which packs the points more tightly and needs fewer attempts.
+
+A background grid with cells of radius / sqrt(2) holds at most one point
+per cell, so testing a candidate looks at a fixed 5x5 block of cells, and
+the whole sampling is linear in the number of points. Candidates can also
+be rejected by a callable, e.g. one that looks up the brushes under an
+entity's footprint in the spatial index.
+"""
+
+import math
+import random
+
+# Candidates tried around an active point before it is retired
+DEFAULT_ATTEMPTS = 12
+
+# Candidates are placed this fraction beyond the radius, so rounding never puts them too close
+EPSILON = 1e-7
+
+
+def poisson_disk(mins, maxs, radius, rng=random, attempts=DEFAULT_ATTEMPTS, accept=None):
+    """
+    Sample points (x, y) in the rectangle mins..maxs (2D) at least radius
+    apart.
+
+    Args:
+        mins, maxs: Corners of the rectangle (only X and Y are used).
+        radius: Minimum distance between points.
+        rng: random.Random instance (or the random module) to draw from.
+        attempts: Candidates tried around each point.
+        accept: Optional callable (x, y) -> bool; rejected candidates are
+            treated like ones that land too close to another point.
+
+    Returns the points in the order they were accepted.
+    """
+    width = maxs[0] - mins[0]
+    height = maxs[1] - mins[1]
+    if width < 0 or height < 0 or radius <= 0:
+        return []
+
+    cell = radius / math.sqrt(2)
+    columns = max(int(math.ceil(width / cell)), 1)
+    rows = max(int(math.ceil(height / cell)), 1)
+    # Coordinates of the point in every grid cell, None for empty cells
+    grid_x = [None] * (columns * rows)
+    grid_y = [None] * (columns * rows)
+    # Cells within two of a point's cell, except the corners: those are at least radius away
+    offsets = [(i, j) for j in range(-2, 3) for i in range(-2, 3) if abs(i) + abs(j) < 4 and (i, j) != (0, 0)]
+    points = []
+    active = []
+    limit = radius * radius
+    x0, y0, x1, y1 = mins[0], mins[1], maxs[0], maxs[1]
+
+    def fits(x, y):
+        column = min(int((x - x0) / cell), columns - 1)
+        row = min(int((y - y0) / cell), rows - 1)
+        if grid_x[row * columns + column] is not None:
+            return False
+        for i, j in offsets:
+            c, r = column + i, row + j
+            if 0 <= c < columns and 0 <= r < rows:
+                other_x = grid_x[r * columns + c]
+                if other_x is not None:
+                    dx = other_x - x
+                    dy = grid_y[r * columns + c] - y
+                    if dx * dx + dy * dy < limit:
+                        return False
+        return accept is None or accept(x, y)
+
+    def add(x, y):
+        slot = min(int((y - y0) / cell), rows - 1) * columns + min(int((x - x0) / cell), columns - 1)
+        grid_x[slot] = x
+        grid_y[slot] = y
+        active.append(len(points))
+        points.append((x, y))
+
+    for _ in range(attempts):
+        x, y = rng.uniform(x0, x1), rng.uniform(y0, y1)
+        if fits(x, y):
+            add(x, y)
+            break
+
+    # Candidates lie evenly spaced on a circle just outside radius, starting at a random angle
+    distance = radius * (1 + EPSILON)
+    step = 2 * math.pi / attempts
+    while active:
+        slot = rng.randrange(len(active))
+        px, py = points[active[slot]]
+        start = rng.uniform(0, 2 * math.pi)
+        for k in range(attempts):
+            angle = start + k * step
+            x, y = px + distance * math.cos(angle), py + distance * math.sin(angle)
+            if x0 <= x <= x1 and y0 <= y <= y1 and fits(x, y):
+                add(x, y)
+                break
+        else:
+            active[slot] = active[-1]
+            active.pop()
+
+    return points
@@ -0,0 +1,179 @@
+"""
+Reachability check
+
+Finds the parts of a map the player cannot get to: items and NPCs walled
+off by random maze walls or closed rooms, or spawned inside brushes, which
+only show up after a compile and a play-through otherwise.
+
+The brushes the player collides with are voxelized (see voxelize) and a
+voxel counts as passable when it and the voxels above it, up to the
+player's height, are empty. A flood fill over passable voxels (see
+leak_check.flood_fill) starts at every info_player_start; entities whose
+voxel it never reaches are unreachable. The share of reachable floor is
+the reached part of all passable voxels standing on a brush, leaving out
+the outside of the map (what a fill from the void reaches) unless a leak
+lets the player get there.
+
+The fill moves freely in three dimensions, so it climbs stairs, ramps and
+stairwells without modelling jumps or step heights: it can only miss a
+route, never invent one through a wall, and openings lower than the
+player's height or narrower than a voxel count as closed. Doors are entities
+and do not block.
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+import leak_check
+import vmf_reader
+import voxelize
+
+# Materials of brushes the player walks through
+PASSABLE_MATERIALS = (
+    'TOOLS/TOOLSHINT', 'TOOLS/TOOLSSKIP', 'TOOLS/TOOLSTRIGGER', 'TOOLS/TOOLSAREAPORTAL',
+    'TOOLS/TOOLSNPCCLIP', 'NATURE/WATER'
+)
+
+# Entities that have to be reachable
+CHECKED_PREFIXES = ('item_', 'npc_', 'weapon_')
+
+# Brush entities the player collides with
+SOLID_ENTITIES = ('func_detail', 'func_brush', 'func_wall')
+
+
+def collides(solid):
+    """Return True if the player cannot walk through a brush."""
+    return not any(side['material'].upper().startswith(PASSABLE_MATERIALS) for side in solid['sides'])
+
+
+def collision_solids(solids, entities):
+    """Return the world brushes and solid brush entity brushes the player collides with."""
+    found = [solid for solid in solids if solid.get('sides') and collides(solid)]
+    for entity in entities:
+        if entity.get('classname') in SOLID_ENTITIES:
+            found.extend(solid for solid in entity.get('solids', ()) if solid.get('sides') and collides(solid))
+    return found
+
+
+def passable_voxels(solid, clearance):
+    """Return the empty voxels with clearance - 1 empty voxels above them."""
+    passable = ~solid
+    for k in range(1, clearance):
+        passable[:, :, :-k] &= ~solid[:, :, k:]
+        passable[:, :, -k:] = False
+    return passable
+
+
+def _origin(entity):
+    return tuple(float(value) for value in entity['origin'].split())
+
+
+def check_reachability(solids, entities, resolution=16, headroom=72, relocate=False):
+    """
+    Check which entities the player can reach.
+
+    Args:
+        solids: World solids.
+        entities: Entity dicts; info_player_start entities are the starting
+            points, entities named by CHECKED_PREFIXES are checked.
+        resolution: Voxel size in map units.
+        headroom: Height the player needs to pass.
+        relocate: Move unreachable entities (and those inside brushes) to
+            the nearest reachable floor voxel.
+
+    Returns a dict with the number of 'starts', the 'share' of the floor
+    the player reaches, the 'unreachable' entities and the entities
+    'in_solid' as (entity, original origin) pairs, the number of
+    entities 'checked' and 'relocated', and the grid 'shape'.
+    """
+    grid, origin, _ = voxelize.voxelize_solids(collision_solids(solids, entities), resolution, padding=2)
+    shape = grid.shape
+    clearance = max(int(math.ceil(headroom / resolution)), 1)
+    passable = passable_voxels(grid, clearance)
+
+    def index_of(entity):
+        index = voxelize.voxel_index(_origin(entity), origin, resolution)
+        return index if all(0 <= index[axis] < shape[axis] for axis in range(3)) else None
+
+    starts = [index_of(entity) for entity in entities if entity.get('classname') == 'info_player_start']
+    starts = [np.ravel_multi_index(index, shape) for index in starts if index is not None]
+    reached = leak_check.flood_fill(~passable, starts).reshape(shape) != 0
+
+    # Floor is a passable voxel on a brush; the outside of the map only counts where a leak lets the player out
+    floor = np.zeros(shape, dtype=bool)
+    floor[:, :, 1:] = passable[:, :, 1:] & grid[:, :, :-1]
+    floor &= reached | (leak_check.flood_void(~passable).reshape(shape) == 0)
+    floor_count = int(np.count_nonzero(floor))
+    reachable_floor = floor & reached
+    share = np.count_nonzero(reachable_floor) / floor_count if floor_count else 0.0
+
+    unreachable = []
+    in_solid = []
+    checked = [entity for entity in entities
+               if entity.get('origin') and entity.get('classname', '').startswith(CHECKED_PREFIXES)]
+    for entity in checked:
+        index = index_of(entity)
+        if index is not None and grid[index]:
+            in_solid.append((entity, _origin(entity)))
+        elif index is None or not reached[index]:
+            unreachable.append((entity, _origin(entity)))
+
+    relocated = 0
+    targets = np.argwhere(reachable_floor)
+    if relocate and len(targets):
+        centers = origin + (targets + 0.5) * resolution
+        for entity, point in unreachable + in_solid:
+            nearest = centers[np.argmin(np.sum((centers - np.array(point)) ** 2, axis=1))]
+            # Just above the floor the voxel stands on
+            x, y, z = nearest[0], nearest[1], nearest[2] - resolution / 2 + 16
+            entity['origin'] = f"{x:g} {y:g} {z:g}"
+            relocated += 1
+
+    return {
+        'starts': len(starts),
+        'share': share,
+        'unreachable': unreachable,
+        'in_solid': in_solid,
+        'checked': len(checked),
+        'relocated': relocated,
+        'shape': shape
+    }
+
+
+def print_report(report, limit=10):
+    """Print a reachability report, listing at most limit problem entities."""
+    if not report['starts']:
+        print("Reachability: no info_player_start inside the map")
+        return
+    print(f"Reachability: {report['share']:.0%} of the floor reachable, "
+          f"{len(report['unreachable'])} of {report['checked']} entities unreachable, "
+          f"{len(report['in_solid'])} inside brushes")
+    for entity, (x, y, z) in (report['unreachable'] + report['in_solid'])[:limit]:
+        print(f"  {entity.get('classname')} at ({x:g} {y:g} {z:g})")
+    problems = len(report['unreachable']) + len(report['in_solid'])
+    if problems > limit:
+        print(f"  ... and {problems - limit} more")
+    if report['relocated']:
+        print(f"  Relocated {report['relocated']} entities to reachable floor")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check which parts of a .vmf file the player can reach.')
+    parser.add_argument('input', type=str, help='Path to the .vmf file to check')
+    parser.add_argument('--resolution', type=float, default=16, help='Voxel size in map units')
+    parser.add_argument('--headroom', type=float, default=72, help='Height the player needs to pass')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum number of problem entities to list')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solids, entities = vmf_reader.read_vmf(args.input)
+    report = check_reachability(solids, entities, args.resolution, args.headroom)
+    print_report(report, limit=args.limit)
+    print(f"Analysis took {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
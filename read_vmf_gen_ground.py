@@ -2,6 +2,8 @@ import re
 import argparse
 import sys
 
+import vmf_writer
+
 class VMFtoNODRAWConverter:
     def __init__(self):
         self.solids = []
@@ -213,89 +215,57 @@ class VMFtoNODRAWConverter:
         
         print(f"Created ground brush: {min_x},{min_y},{min_z} to {max_x},{max_y},{max_z}")
 
-    def write_vmf(self, filename):
+    def _solids_for_output(self):
+        """Yield the solids to write, giving side-less solids a dummy NODRAW side."""
+        for solid in self.solids:
+            if solid.get('sides'):
+                yield solid
+                continue
+            
+            print(f"Warning: Solid {solid['id']} has no sides. Adding dummy side.")
+            yield {
+                'id': solid['id'],
+                'sides': [{
+                    'id': 'dummy',
+                    'plane': '(0 0 0) (64 0 0) (64 64 0)',
+                    'material': 'TOOLS/TOOLSNODRAW',
+                    'uaxis': '[1 0 0 0] 0.25',
+                    'vaxis': '[0 -1 0 0] 0.25',
+                    'rotation': '0',
+                    'lightmapscale': '16',
+                    'smoothing_groups': '0'
+                }]
+            }
+
+    def write_vmf(self, filename, verbose=False):
         """Write a new .vmf file with NODRAW-textured buildings and a generic ground."""
         try:
-            with open(filename, 'w') as f:
-                # Write VMF header
-                f.write('versioninfo\n{\n\t"editorversion" "400"\n\t"editorbuild" "8864"\n\t"mapversion" "1"\n')
-                f.write('\t"formatversion" "100"\n\t"prefab" "0"\n}\n')
-                f.write('visgroups\n{\n}\n')
-                f.write('viewsettings\n{\n\t"bSnapToGrid" "1"\n\t"bShowGrid" "1"\n\t"bShowLogicalGrid" "0"\n')
-                f.write('\t"nGridSpacing" "64"\n\t"bShow3DGrid" "0"\n}\n')
-
-                # Write world block start
-                f.write('world\n{\n\t"id" "1"\n\t"mapversion" "1"\n\t"classname" "worldspawn"\n')
-                f.write('\t"skyname" "sky_day01_01"\n\t"sounds" "1"\n\t"MaxRange" "4096"\n')
-
-                # Write solids
-                for solid in self.solids:
-                    f.write(f'\tsolid\n\t{{\n\t\t"id" "{solid["id"]}"\n')
-                    
-                    # Check if solid has sides
-                    if not solid.get('sides'):
-                        print(f"Warning: Solid {solid['id']} has no sides. Adding dummy side.")
-                        f.write('\t\tside\n\t\t{\n\t\t\t"id" "dummy"\n')
-                        f.write('\t\t\t"plane" "(0 0 0) (64 0 0) (64 64 0)"\n')
-                        f.write('\t\t\t"material" "TOOLS/TOOLSNODRAW"\n')
-                        f.write('\t\t\t"uaxis" "[1 0 0 0] 0.25"\n')
-                        f.write('\t\t\t"vaxis" "[0 -1 0 0] 0.25"\n')
-                        f.write('\t\t\t"rotation" "0"\n')
-                        f.write('\t\t\t"lightmapscale" "16"\n')
-                        f.write('\t\t\t"smoothing_groups" "0"\n')
-                        f.write('\t\t}\n')
-                    else:
-                        # Write each side
-                        for side in solid['sides']:
-                            f.write(f'\t\tside\n\t\t{{\n\t\t\t"id" "{side["id"]}"\n')
-                            f.write(f'\t\t\t"plane" "{side["plane"]}"\n')
-                            f.write(f'\t\t\t"material" "{side["material"]}"\n')
-                            f.write(f'\t\t\t"uaxis" "{side["uaxis"]}"\n')
-                            f.write(f'\t\t\t"vaxis" "{side["vaxis"]}"\n')
-                            f.write(f'\t\t\t"rotation" "{side["rotation"]}"\n')
-                            f.write(f'\t\t\t"lightmapscale" "{side["lightmapscale"]}"\n')
-                            f.write(f'\t\t\t"smoothing_groups" "{side["smoothing_groups"]}"\n')
-                            f.write('\t\t}\n')
-                    
-                    # Close solid block
-                    f.write('\t}\n')
-                
-                # Close world block
-                f.write('}\n')
-
-                # Write entities
-                for entity in self.entities:
-                    f.write(f'entity\n{{\n\t"id" "{entity["id"]}"\n')
-                    f.write(f'{entity["content"]}\n')
-                    f.write('}\n')
-
-                # Write cameras and cordon sections
-                f.write('cameras\n{\n\t"activecamera" "-1"\n}\n')
-                f.write('cordon\n{\n\t"mins" "(-1024 -1024 -1024)"\n\t"maxs" "(1024 1024 1024)"\n\t"active" "0"\n}\n')
-        
+            vmf_writer.write_vmf(filename, self._solids_for_output(), self.entities, verbose=verbose,
+                                 entity_formatter=vmf_writer.format_raw_entity)
         except Exception as e:
             print(f"Error writing output file: {e}")
             sys.exit(1)
 
-    def convert(self, input_file, output_file):
+    def convert(self, input_file, output_file, verbose=False):
         """Convert the input VMF to a NODRAW-textured VMF with a generic ground."""
         print(f"Starting conversion: {input_file} -> {output_file}")
         self.parse_vmf(input_file)
         self.add_generic_ground()
-        self.write_vmf(output_file)
+        self.write_vmf(output_file, verbose=verbose)
         print(f"Conversion complete: {output_file}")
 
 def main():
     parser = argparse.ArgumentParser(description='Convert a .vmf file to a NODRAW-textured version with a generic ground.')
     parser.add_argument('--input', type=str, required=True, help='Path to the input .vmf file')
     parser.add_argument('--output', type=str, default='nodraw_map.vmf', help='Path to the output .vmf file')
+    parser.add_argument('--verbose', action='store_true', help='Report output size and write throughput')
     parser.add_argument('--debug', action='store_true', help='Enable debug output')
 
     args = parser.parse_args()
 
     try:
         converter = VMFtoNODRAWConverter()
-        converter.convert(args.input, args.output)
+        converter.convert(args.input, args.output, verbose=args.verbose)
         print(f"Successfully converted VMF file.")
     except Exception as e:
         print(f"Error during conversion: {e}")
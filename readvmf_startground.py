@@ -1,6 +1,8 @@
 import re
 import argparse
 
+import vmf_writer
+
 class VMFtoNODRAWConverter:
     def __init__(self):
         self.solids = []
@@ -129,58 +131,29 @@ class VMFtoNODRAWConverter:
                     side['plane'] = f"{new_vertices[0]} {new_vertices[1]} {new_vertices[2]}"
                     del side['vertices']  # Clean up temporary storage
 
-    def write_vmf(self, filename):
+    def write_vmf(self, filename, verbose=False):
         """Write a new .vmf file with NODRAW-textured buildings at ground level."""
-        with open(filename, 'w') as f:
-            f.write('versioninfo\n{\n\t"editorversion" "400"\n\t"editorbuild" "8864"\n\t"mapversion" "1"\n')
-            f.write('\t"formatversion" "100"\n\t"prefab" "0"\n}\n')
-            f.write('visgroups\n{\n}\n')
-            f.write('viewsettings\n{\n\t"bSnapToGrid" "1"\n\t"bShowGrid" "1"\n\t"bShowLogicalGrid" "0"\n')
-            f.write('\t"nGridSpacing" "64"\n\t"bShow3DGrid" "0"\n}\n')
-
-            f.write('world\n{\n\t"id" "1"\n\t"mapversion" "1"\n\t"classname" "worldspawn"\n')
-            f.write('\t"skyname" "sky_day01_01"\n\t"sounds" "1"\n\t"MaxRange" "4096"\n')
-
-            for solid in self.solids:
-                f.write(f'\tsolid\n\t{{\n\t\t"id" "{solid["id"]}"\n')
-                for side in solid['sides']:
-                    f.write(f'\t\tside\n\t\t{{\n\t\t\t"id" "{side["id"]}"\n')
-                    f.write(f'\t\t\t"plane" "{side["plane"]}"\n')
-                    f.write(f'\t\t\t"material" "{side["material"]}"\n')
-                    f.write(f'\t\t\t"uaxis" "{side["uaxis"]}"\n')
-                    f.write(f'\t\t\t"vaxis" "{side["vaxis"]}"\n')
-                    f.write(f'\t\t\t"rotation" "{side["rotation"]}"\n')
-                    f.write(f'\t\t\t"lightmapscale" "{side["lightmapscale"]}"\n')
-                    f.write(f'\t\t\t"smoothing_groups" "{side["smoothing_groups"]}"\n')
-                    f.write('\t\t}\n')
-                f.write('\t}\n')
-            f.write('}\n')
-
-            for entity in self.entities:
-                f.write(f'entity\n{{\n\t"id" "{entity["id"]}"\n')
-                f.write(f'{entity["content"]}\n')
-                f.write('}\n')
-
-            f.write('cameras\n{\n\t"activecamera" "-1"\n}\n')
-            f.write('cordon\n{\n\t"mins" "(-1024 -1024 -1024)"\n\t"maxs" "(1024 1024 1024)"\n\t"active" "0"\n}\n')
+        vmf_writer.write_vmf(filename, self.solids, self.entities, verbose=verbose,
+                             entity_formatter=vmf_writer.format_raw_entity)
 
-    def convert(self, input_file, output_file):
+    def convert(self, input_file, output_file, verbose=False):
         """Convert the input VMF to a NODRAW-textured VMF with buildings at ground level."""
         self.parse_vmf(input_file)
         self.add_generic_ground()
         self.adjust_buildings_to_ground()
-        self.write_vmf(output_file)
+        self.write_vmf(output_file, verbose=verbose)
         print(f"Converted map with buildings at ground level saved to: {output_file}")
 
 def main():
     parser = argparse.ArgumentParser(description='Convert a .vmf file to a NODRAW-textured version with buildings at ground level.')
     parser.add_argument('--input', type=str, required=True, help='Path to the input .vmf file')
     parser.add_argument('--output', type=str, default='nodraw_map.vmf', help='Path to the output .vmf file')
+    parser.add_argument('--verbose', action='store_true', help='Report output size and write throughput')
 
     args = parser.parse_args()
 
     converter = VMFtoNODRAWConverter()
-    converter.convert(args.input, args.output)
+    converter.convert(args.input, args.output, verbose=args.verbose)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,238 @@
+"""
+Spatial index over axis-aligned bounding boxes
+
+A uniform hash grid: every box is registered in the grid cells its bounds
+touch, so a query only looks at the boxes sharing a cell with it instead of
+every brush in the map. Boxes can be inserted and removed at any time,
+which lets generators keep the index up to date while they place geometry.
+
+Boxes spanning a very large number of cells (huge floors, skybox shells)
+are kept in a separate list that every query checks directly, so one big
+brush cannot blow up the grid.
+
+Bounds are (mins, maxs) pairs of 3-element sequences. Keys are any hashable
+value, usually the solid id.
+"""
+
+import bisect
+import math
+
+
+def boxes_overlap(mins_a, maxs_a, mins_b, maxs_b, touching=False):
+    """
+    Return True if two boxes intersect. By default boxes that only share a
+    face, edge or corner do not count; pass touching=True to include them.
+    """
+    if touching:
+        return all(mins_a[k] <= maxs_b[k] and mins_b[k] <= maxs_a[k] for k in range(3))
+    return all(mins_a[k] < maxs_b[k] and mins_b[k] < maxs_a[k] for k in range(3))
+
+
+def box_distance(point, mins, maxs):
+    """Return the distance from point to the nearest point of a box (0 inside it)."""
+    return math.sqrt(sum(max(mins[k] - point[k], 0, point[k] - maxs[k]) ** 2 for k in range(3)))
+
+
+class SpatialIndex:
+    """Incrementally updated uniform-grid index of box bounds."""
+
+    def __init__(self, cell_size=512, max_cells=4096):
+        """
+        Args:
+            cell_size: Edge length of a grid cell in map units.
+            max_cells: Boxes covering more cells than this are not gridded
+                but checked by every query.
+        """
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.boxes = {}
+        self.cells = {}
+        self.large = set()
+        self.grid_mins = None
+        self.grid_maxs = None
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, key):
+        return key in self.boxes
+
+    def bounds(self, key):
+        """Return the (mins, maxs) a key was inserted with."""
+        return self.boxes[key]
+
+    def _cell_range(self, mins, maxs):
+        """Return the inclusive (low, high) grid coordinates covered by a box."""
+        size = self.cell_size
+        return ((int(mins[0] // size), int(mins[1] // size), int(mins[2] // size)),
+                (int(maxs[0] // size), int(maxs[1] // size), int(maxs[2] // size)))
+
+    def _iter_cells(self, low, high):
+        for i in range(low[0], high[0] + 1):
+            for j in range(low[1], high[1] + 1):
+                for k in range(low[2], high[2] + 1):
+                    yield i, j, k
+
+    def insert(self, key, mins, maxs):
+        """Add a box under key, replacing any box previously stored under it."""
+        if key in self.boxes:
+            self.remove(key)
+
+        mins = tuple(mins)
+        maxs = tuple(maxs)
+        self.boxes[key] = (mins, maxs)
+
+        low, high = self._cell_range(mins, maxs)
+        if (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1) > self.max_cells:
+            self.large.add(key)
+            return
+
+        cells = self.cells
+        for cell in self._iter_cells(low, high):
+            if cell in cells:
+                cells[cell].append(key)
+            else:
+                cells[cell] = [key]
+
+        if self.grid_mins is None:
+            self.grid_mins, self.grid_maxs = low, high
+        elif not (self.grid_mins[0] <= low[0] and self.grid_mins[1] <= low[1] and self.grid_mins[2] <= low[2]
+                  and high[0] <= self.grid_maxs[0] and high[1] <= self.grid_maxs[1]
+                  and high[2] <= self.grid_maxs[2]):
+            self.grid_mins = tuple(min(self.grid_mins[k], low[k]) for k in range(3))
+            self.grid_maxs = tuple(max(self.grid_maxs[k], high[k]) for k in range(3))
+
+    def insert_many(self, items):
+        """Add (key, mins, maxs) triples."""
+        for key, mins, maxs in items:
+            self.insert(key, mins, maxs)
+
+    def remove(self, key):
+        """Remove the box stored under key."""
+        mins, maxs = self.boxes.pop(key)
+        if key in self.large:
+            self.large.discard(key)
+            return
+
+        for cell in self._iter_cells(*self._cell_range(mins, maxs)):
+            keys = self.cells[cell]
+            keys.remove(key)
+            if not keys:
+                del self.cells[cell]
+
+    def clear(self):
+        """Remove every box."""
+        self.boxes.clear()
+        self.cells.clear()
+        self.large.clear()
+        self.grid_mins = self.grid_maxs = None
+
+    def _candidates(self, mins, maxs):
+        """Return the keys sharing a grid cell with a box, plus the large boxes."""
+        low, high = self._cell_range(mins, maxs)
+        candidates = set(self.large)
+        if math.prod(high[k] - low[k] + 1 for k in range(3)) > len(self.cells):
+            # Query larger than the occupied grid: walking the cells is cheaper
+            for cell, keys in self.cells.items():
+                if all(low[k] <= cell[k] <= high[k] for k in range(3)):
+                    candidates.update(keys)
+            return candidates
+
+        for cell in self._iter_cells(low, high):
+            keys = self.cells.get(cell)
+            if keys:
+                candidates.update(keys)
+        return candidates
+
+    def query_box(self, mins, maxs, touching=False):
+        """Return the keys of all boxes intersecting the box (mins, maxs)."""
+        found = []
+        for key in self._candidates(mins, maxs):
+            other_mins, other_maxs = self.boxes[key]
+            if boxes_overlap(mins, maxs, other_mins, other_maxs, touching):
+                found.append(key)
+        return found
+
+    def overlaps(self, mins, maxs, touching=False, ignore=()):
+        """Return True if any box other than the keys in ignore intersects (mins, maxs)."""
+        for key in self._candidates(mins, maxs):
+            if key in ignore:
+                continue
+            other_mins, other_maxs = self.boxes[key]
+            if boxes_overlap(mins, maxs, other_mins, other_maxs, touching):
+                return True
+        return False
+
+    def nearest(self, point, max_distance=None):
+        """
+        Return (key, distance) of the box closest to point, or None if the
+        index is empty or nothing lies within max_distance.
+        """
+        found = self.nearest_k(point, 1, max_distance)
+        return found[0] if found else None
+
+    def nearest_k(self, point, k, max_distance=None, ignore=()):
+        """
+        Return up to k (key, distance) pairs of the boxes closest to point,
+        closest first, leaving out the keys in ignore.
+
+        Grid cells are searched in rings of growing size around the point
+        until no unvisited cell can hold anything closer than the k-th match.
+        """
+        found = []  # sorted (distance, order, key)
+        order = 0
+
+        def consider(key):
+            nonlocal order
+            if key in ignore:
+                return
+            distance = box_distance(point, *self.boxes[key])
+            if max_distance is not None and distance > max_distance:
+                return
+            if len(found) < k or distance < found[-1][0]:
+                bisect.insort(found, (distance, order, key))
+                order += 1
+                del found[k:]
+
+        for key in self.large:
+            consider(key)
+
+        if self.cells:
+            size = self.cell_size
+            center = tuple(math.floor(point[axis] / size) for axis in range(3))
+            # Rings needed to reach the farthest occupied cell
+            reach = max(max(abs(center[axis] - self.grid_mins[axis]), abs(center[axis] - self.grid_maxs[axis]))
+                        for axis in range(3))
+            if max_distance is not None:
+                reach = min(reach, math.ceil(max_distance / size) + 1)
+
+            seen = set()
+            for ring in range(reach + 1):
+                # Every cell in this ring is at least (ring - 1) * size away
+                if len(found) == k and found[-1][0] <= (ring - 1) * size:
+                    break
+                for cell in self._iter_ring(center, ring):
+                    for key in self.cells.get(cell, ()):
+                        if key not in seen:
+                            seen.add(key)
+                            consider(key)
+
+        return [(key, distance) for distance, _, key in found]
+
+    def _iter_ring(self, center, ring):
+        """Yield the occupied-grid cells at Chebyshev distance ring from center."""
+        if ring == 0:
+            yield center
+            return
+        low = [max(center[axis] - ring, self.grid_mins[axis]) for axis in range(3)]
+        high = [min(center[axis] + ring, self.grid_maxs[axis]) for axis in range(3)]
+        ci, cj, ck = center
+        for i in range(low[0], high[0] + 1):
+            for j in range(low[1], high[1] + 1):
+                if abs(i - ci) == ring or abs(j - cj) == ring:
+                    for k in range(low[2], high[2] + 1):
+                        yield i, j, k
+                else:
+                    for k in (ck - ring, ck + ring):
+                        if low[2] <= k <= high[2]:
+                            yield i, j, k
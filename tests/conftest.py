@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The modules live as flat scripts at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def generator():
+    import msg1
+
+    return msg1.SourceMapGenerator()
+
+
+@pytest.fixture
+def make_box(generator):
+    """A generator's _create_box: (mins, maxs, textures) -> solid."""
+    return generator._create_box
@@ -0,0 +1,122 @@
+import itertools
+
+import brush_ops
+
+
+def volume(extents):
+    return (extents[3] - extents[0]) * (extents[4] - extents[1]) * (extents[5] - extents[2])
+
+
+def overlap(a, b):
+    return all(max(a[k], b[k]) < min(a[k + 3], b[k + 3]) for k in range(3))
+
+
+def test_subtract_door_leaves_two_sides_and_lintel():
+    wall = (0, 0, 0, 256, 16, 128)
+    door = (96, 0, 0, 160, 16, 96)
+    pieces = brush_ops.subtract(wall, [door])
+
+    assert len(pieces) == 3
+    assert sum(volume(piece) for piece in pieces) == volume(wall) - volume(door)
+    assert not any(overlap(piece, door) for piece in pieces)
+    assert not any(overlap(a, b) for a, b in itertools.combinations(pieces, 2))
+
+
+def test_subtract_clips_holes_reaching_outside_the_box():
+    box = (0, 0, 0, 64, 64, 64)
+    pieces = brush_ops.subtract(box, [(-32, -32, -32, 32, 96, 96)])
+
+    assert pieces == [(32, 0, 0, 64, 64, 64)]
+
+
+def test_subtract_without_overlap_keeps_the_box():
+    box = (0, 0, 0, 64, 64, 64)
+    assert brush_ops.subtract(box, [(128, 0, 0, 192, 64, 64)]) == [box]
+
+
+def test_subtract_many_groups_pieces_by_box():
+    boxes = [(0, 0, 0, 64, 16, 64), (0, 64, 0, 64, 80, 64)]
+    holes = [(16, 64, 16, 48, 80, 48)]
+    pieces, sources = brush_ops.subtract_many(boxes, holes, [1])
+
+    assert sources.tolist() == [0, 1, 1, 1, 1]
+    assert brush_ops.extents_tuples(pieces[:1]) == [boxes[0]]
+    assert sum(volume(piece) for piece in pieces[1:].tolist()) == volume(boxes[1]) - volume(holes[0])
+
+
+def test_merge_boxes_fuses_a_row_of_touching_boxes(make_box):
+    textures = {key: 'DEV/DEV_MEASUREWALL01A' for key in brush_ops.FACE_KEYS}
+    solids = [make_box([x, 0, 0], [x + 64, 16, 128], textures) for x in range(0, 256, 64)]
+    merged = brush_ops.merge_boxes(solids, make_box)
+
+    assert len(merged) == 1
+    assert brush_ops.solid_box(merged[0])[0] == (0, 0, 0, 256, 16, 128)
+
+
+def test_merge_boxes_keeps_boxes_with_other_materials_or_extents(make_box):
+    wall = {key: 'DEV/DEV_MEASUREWALL01A' for key in brush_ops.FACE_KEYS}
+    brick = {key: 'BRICK/BRICKWALL034A' for key in brush_ops.FACE_KEYS}
+    solids = [
+        make_box([0, 0, 0], [64, 16, 128], wall),
+        make_box([64, 0, 0], [128, 16, 128], brick),   # other material
+        make_box([128, 0, 0], [192, 16, 96], brick),   # other height
+    ]
+    merged = brush_ops.merge_boxes(solids, make_box)
+
+    assert sorted(solid['id'] for solid in merged) == sorted(solid['id'] for solid in solids)
+
+
+def test_merge_extents_repeats_passes_across_axes():
+    # Four quadrants of a square only fuse into one box after an X and a Y pass
+    boxes = [((x, y, 0, x + 32, y + 32, 16), 'floor', None) for x in (0, 32) for y in (0, 32)]
+    merged = brush_ops.merge_extents(boxes)
+
+    assert [extents for extents, _, _ in merged] == [(0, 0, 0, 64, 64, 16)]
+
+
+BRICK = ('BRICK/BRICKWALL034A',) * 6
+
+
+def test_face_covered_by_two_abutting_boxes_is_hidden():
+    boxes = [
+        ((0, 0, 0, 64, 128, 64), BRICK),
+        ((64, 0, 0, 128, 64, 64), BRICK),
+        ((64, 64, 0, 128, 128, 64), BRICK),
+    ]
+    hidden = brush_ops.find_hidden_faces(boxes)
+
+    # The +X face of the first box is face 1; each of the others only hides half of it
+    assert (0, 1) in hidden
+    assert (1, 0) in hidden and (2, 0) in hidden
+    # The faces between the two small boxes hide each other
+    assert (1, 3) in hidden and (2, 2) in hidden
+    assert not any(index == 0 and face != 1 for index, face in hidden)
+
+
+def test_partly_covered_face_stays():
+    for others in ([((64, 0, 0, 128, 64, 64), BRICK)],
+                   [((64, 0, 0, 128, 56, 64), BRICK), ((64, 64, 0, 128, 128, 64), BRICK)]):
+        hidden = brush_ops.find_hidden_faces([((0, 0, 0, 64, 128, 64), BRICK)] + others)
+        assert (0, 1) not in hidden
+
+
+def test_faces_behind_non_occluders_stay():
+    hint = ('TOOLS/TOOLSHINT',) * 6
+    hidden = brush_ops.find_hidden_faces([((0, 0, 0, 64, 64, 64), BRICK), ((64, 0, 0, 128, 64, 64), hint)])
+    assert (0, 1) not in hidden
+
+
+def test_rects_cover():
+    assert brush_ops._rects_cover((0, 10, 0, 10), [(0, 5, 0, 10), (5, 10, -5, 15)])
+    assert not brush_ops._rects_cover((0, 10, 0, 10), [(0, 5, 0, 10), (6, 10, 0, 10)])
+    assert not brush_ops._rects_cover((0, 10, 0, 10), [(10, 20, 0, 10)])
+
+
+def test_cull_hidden_faces_retextures_covered_faces(make_box):
+    textures = {key: 'BRICK/BRICKWALL034A' for key in brush_ops.FACE_KEYS}
+    solids = [make_box([0, 0, 0], [64, 64, 64], textures), make_box([64, 0, 0], [128, 64, 64], textures)]
+    assert brush_ops.cull_hidden_faces(solids) == 2
+    materials = [[side['material'] for side in solid['sides']] for solid in solids]
+    assert [row.count('TOOLS/TOOLSNODRAW') for row in materials] == [1, 1]
+    # Culling again finds nothing left to retexture
+    assert brush_ops.cull_hidden_faces(solids) == 0
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+import brush_ops
+import convex_brush
+
+MATERIALS = {key: 'CONCRETE/CONCRETEWALL001A' for key in brush_ops.FACE_KEYS}
+SLOPE = 'CONCRETE/CONCRETEFLOOR001A'
+
+
+def plane_normal(points):
+    """Outward normal of three VMF plane points (clockwise seen from outside)."""
+    a, b, c = (np.asarray(point, dtype=float) for point in points[:3])
+    normal = np.cross(c - a, b - a)
+    return normal / np.linalg.norm(normal)
+
+
+def vertices(brush):
+    return np.unique(np.round(np.concatenate([np.asarray(face['points'], dtype=float) for face in brush]), 6),
+                     axis=0)
+
+
+def assert_valid_convex(brush):
+    """Every face is a flat polygon wound counter-clockwise from outside with every vertex behind it,
+    its VMF plane points agree, and the faces close up (V - E + F = 2)."""
+    corners = vertices(brush)
+    edges = set()
+    for face, (points, _, u, v) in zip(brush, convex_brush.brush_sides(brush)):
+        normal = convex_brush.face_normal(face['points'])
+        offset = normal @ np.asarray(face['points'][0], dtype=float)
+        assert np.allclose(np.asarray(face['points'], dtype=float) @ normal, offset, atol=1e-6)
+        assert np.all(corners @ normal <= offset + 1e-6)
+        assert plane_normal(points) @ normal > 0.999
+        assert abs(np.dot(u, normal)) < 1e-3 and abs(np.dot(v, normal)) < 1e-3
+
+        rounded = [tuple(np.round(point, 6)) for point in face['points']]
+        edges.update(frozenset(pair) for pair in zip(rounded, rounded[1:] + rounded[:1]))
+    assert len(corners) - len(edges) + len(brush) == 2
+
+
+def test_box_sides_match_create_box(make_box):
+    mins, maxs = (0, -64, 16), (128, 64, 80)
+    box = make_box(mins, maxs, {})
+    box_planes = [[np.asarray(point, dtype=float) for point in brush_ops.parse_points(side['plane'])]
+                  for side in box['sides']]
+
+    brush = convex_brush.box_brush(mins, maxs, MATERIALS)
+    assert_valid_convex(brush)
+    for points, _, _, _ in convex_brush.brush_sides(brush):
+        normal = plane_normal(points)
+        # The _create_box side with the same winding lies in the same plane
+        match, = [plane for plane in box_planes if plane_normal(plane) @ normal > 0.999]
+        assert np.allclose([point @ normal for point in match], np.asarray(points[0], dtype=float) @ normal)
+
+
+def test_clip_keeps_outward_faces():
+    brush = convex_brush.box_brush((0, 0, 0), (128, 128, 128), MATERIALS)
+    # Cut off one corner
+    clipped = convex_brush.clip(brush, (1, 1, 1), 256, SLOPE)
+    assert len(clipped) == 7
+    assert_valid_convex(clipped)
+    assert np.all(vertices(clipped) @ np.array([1, 1, 1]) <= 256 + 1e-6)
+    cap = clipped[-1]
+    assert cap['material'] == SLOPE
+    assert convex_brush.face_normal(cap['points']) == pytest.approx(np.ones(3) / np.sqrt(3))
+
+
+def test_clip_misses_or_removes_everything():
+    brush = convex_brush.box_brush((0, 0, 0), (64, 64, 64), MATERIALS)
+    assert convex_brush.clip(brush, (0, 0, 1), 64, SLOPE) is brush
+    assert convex_brush.clip(brush, (0, 0, 1), 0, SLOPE) is None
+
+
+@pytest.mark.parametrize('direction', ['east', 'west', 'north', 'south'])
+def test_ramps_are_walkable_convex_wedges(direction):
+    mins, maxs = (0, 0, 0), (256, 256, 128)
+    ramp, = convex_brush.ramps([(mins, maxs)], [direction], MATERIALS, SLOPE)
+    assert len(ramp) == 5
+    assert_valid_convex(ramp)
+    slope = [face for face in ramp if face['material'] == SLOPE]
+    assert len(slope) == 1
+    normal = convex_brush.face_normal(slope[0]['points'])
+    assert normal[2] >= convex_brush.MIN_WALKABLE_NORMAL_Z
+    # The slope rises towards direction: its normal leans the other way
+    axis, sign = {'east': (0, 1), 'west': (0, -1), 'north': (1, 1), 'south': (1, -1)}[direction]
+    assert normal[axis] * sign < 0
+
+
+def test_steep_ramp_is_rejected():
+    with pytest.raises(ValueError, match='too steep'):
+        convex_brush.ramps([((0, 0, 0), (64, 64, 128))], ['east'], MATERIALS, SLOPE)
+
+
+@pytest.mark.parametrize('axis', [0, 1])
+def test_gable_is_a_convex_prism(axis):
+    mins, maxs = (0, 0, 256), (512, 256, 384)
+    roof = convex_brush.gable(mins, maxs, axis, MATERIALS, SLOPE)
+    assert len(roof) == 5
+    assert_valid_convex(roof)
+    assert sum(face['material'] == SLOPE for face in roof) == 2
+
+    # The ridge runs along axis at the top, over the middle of the other axis
+    corners = vertices(roof)
+    ridge = corners[corners[:, 2] == maxs[2]]
+    other = 1 - axis
+    assert len(ridge) == 2 and np.allclose(ridge[:, other], (mins[other] + maxs[other]) / 2)
+    assert convex_brush.brush_bounds(roof) == ([0.0, 0.0, 256.0], [512.0, 256.0, 384.0])
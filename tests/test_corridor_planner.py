@@ -0,0 +1,82 @@
+import math
+import random
+
+import pytest
+
+import corridor_planner
+
+
+def connected(count, pairs):
+    parent = list(range(count))
+
+    def find(node):
+        while parent[node] != node:
+            node = parent[node]
+        return node
+
+    for a, b in pairs:
+        parent[find(a)] = find(b)
+    return len({find(node) for node in range(count)}) == 1
+
+
+def mst_length(points):
+    """Prim's algorithm over the complete graph."""
+    best = {node: math.dist(points[0], points[node]) for node in range(1, len(points))}
+    total = 0.0
+    while best:
+        node = min(best, key=best.get)
+        total += best.pop(node)
+        for other in best:
+            best[other] = min(best[other], math.dist(points[node], points[other]))
+    return total
+
+
+def scatter(rng, count, spread=4096):
+    return [(rng.uniform(0, spread), rng.uniform(0, spread), 64) for _ in range(count)]
+
+
+@pytest.mark.parametrize('count', [2, 3, 40, 150])
+def test_spanning_tree_connects_every_room(count):
+    points = scatter(random.Random(count), count)
+    pairs = corridor_planner.plan_corridors(points)
+    assert len(pairs) == count - 1
+    assert connected(count, pairs)
+    assert sum(math.dist(points[a], points[b]) for a, b in pairs) == pytest.approx(mst_length(points))
+
+
+def test_sparse_clusters_double_k():
+    rng = random.Random(5)
+    # Three tight clusters far apart: with k=2 the neighbour graph falls apart
+    points = [(cx + rng.uniform(0, 256), cy + rng.uniform(0, 256), 0)
+              for cx, cy in ((0, 0), (20000, 0), (0, 20000)) for _ in range(8)]
+    tree, _ = corridor_planner.minimum_spanning_tree(len(points), corridor_planner.candidate_edges(points, 2))
+    assert len(tree) < len(points) - 1
+
+    pairs = corridor_planner.plan_corridors(points, k=2)
+    assert len(pairs) == len(points) - 1
+    assert connected(len(points), pairs)
+
+
+@pytest.mark.parametrize('extra', [0, 1, 7, -3])
+def test_extra_loop_edges(extra):
+    points = scatter(random.Random(9), 30)
+    pairs = corridor_planner.plan_corridors(points, extra_edges=extra)
+    assert len(pairs) == 29 + max(extra, 0)
+    assert len({tuple(sorted(pair)) for pair in pairs}) == len(pairs)
+    # The loops are the shortest candidates left out of the tree
+    if extra > 0:
+        tree = set(corridor_planner.plan_corridors(points))
+        loops = [pair for pair in pairs if pair not in tree]
+        lengths = [math.dist(points[a], points[b]) for a, b in loops]
+        assert lengths == sorted(lengths)
+
+
+def test_extra_edges_are_capped_by_the_candidates():
+    points = scatter(random.Random(2), 4)
+    # Four points have six possible edges, three of them in the tree
+    assert len(corridor_planner.plan_corridors(points, extra_edges=10)) == 6
+
+
+def test_no_corridors_for_fewer_than_two_rooms():
+    assert corridor_planner.plan_corridors([]) == []
+    assert corridor_planner.plan_corridors([(0, 0, 0)], extra_edges=3) == []
@@ -0,0 +1,94 @@
+import pytest
+
+import corridor_router
+from spatial_index import boxes_overlap
+
+CELL = 160
+THICKNESS = 16
+
+
+def add_room(router, key, x, y, width=480, length=480):
+    inner_mins, inner_maxs = (x, y, 0), (x + width, y + length, 256)
+    outer_mins = (x - THICKNESS, y - THICKNESS, -THICKNESS)
+    outer_maxs = (x + width + THICKNESS, y + length + THICKNESS, 256 + THICKNESS)
+    router.add_room(key, inner_mins, inner_maxs, outer_mins, outer_maxs)
+    return outer_mins, outer_maxs
+
+
+def turns(path):
+    steps = [(b[0] - a[0], b[1] - a[1]) for a, b in zip(path, path[1:])]
+    return sum(1 for s, t in zip(steps, steps[1:]) if s != t)
+
+
+def cell_box(cell):
+    return (cell[0] * CELL, cell[1] * CELL, 0), ((cell[0] + 1) * CELL, (cell[1] + 1) * CELL, 256)
+
+
+@pytest.fixture
+def router():
+    router = corridor_router.CorridorRouter(cell_size=CELL)
+    add_room(router, 'a', 0, 0)
+    add_room(router, 'b', 1600, 0)
+    return router
+
+
+def test_straight_route(router):
+    path = router.route('a', 'b', 96)
+    assert turns(path) == 0
+    assert path[0][0] < path[1][0] and path[-1][0] > path[-2][0]
+    faces = (router.wall_face('a', path[1], path[0]), router.wall_face('b', path[-2], path[-1]))
+    assert faces == (496, 1584)
+
+    boxes = corridor_router.corridor_boxes(path, faces, 96, 128, 0, CELL, THICKNESS)
+    # A straight run compresses to one floor, one ceiling and two walls
+    assert sorted(part for _, _, part in boxes) == ['ceiling', 'floor', 'wall', 'wall']
+    floor = next(box for box in boxes if box[2] == 'floor')
+    assert floor[0][0] == 496 and floor[1][0] == 1584
+
+
+def test_blocked_route_detours(router):
+    wall_mins, wall_maxs = add_room(router, 'wall', 800, -640, 320, 1760)
+    path = router.route('a', 'b', 96)
+    assert path is not None and turns(path) >= 2
+    for cell in path[1:-1]:
+        assert not boxes_overlap(*cell_box(cell), wall_mins, wall_maxs)
+
+    # Boxes stay clear of every room but where they meet the walls they lead to
+    faces = (router.wall_face('a', path[1], path[0]), router.wall_face('b', path[-2], path[-1]))
+    for mins, maxs, _ in corridor_router.corridor_boxes(path, faces, 96, 128, 0, CELL, THICKNESS):
+        assert not router.rooms.overlaps(mins, maxs)
+
+
+def test_routes_reuse_the_grid_and_never_cross(router):
+    first = router.route('a', 'b', 96)
+    grid = router.blocked
+    second = router.route('a', 'b', 96)
+    assert router.blocked is grid
+    assert not set(first[1:-1]) & set(second[1:-1])
+    # The rooms are three cells wide, so the second corridor takes the next lane
+    assert turns(second) == 0 and second[1][1] != first[1][1]
+
+    # Adding a room inside the grid marks its cells without a rebuild
+    add_room(router, 'c', 800, 160, 160, 160)
+    assert router.blocked is grid
+    cells = [(i, j) for i in range(4, 7) for j in range(0, 3) if (i, j) not in router.used]
+    assert cells and all(router.blocked[i - router.origin[0], j - router.origin[1]] for i, j in cells)
+
+
+def test_walls_pick_the_door_cells(router):
+    path = router.route('a', 'b', 96, walls=(1, 1))
+    # Out of a's north wall and into b's north wall
+    assert path[1][1] == path[0][1] + 1 and path[-2][1] == path[-1][1] + 1
+    assert turns(path) == 2
+
+
+def test_no_path_returns_none(router):
+    # Enclose room b in corridor cells taken by something else
+    router.block((1600 - 2 * CELL, -2 * CELL, 0), (2080 + 2 * CELL, 480 + 2 * CELL, 256))
+    assert router.route('a', 'b', 96) is None
+    assert router.route('a', 'b', 96, walls=(0, 2)) is None
+
+
+def test_corridor_too_wide_for_the_room_has_no_doors(router):
+    add_room(router, 'tiny', 3200, 0, 64, 64)
+    assert router.route('a', 'tiny', 96) is None
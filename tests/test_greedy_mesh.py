@@ -0,0 +1,52 @@
+import numpy as np
+
+import greedy_mesh
+
+
+def paint(shape, boxes, values):
+    """Rebuild a grid from boxes, counting how often each voxel is covered."""
+    grid = np.zeros(shape, dtype=values.dtype)
+    cover = np.zeros(shape, dtype=int)
+    for (x0, y0, z0, x1, y1, z1), value in zip(boxes.tolist(), values.tolist()):
+        grid[x0:x1, y0:y1, z0:z1] = value
+        cover[x0:x1, y0:y1, z0:z1] += 1
+    return grid, cover
+
+
+def test_full_grid_is_one_box():
+    boxes, values = greedy_mesh.greedy_boxes(np.ones((5, 6, 7), dtype=bool))
+    assert boxes.tolist() == [[0, 0, 0, 5, 6, 7]]
+    assert values.tolist() == [True]
+
+
+def test_empty_grid_has_no_boxes():
+    boxes, values = greedy_mesh.greedy_boxes(np.zeros((3, 3, 3), dtype=np.uint8))
+    assert boxes.shape == (0, 6) and len(values) == 0
+
+
+def test_boxes_cover_the_grid_exactly():
+    rng = np.random.default_rng(11)
+    # Blocky random material ids, so boxes grow over more than one voxel
+    grid = rng.integers(0, 4, size=(6, 5, 4), dtype=np.uint8).repeat(3, axis=0).repeat(2, axis=2)
+    boxes, values = greedy_mesh.greedy_boxes(grid)
+    painted, cover = paint(grid.shape, boxes, values)
+    assert np.array_equal(painted, grid)
+    assert cover.max() == 1
+    assert np.array_equal(cover == 1, grid != 0)
+    assert len(boxes) < np.count_nonzero(grid)
+
+
+def test_grid_boxes_in_world_units():
+    grid = np.zeros((4, 4, 4), dtype=bool)
+    grid[1:3, :, 0] = True
+    extents, _ = greedy_mesh.grid_boxes(grid, (-64, 0, 32), 16)
+    assert extents.tolist() == [[-48.0, 0.0, 32.0, -16.0, 64.0, 48.0]]
+
+
+def test_mesh_solids_materials(make_box):
+    grid = np.zeros((4, 1, 1), dtype=np.uint8)
+    grid[:2] = 1
+    grid[3] = 2
+    solids = greedy_mesh.mesh_solids(grid, (0, 0, 0), 64, make_box, ['BRICK/BRICKWALL001A', 'CONCRETE/CONCRETEFLOOR001A'])
+    assert [{side['material'] for side in solid['sides']} for solid in solids] == [
+        {'BRICK/BRICKWALL001A'}, {'CONCRETE/CONCRETEFLOOR001A'}]
@@ -0,0 +1,57 @@
+import pickle
+import threading
+
+import pytest
+
+from id_allocator import BOX_IDS, IdAllocator
+
+
+def test_reserve_and_next():
+    ids = IdAllocator(start=10)
+    assert ids.reserve(BOX_IDS) == 10
+    assert ids.next() == 17
+    assert ids.used == BOX_IDS + 1
+
+
+def test_stop_is_enforced():
+    ids = IdAllocator(start=1, stop=8)
+    ids.reserve(BOX_IDS)
+    with pytest.raises(RuntimeError):
+        ids.next()
+    assert ids.next_id == 8
+
+
+def test_split_ranges_are_disjoint_and_merge_back():
+    parent = IdAllocator()
+    parent.next()
+    parts = parent.split(100, 3)
+    assert [part.start for part in parts] == [2, 102, 202]
+    assert parent.next_id == 302
+
+    workers = [pickle.loads(pickle.dumps(part)) for part in parts]
+    handed_out = [worker.reserve(40) for worker in workers]
+    assert handed_out == [2, 102, 202]
+    with pytest.raises(RuntimeError):
+        workers[0].reserve(61)
+
+    for worker in workers:
+        parent.merge(worker)
+    assert parent.next_id == 302
+    parent.merge(IdAllocator(start=500))
+    assert parent.next() == 500
+
+
+def test_threads_get_unique_ids():
+    ids = IdAllocator()
+    found = []
+
+    def work():
+        found.extend(ids.reserve(BOX_IDS) for _ in range(500))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(found)) == 2000
+    assert ids.used == 2000 * BOX_IDS
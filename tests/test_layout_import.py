@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import layout_import
+
+
+def test_run_rectangles_cover_the_labels():
+    rng = np.random.default_rng(4)
+    labels = rng.integers(0, 3, size=(12, 9)).repeat(2, axis=0)
+    labels[5] = 0  # a gap of empty rows splits the rectangles
+    rectangles = layout_import.run_rectangles(labels)
+    painted = np.zeros_like(labels)
+    cover = np.zeros(labels.shape, dtype=int)
+    for row0, col0, row1, col1, value in rectangles:
+        painted[row0:row1, col0:col1] = value
+        cover[row0:row1, col0:col1] += 1
+    assert np.array_equal(painted, labels)
+    assert np.array_equal(cover, (labels != 0).astype(int))
+
+
+def test_repeated_runs_merge():
+    labels = np.array([[1, 1, 2], [1, 1, 2], [1, 1, 0]])
+    assert sorted(layout_import.run_rectangles(labels)) == [(0, 0, 3, 2, 1), (0, 2, 2, 3, 2)]
+
+
+def test_read_text_layout_pads_rows(tmp_path):
+    path = tmp_path / 'plan.txt'
+    path.write_text("####\r\n#P.\n####\n\n")
+    cells = layout_import.read_text_layout(path)
+    assert cells.shape == (3, 4)
+    assert ''.join(cells[1]) == '#P. '
+
+
+def test_layout_boxes():
+    cells = np.array([list("###"), list("#P#"), list("###")])
+    boxes, entities = layout_import.layout_boxes(cells, layout_import.DEFAULT_TEXT_LEGEND, cell_size=64)
+    roles = sorted(role for _, _, role, _ in boxes)
+    assert roles == ['ceiling', 'floor'] + ['wall'] * 4
+    floor = next(box for box in boxes if box[2] == 'floor')
+    assert floor[:2] == ([64, 64, 0], [128, 128, 16])
+    assert entities == [('player_start', [96.0, 96.0, 48])]
+
+
+def test_missing_symbols_are_reported():
+    with pytest.raises(ValueError, match="'x'"):
+        layout_import.layout_boxes(np.array([list("#x#")]), layout_import.DEFAULT_TEXT_LEGEND)
+
+
+def test_unknown_entity_kind():
+    with pytest.raises(ValueError):
+        layout_import.layout_boxes(np.array([list(".")]), {'.': {'floor': 'floor', 'entity': 'dragon'}})
@@ -0,0 +1,54 @@
+import leak_check
+
+
+def hollow_room(make_box, size=256, wall=16, hole=False):
+    """Six walls around a size^3 interior; hole leaves a 64 unit gap in the east wall."""
+    textures = {'top': 'DEV/DEV_MEASUREWALL01A'}
+    inner, outer = size, size + wall
+    boxes = [
+        ((-wall, -wall, -wall), (outer, outer, 0)),
+        ((-wall, -wall, inner), (outer, outer, outer)),
+        ((-wall, -wall, 0), (0, outer, inner)),
+        ((0, -wall, 0), (inner, 0, inner)),
+        ((0, inner, 0), (inner, outer, inner)),
+    ]
+    if hole:
+        boxes += [((inner, -wall, 0), (outer, outer, 64)), ((inner, -wall, 128), (outer, outer, inner)),
+                  ((inner, -wall, 64), (outer, 96, 128)), ((inner, 160, 64), (outer, outer, 128))]
+    else:
+        boxes.append(((inner, -wall, 0), (outer, outer, inner)))
+    return [make_box(mins, maxs, textures) for mins, maxs in boxes]
+
+
+def entity(classname, x, y, z):
+    return {'classname': classname, 'origin': f"{x} {y} {z}"}
+
+
+def test_sealed_room_does_not_leak(make_box):
+    report = leak_check.find_leaks(hollow_room(make_box), [entity('info_player_start', 128, 128, 32)])
+    assert report['leaks'] == []
+    assert report['checked'] == 1
+
+
+def test_hole_leaks_and_path_reaches_the_void(make_box):
+    start = entity('info_player_start', 128, 128, 32)
+    report = leak_check.find_leaks(hollow_room(make_box, hole=True), [start])
+    assert [leak[0] for leak in report['leaks']] == [start]
+    path = report['leaks'][0][1]
+    assert path[0] == (128.0, 128.0, 32.0)
+    assert path[-1][0] > 256, "the path ends outside the room"
+
+
+def test_hint_brushes_do_not_seal(make_box):
+    solids = hollow_room(make_box)
+    for side in solids[-1]['sides']:
+        side['material'] = 'TOOLS/TOOLSHINT'
+    report = leak_check.find_leaks(solids, [entity('info_player_start', 128, 128, 32)])
+    assert len(report['leaks']) == 1
+
+
+def test_entity_in_a_wall_is_not_a_leak(make_box):
+    lamp = entity('light', 128, -8, 32)
+    report = leak_check.find_leaks(hollow_room(make_box), [lamp])
+    assert report['in_solid'] == [lamp]
+    assert report['leaks'] == []
@@ -0,0 +1,136 @@
+import random
+from collections import deque
+
+import numpy as np
+import pytest
+
+import maze_algorithms
+import parallel_tiles
+
+
+def passages(east, north):
+    """Return the neighbour lists of a maze's cells, following the open walls."""
+    width, height = east.shape
+    links = {(x, y): [] for x in range(width) for y in range(height)}
+    for x, y in zip(*np.nonzero(~east[:-1])):
+        links[x, y].append((x + 1, y))
+        links[x + 1, y].append((x, y))
+    for x, y in zip(*np.nonzero(~north[:, :-1])):
+        links[x, y].append((x, y + 1))
+        links[x, y + 1].append((x, y))
+    return links
+
+
+def assert_perfect(east, north):
+    """Every cell is reachable and there is exactly one path between any two: a spanning tree."""
+    width, height = east.shape
+    assert east[-1].all() and north[:, -1].all(), "outer walls must stand"
+    links = passages(east, north)
+    assert sum(len(cells) for cells in links.values()) // 2 == width * height - 1
+
+    seen = {(0, 0)}
+    queue = deque(seen)
+    while queue:
+        for cell in links[queue.popleft()]:
+            if cell not in seen:
+                seen.add(cell)
+                queue.append(cell)
+    assert len(seen) == width * height
+
+
+@pytest.mark.parametrize('algorithm', sorted(maze_algorithms.ALGORITHMS))
+@pytest.mark.parametrize('size', [(1, 1), (1, 7), (12, 9), (30, 30)])
+def test_generated_mazes_are_perfect(algorithm, size):
+    assert_perfect(*maze_algorithms.generate_maze(*size, algorithm, random.Random(5)))
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        maze_algorithms.generate_maze(4, 4, 'prim')
+
+
+def test_linked_tile_mazes_are_perfect():
+    width, height = 23, 17
+    bounds = parallel_tiles.plan_tiles((width, height), (3, 4))
+    east, north = maze_algorithms.new_walls(width, height)
+    rng = random.Random(3)
+    for i0, i1, j0, j1 in bounds:
+        east[i0:i1, j0:j1], north[i0:i1, j0:j1] = maze_algorithms.generate_maze(i1 - i0, j1 - j0, 'kruskal', rng)
+    links = maze_algorithms.link_tiles(bounds, rng)
+    for wall, x, y in links:
+        (east if wall == 'east' else north)[x, y] = False
+
+    assert len(links) == len(bounds) - 1
+    assert_perfect(east, north)
+
+
+@pytest.mark.parametrize('stair_span', [1, 2])
+def test_layered_maze_stairs(stair_span):
+    levels, size = 4, 8
+    east, north, up = maze_algorithms.generate_layered_maze(size, size, levels, rng=random.Random(2),
+                                                            stairs_per_level=5, stair_span=stair_span)
+    for level in range(levels):
+        assert_perfect(east[level], north[level])
+
+    covered = [set() for _ in range(levels - 1)]
+    for level, x, y in zip(*np.nonzero(up)):
+        cells = {(x, y + k) for k in range(stair_span)}
+        assert y + stair_span <= size
+        assert not north[level, x, y:y + stair_span - 1].any(), "a stair must not run through a wall"
+        assert not cells & covered[level]
+        if level:
+            assert not cells & covered[level - 1], "stairwells of neighbouring level pairs must not share cells"
+        covered[level] |= cells
+    assert all(len(cells) == 5 * stair_span for cells in covered)
+
+
+@pytest.mark.parametrize('stair_span', [1, 2])
+def test_layered_maze_with_one_stair_per_level_is_perfect(stair_span):
+    levels, width, height = 3, 6, 5
+    east, north, up = maze_algorithms.generate_layered_maze(width, height, levels, rng=random.Random(8),
+                                                            stair_span=stair_span)
+    # A stair leads from its first cell up into its last one on the next level
+    links = {(level, *cell): [(level, *other) for other in others]
+             for level in range(levels) for cell, others in passages(east[level], north[level]).items()}
+    for level, x, y in zip(*np.nonzero(up)):
+        low, high = (level, x, y), (level + 1, x, y + stair_span - 1)
+        links[low].append(high)
+        links[high].append(low)
+    assert sum(len(cells) for cells in links.values()) // 2 == levels * width * height - 1
+
+    seen = {(0, 0, 0)}
+    queue = deque(seen)
+    while queue:
+        for cell in links[queue.popleft()]:
+            if cell not in seen:
+                seen.add(cell)
+                queue.append(cell)
+    assert len(seen) == levels * width * height
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_split_around_covers_the_rest(seed):
+    rng = random.Random(seed)
+    size = 24
+    rect = (0, 0, size, size)
+    # Holes on a unit grid, touching each other and the edges at times
+    taken = np.zeros((size, size), dtype=bool)
+    holes = []
+    for _ in range(rng.randrange(1, 30)):
+        x0, y0 = rng.randrange(size), rng.randrange(size)
+        x1, y1 = min(size, x0 + rng.randrange(1, 6)), min(size, y0 + rng.randrange(1, 6))
+        if not taken[x0:x1, y0:y1].any():
+            taken[x0:x1, y0:y1] = True
+            holes.append((x0, y0, x1, y1))
+
+    pieces = maze_algorithms.split_around(rect, holes)
+    assert len(pieces) <= 3 * len(holes) + 1
+    cover = taken.astype(int)
+    for x0, y0, x1, y1 in pieces:
+        assert x0 < x1 and y0 < y1
+        cover[x0:x1, y0:y1] += 1
+    assert (cover == 1).all()
+
+
+def test_split_around_without_holes():
+    assert maze_algorithms.split_around((0, 0, 4, 8), []) == [(0, 0, 4, 8)]
@@ -0,0 +1,152 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import brush_ops
+import maze_algorithms
+import overlap_report
+import reachability
+
+
+def box_volume(mins, maxs):
+    return float(np.prod(np.subtract(maxs, mins)))
+
+
+def test_carve_junctions_leaves_no_overlap(generator):
+    room_a = generator.add_room([0, 0, 64], [512, 512, 256])
+    room_b = generator.add_room([1024, 0, 64], [512, 512, 256])
+    generator.add_corridor(room_a, room_b)
+    generator.add_window('front', [256, 520, 192])
+    openings = [(mins, maxs) for mins, maxs, _ in generator.openings]
+    assert len(openings) == 3
+
+    before = {solid['id']: brush_ops.solid_bounds(solid) for solid in generator.solids}
+    assert generator.carve_junctions() == 3
+    assert generator.junctions == []
+    after = {solid['id']: brush_ops.solid_bounds(solid) for solid in generator.solids}
+
+    # The pane was the only brush inside a wall; the carved pieces neither overlap it nor each other
+    assert overlap_report.overlap_report(generator.solids)['pairs'] == []
+    glass = generator.textures['glass']
+    for solid in generator.solids:
+        if solid['sides'][0]['material'] == glass:
+            continue
+        mins, maxs = after[solid['id']]
+        for hole_mins, hole_maxs in openings:
+            assert overlap_report.overlap_volume(mins, maxs, hole_mins, hole_maxs) == 0
+
+    # The pieces fill exactly what the openings left of the walls
+    carved = {key: bounds for key, bounds in before.items() if key not in after}
+    pieces = {key: bounds for key, bounds in after.items() if key not in before}
+    assert len(carved) == 3
+    holes = sum(box_volume(*hole) for hole in openings)
+    assert sum(box_volume(*bounds) for bounds in pieces.values()) == \
+        sum(box_volume(*bounds) for bounds in carved.values()) - holes
+
+    # The spatial index follows the replaced walls
+    assert set(generator.index.query_box([-1024] * 3, [4096] * 3)) >= set(pieces)
+    assert not set(generator.index.query_box([-1024] * 3, [4096] * 3)) & set(carved)
+
+
+def test_one_areaportal_per_opening_between_areas(generator):
+    rooms = [generator.add_room([i * 1024, 0, 64], [512, 512, 256]) for i in range(3)]
+    for room_a, room_b in zip(rooms, rooms[1:]):
+        generator.add_corridor(room_a, room_b)
+    generator.add_window('front', [256, 520, 192])
+    generator.carve_junctions()
+    openings = [(tuple(mins), tuple(maxs)) for mins, maxs, _ in generator.openings]
+    assert len(openings) == 5
+
+    portals, hints = generator.place_visibility_portals()
+    assert portals == 2 and hints == 4
+
+    # Each corridor joins the room it opens into first and takes one portal, at its other end
+    placed = [(tuple(mins), tuple(maxs)) for mins, maxs in generator.areaportals]
+    assert len(set(placed)) == len(placed) == portals
+    assert set(placed) <= set(openings)
+    for corridor_ends in (openings[0:2], openings[2:4]):
+        assert len(set(corridor_ends) & set(placed)) == 1
+    # The window opens into unregistered space, which is one area with the room
+    assert openings[4] not in placed
+
+    # Every portal is a func_areaportal entity whose brush fills its opening
+    entities = [entity for entity in generator.entities if entity['classname'] == 'func_areaportal']
+    assert len(entities) == portals
+    for entity, (mins, maxs) in zip(entities, placed):
+        solid, = entity['solids']
+        assert brush_ops.solid_bounds(solid) == (list(mins), list(maxs))
+        assert {side['material'] for side in solid['sides']} == {generator.textures['areaportal']}
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_partition_space_leaves_tile_the_bounds(generator, seed):
+    random.seed(seed)
+    nodes = generator._partition_space((0, 0, 4096, 3072), 512)
+    leaves = [node['bounds'] for node in nodes if 'children' not in node]
+    assert len(leaves) > 4
+
+    for x0, y0, x1, y1 in leaves:
+        assert x1 - x0 >= 512 and y1 - y0 >= 512
+        # A leaf that could still be split in two would have been
+        assert x1 - x0 < 1024 and y1 - y0 < 1024
+    for a, b in itertools.combinations(leaves, 2):
+        assert overlap_report.overlap_volume(a[:2] + (0,), a[2:] + (1,), b[:2] + (0,), b[2:] + (1,)) == 0
+    assert sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in leaves) == 4096 * 3072
+
+    # Every inner node splits its bounds into its two children
+    for node in nodes:
+        if 'children' in node:
+            first, second = (nodes[child]['bounds'] for child in node['children'])
+            axis, split = node['axis'], node['split']
+            assert first[axis + 2] == second[axis] == split
+            assert first[axis] == node['bounds'][axis] and second[axis + 2] == node['bounds'][axis + 2]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_dungeon_rooms_are_connected(generator, seed):
+    random.seed(seed)
+    dungeon = generator.create_dungeon_scenario(size=(3072, 3072), min_leaf=512)
+    rooms = dungeon['rooms']
+    # One corridor per split of the BSP tree joins its leaves into a tree
+    assert len(dungeon['corridors']) + dungeon['routed'] == len(rooms) - 1
+
+    for a, b in itertools.combinations(rooms, 2):
+        assert overlap_report.overlap_volume(a['mins'], a['maxs'], b['mins'], b['maxs']) == 0
+
+    # The player walks from the start into every room
+    report = reachability.check_reachability(generator.solids, generator.entities)
+    assert report['share'] == 1.0
+    assert report['unreachable'] == [] and report['in_solid'] == []
+
+
+@pytest.mark.parametrize('stair_style', ['steps', 'ramp'])
+def test_layered_maze_stairs_link_the_levels(generator, stair_style):
+    random.seed(1)
+    cell_size, thickness, size = 256, 16, 4
+    level_height = cell_size + thickness
+    stair_span = 2 if stair_style == 'ramp' else 1
+    maze = generator.create_layered_maze_scenario(maze_size=size, levels=3, cell_size=cell_size,
+                                                  stairs_per_level=2, stair_style=stair_style)
+    assert [len(stairs) for stairs in maze['stairs']] == [2, 2]
+    bounds = [brush_ops.solid_bounds(solid) for solid in generator.solids]
+
+    for level, stairs in enumerate(maze['stairs']):
+        floor_z = level * level_height + thickness
+        for x, y in stairs:
+            x0, y0, x1, _ = maze_algorithms.cell_interior(x, y, size, size, cell_size, thickness)
+            y1 = maze_algorithms.cell_interior(x, y + stair_span - 1, size, size, cell_size, thickness)[3]
+            strip_mins, strip_maxs = [x0, y0, floor_z], [(x0 + x1) / 2, y1, floor_z + level_height]
+            inside = [(mins, maxs) for mins, maxs in bounds
+                      if overlap_report.overlap_volume(mins, maxs, strip_mins, strip_maxs) > 0]
+            # The stair fills the strip from this floor up to the top of the next one, through a hole in the slab
+            assert inside
+            assert all(strip_mins[k] <= mins[k] and maxs[k] <= strip_maxs[k] for mins, maxs in inside for k in range(3))
+            assert min(mins[2] for mins, _ in inside) == floor_z
+            assert max(maxs[2] for _, maxs in inside) == floor_z + level_height
+
+    # Without the holes the upper levels would be sealed off from the player start
+    report = reachability.check_reachability(generator.solids, generator.entities)
+    assert report['share'] == 1.0
+    assert report['unreachable'] == [] and report['in_solid'] == []
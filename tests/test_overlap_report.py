@@ -0,0 +1,40 @@
+import itertools
+import random
+
+import overlap_report
+
+
+def test_touching_boxes_do_not_overlap():
+    assert overlap_report.overlap_volume((0, 0, 0), (64, 64, 64), (64, 0, 0), (128, 64, 64)) == 0
+
+
+def test_find_overlaps_matches_brute_force():
+    rng = random.Random(7)
+    boxes = []
+    for key in range(200):
+        mins = [rng.randrange(0, 1024, 16) for _ in range(3)]
+        boxes.append((key, mins, [value + rng.randrange(16, 160, 16) for value in mins]))
+
+    expected = {
+        (a[0], b[0]): overlap_report.overlap_volume(a[1], a[2], b[1], b[2])
+        for a, b in itertools.combinations(boxes, 2)
+    }
+    expected = {pair: volume for pair, volume in expected.items() if volume > 0}
+    for axis in (None, 0, 1, 2):
+        found = {tuple(sorted(pair[:2])): pair[2] for pair in overlap_report.find_overlaps(boxes, axis)}
+        assert found == expected
+
+
+def test_overlap_report_on_solids(make_box):
+    textures = {'top': 'DEV/DEV_MEASUREFLOOR01A'}
+    solids = [
+        make_box([0, 0, 0], [128, 128, 16], textures),
+        make_box([64, 64, 0], [192, 192, 16], textures),   # overlaps the first by 64 x 64 x 16
+        make_box([192, 0, 0], [256, 64, 16], textures),    # touches the second
+    ]
+    report = overlap_report.overlap_report(solids)
+
+    assert report['solids'] == 3
+    assert report['non_box'] == 0
+    assert [(a, b) for a, b, _ in report['pairs']] == [(solids[0]['id'], solids[1]['id'])]
+    assert report['total_volume'] == 64 * 64 * 16
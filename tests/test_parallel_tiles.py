@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+import msg1
+import parallel_tiles
+
+
+@pytest.mark.parametrize('count, parts', [(10, 3), (7, 7), (3, 5), (1, 4), (100, 8)])
+def test_split_range(count, parts):
+    ranges = parallel_tiles.split_range(count, parts)
+    assert len(ranges) == min(parts, count)
+    assert ranges[0][0] == 0 and ranges[-1][1] == count
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    sizes = [stop - start for start, stop in ranges]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_plan_tiles_cover_every_cell_once():
+    cells = (7, 5)
+    bounds = parallel_tiles.plan_tiles(cells, (3, 2))
+    assert len(bounds) == 6
+    covered = [(i, j) for i0, i1, j0, j1 in bounds for i in range(i0, i1) for j in range(j0, j1)]
+    assert sorted(covered) == [(i, j) for i in range(cells[0]) for j in range(cells[1])]
+    # Row-major tile order: X varies fastest
+    assert [b[0] for b in bounds[:3]] == [0, 2, 4] and bounds[3][2] == bounds[0][3]
+
+
+SCENARIOS = {
+    'maze': {'maze_size': 9},
+    'room_grid': {'grid_size': (4, 3)},
+    'arena': {'size': (2048, 1536, 512)}
+}
+
+
+def build(tmp_path, scenario, tiles, workers):
+    generator = msg1.SourceMapGenerator()
+    generator.add_worldspawn()
+    generator.create_tiled_scenario(scenario, tiles=tiles, workers=workers, seed=11, **SCENARIOS[scenario])
+    path = tmp_path / f"{scenario}_{workers}.vmf"
+    generator.save_vmf(path)
+    return generator, path.read_bytes()
+
+
+def all_ids(generator):
+    ids = []
+    for solid in generator.solids:
+        ids.append(solid['id'])
+        ids.extend(side['id'] for side in solid['sides'])
+    # The worldspawn is written as the world block with its fixed id, not as an entity
+    ids.extend(entity['id'] for entity in generator.entities if entity['classname'] != 'worldspawn')
+    return ids
+
+
+@pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+def test_output_does_not_depend_on_workers(tmp_path, monkeypatch, scenario):
+    _, inline = build(tmp_path, scenario, (3, 2), workers=1)
+    # Use worker processes even on a single-CPU machine
+    monkeypatch.setattr(parallel_tiles.os, 'cpu_count', lambda: 4)
+    generator, pooled = build(tmp_path, scenario, (3, 2), workers=3)
+    assert pooled == inline
+
+    ids = all_ids(generator)
+    assert len(ids) == len(set(ids))
+
+
+def test_inline_tiles_leave_the_global_random_state_alone():
+    random.seed(5)
+    state = random.getstate()
+    generator = msg1.SourceMapGenerator()
+    generator.create_tiled_scenario('arena', tiles=(2, 2), workers=1, seed=3)
+    assert random.getstate() == state
+
+
+def test_room_grid_stays_within_its_id_budget(monkeypatch):
+    used = []
+    run_tile = parallel_tiles._run_tile
+
+    def counting(job):
+        result = run_tile(job)
+        i0, i1, j0, j1 = job['bounds']
+        used.append((result[2].used, (i1 - i0) * (j1 - j0)))
+        return result
+
+    monkeypatch.setattr(parallel_tiles, '_run_tile', counting)
+    for seed in range(6):
+        generator = msg1.SourceMapGenerator()
+        generator.create_tiled_scenario('room_grid', tiles=(3, 3), workers=1, seed=seed, grid_size=(6, 6))
+    # One id on top of the cells for the player start
+    assert all(ids <= cells * parallel_tiles.IDS_PER_CELL['room_grid'] + 1 for ids, cells in used)
+
+
+def test_exhausted_id_range_names_the_tile():
+    generator = msg1.SourceMapGenerator()
+    with pytest.raises(RuntimeError, match='ids_per_tile'):
+        parallel_tiles.generate_tiles(generator, 'maze', (4, 4), (2, 2), {'maze_size': 4}, workers=1,
+                                      ids_per_tile=20)
@@ -0,0 +1,29 @@
+import itertools
+import math
+import random
+
+import poisson_disk
+
+
+def test_points_keep_their_distance():
+    radius = 48
+    points = poisson_disk.poisson_disk((0, 0, 0), (1024, 768, 0), radius, random.Random(9))
+    assert len(points) > 100
+    assert all(0 <= x <= 1024 and 0 <= y <= 768 for x, y in points)
+    assert min(math.dist(a, b) for a, b in itertools.combinations(points, 2)) >= radius
+
+
+def test_same_seed_same_points():
+    first = poisson_disk.poisson_disk((0, 0), (512, 512), 32, random.Random(1))
+    assert first == poisson_disk.poisson_disk((0, 0), (512, 512), 32, random.Random(1))
+
+
+def test_accept_rejects_candidates():
+    points = poisson_disk.poisson_disk((0, 0), (512, 512), 32, random.Random(3), accept=lambda x, y: x < 256)
+    assert points and all(x < 256 for x, _ in points)
+
+
+def test_degenerate_input():
+    assert poisson_disk.poisson_disk((0, 0), (-1, 10), 8) == []
+    assert poisson_disk.poisson_disk((0, 0), (10, 10), 0) == []
+    assert len(poisson_disk.poisson_disk((0, 0), (4, 4), 100, random.Random(2))) == 1
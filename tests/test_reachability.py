@@ -0,0 +1,59 @@
+import reachability
+
+WALL = {'top': 'DEV/DEV_MEASUREWALL01A'}
+
+
+def two_rooms(make_box, door):
+    """Two 256 unit rooms side by side along X, sharing a wall with an optional 64x128 doorway."""
+    boxes = [
+        ((-16, -16, -16), (528, 272, 0)),
+        ((-16, -16, 256), (528, 272, 272)),
+        ((-16, -16, 0), (0, 272, 256)),
+        ((512, -16, 0), (528, 272, 256)),
+        ((0, -16, 0), (512, 0, 256)),
+        ((0, 256, 0), (512, 272, 256)),
+    ]
+    if door:
+        boxes += [((256, 0, 0), (272, 96, 256)), ((256, 160, 0), (272, 256, 256)),
+                  ((256, 96, 128), (272, 160, 256))]
+    else:
+        boxes.append(((256, 0, 0), (272, 256, 256)))
+    return [make_box(mins, maxs, WALL) for mins, maxs in boxes]
+
+
+def entities():
+    return [
+        {'classname': 'info_player_start', 'origin': '128 128 32'},
+        {'classname': 'item_healthkit', 'origin': '400 128 16'},
+        {'classname': 'npc_citizen', 'origin': '64 64 16'},
+    ]
+
+
+def test_sealed_room_is_unreachable(make_box):
+    found = entities()
+    report = reachability.check_reachability(two_rooms(make_box, door=False), found)
+    assert report['starts'] == 1 and report['checked'] == 2
+    assert [entity for entity, _ in report['unreachable']] == [found[1]]
+    assert 0.4 < report['share'] < 0.6
+
+
+def test_doorway_connects_the_rooms(make_box):
+    report = reachability.check_reachability(two_rooms(make_box, door=True), entities())
+    assert report['unreachable'] == [] and report['in_solid'] == []
+    assert report['share'] == 1.0
+
+
+def test_low_opening_is_closed(make_box):
+    solids = two_rooms(make_box, door=True)
+    solids.append(make_box((256, 96, 48), (272, 160, 128), WALL))
+    report = reachability.check_reachability(solids, entities())
+    assert len(report['unreachable']) == 1
+
+
+def test_relocate_moves_entities_onto_reachable_floor(make_box):
+    found = entities() + [{'classname': 'item_battery', 'origin': '128 -8 16'}]
+    report = reachability.check_reachability(two_rooms(make_box, door=False), found, relocate=True)
+    assert len(report['in_solid']) == 1 and report['relocated'] == 2
+
+    again = reachability.check_reachability(two_rooms(make_box, door=False), found)
+    assert again['unreachable'] == [] and again['in_solid'] == []
@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from spatial_index import SpatialIndex, box_distance, boxes_overlap
+
+
+def random_boxes(rng, count, extent=4096, size=(16, 600)):
+    boxes = {}
+    for key in range(count):
+        mins = [rng.randrange(-extent, extent, 16) for _ in range(3)]
+        boxes[key] = (mins, [value + rng.randrange(*size, 16) for value in mins])
+    return boxes
+
+
+def brute_query(boxes, mins, maxs, touching=False):
+    return sorted(key for key, (a, b) in boxes.items() if boxes_overlap(mins, maxs, a, b, touching))
+
+
+def test_empty_index():
+    index = SpatialIndex()
+    assert index.query_box((0, 0, 0), (64, 64, 64)) == []
+    assert not index.overlaps((0, 0, 0), (64, 64, 64))
+    assert index.nearest((0, 0, 0)) is None
+    assert index.nearest_k((0, 0, 0), 3) == []
+
+
+def test_boxes_on_cell_boundaries():
+    index = SpatialIndex(cell_size=512)
+    index.insert('a', (0, 0, 0), (512, 512, 512))
+    index.insert('b', (512, 0, 0), (1024, 512, 512))
+    index.insert('c', (-512, -512, -512), (0, 0, 0))
+
+    assert sorted(index.query_box((256, 256, 256), (768, 300, 300))) == ['a', 'b']
+    # Sharing a face or a corner only counts with touching=True
+    assert index.query_box((512, 0, 0), (600, 64, 64)) == ['b']
+    assert sorted(index.query_box((512, 0, 0), (600, 64, 64), touching=True)) == ['a', 'b']
+    assert sorted(index.query_box((0, 0, 0), (0, 0, 0), touching=True)) == ['a', 'c']
+    assert not index.overlaps((0, 0, 0), (512, 512, 512), ignore=('a',))
+    assert index.overlaps((0, 0, 0), (512, 512, 512), touching=True, ignore=('a',))
+
+
+@pytest.mark.parametrize('cell_size, max_cells', [(512, 4096), (128, 64)])
+def test_queries_match_brute_force(cell_size, max_cells):
+    rng = random.Random(1)
+    boxes = random_boxes(rng, 300)
+    index = SpatialIndex(cell_size=cell_size, max_cells=max_cells)
+    index.insert_many((key, *bounds) for key, bounds in boxes.items())
+    # A huge box is kept outside the grid
+    boxes[-1] = ([-8192] * 3, [8192] * 3)
+    index.insert(-1, *boxes[-1])
+    assert -1 in index.large
+
+    for _ in range(100):
+        mins, maxs = next(iter(random_boxes(rng, 1, size=(16, 2000)).values()))
+        touching = rng.random() < 0.5
+        expected = brute_query(boxes, mins, maxs, touching)
+        assert sorted(index.query_box(mins, maxs, touching)) == expected
+        assert index.overlaps(mins, maxs, touching)
+        assert not index.overlaps(mins, maxs, touching, ignore=set(expected))
+
+
+def test_remove_and_reinsert():
+    rng = random.Random(2)
+    boxes = random_boxes(rng, 200)
+    index = SpatialIndex(cell_size=256)
+    index.insert_many((key, *bounds) for key, bounds in boxes.items())
+    for key in list(boxes)[::2]:
+        index.remove(key)
+        del boxes[key]
+    # Moving a box replaces its old bounds
+    boxes[1] = ([5000, 5000, 5000], [5100, 5100, 5100])
+    index.insert(1, *boxes[1])
+
+    assert len(index) == len(boxes)
+    assert 0 not in index and 1 in index
+    assert sorted(index.query_box([-5000] * 3, [6000] * 3)) == sorted(boxes)
+    assert index.query_box((5050, 5050, 5050), (5060, 5060, 5060)) == [1]
+    for key in list(boxes):
+        index.remove(key)
+    assert index.cells == {} and len(index) == 0
+
+
+@pytest.mark.parametrize('k', [1, 5, 40])
+def test_nearest_k_matches_brute_force(k):
+    rng = random.Random(3)
+    # Sparse boxes on a few floors, so the k nearest are spread over several rings of cells
+    boxes = random_boxes(rng, 120, extent=4096, size=(16, 200))
+    for mins, maxs in boxes.values():
+        mins[2], maxs[2] = mins[2] // 16, mins[2] // 16 + 128
+    index = SpatialIndex(cell_size=128)
+    index.insert_many((key, *bounds) for key, bounds in boxes.items())
+
+    for _ in range(30):
+        point = [rng.uniform(-5000, 5000), rng.uniform(-5000, 5000), rng.uniform(-300, 300)]
+        expected = sorted(box_distance(point, *bounds) for bounds in boxes.values())[:k]
+        found = index.nearest_k(point, k)
+        assert [distance for _, distance in found] == pytest.approx(expected)
+        assert all(box_distance(point, *boxes[key]) == distance for key, distance in found)
+
+        limit = expected[-1] / 2
+        within = index.nearest_k(point, k, max_distance=limit)
+        assert [distance for _, distance in within] == pytest.approx([d for d in expected if d <= limit])
+
+    ignored = index.nearest_k((0, 0, 0), 2, ignore={index.nearest((0, 0, 0))[0]})
+    assert ignored[0][1] == pytest.approx(sorted(box_distance((0, 0, 0), *b) for b in boxes.values())[1])
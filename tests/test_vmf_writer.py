@@ -0,0 +1,181 @@
+import pytest
+
+import vmf_writer
+
+TEXTURES = {'top': 'DEV/DEV_MEASUREFLOOR01A', 'north': 'BRICK/BRICKWALL001A'}
+
+
+def write_per_line(f, solids, entities, cameras=1):
+    """The writer msg1.save_vmf used before vmf_writer: one write per line."""
+    f.write('versioninfo\n{\n\t"editorversion" "400"\n\t"editorbuild" "8864"\n\t"mapversion" "1"\n')
+    f.write('\t"formatversion" "100"\n\t"prefab" "0"\n}\n')
+    f.write('visgroups\n{\n}\n')
+    f.write('viewsettings\n{\n\t"bSnapToGrid" "1"\n\t"bShowGrid" "1"\n\t"bShowLogicalGrid" "0"\n')
+    f.write('\t"nGridSpacing" "64"\n\t"bShow3DGrid" "0"\n}\n')
+    f.write('world\n{\n\t"id" "1"\n\t"mapversion" "1"\n\t"classname" "worldspawn"\n')
+    f.write('\t"skyname" "sky_day01_01"\n\t"sounds" "1"\n\t"MaxRange" "4096"\n')
+    for solid in solids:
+        f.write('\tsolid\n\t{\n\t\t"id" "' + str(solid['id']) + '"\n')
+        for side in solid['sides']:
+            f.write('\t\tside\n\t\t{\n\t\t\t"id" "' + str(side['id']) + '"\n')
+            for key in ('plane', 'material', 'uaxis', 'vaxis', 'rotation', 'lightmapscale', 'smoothing_groups'):
+                f.write('\t\t\t"' + key + '" "' + side[key] + '"\n')
+            f.write('\t\t}\n')
+        f.write('\t}\n')
+    f.write('}\n')
+    for entity in entities:
+        f.write('entity\n{\n\t"id" "' + str(entity['id']) + '"\n')
+        for key, value in entity.items():
+            if key != 'id':
+                f.write('\t"' + key + '" "' + value + '"\n')
+        f.write('}\n')
+    for _ in range(cameras):
+        f.write('cameras\n{\n\t"activecamera" "-1"\n}\n')
+    f.write('cordon\n{\n\t"mins" "(-1024 -1024 -1024)"\n\t"maxs" "(1024 1024 1024)"\n')
+    f.write('\t"active" "0"\n}\n')
+
+
+@pytest.fixture
+def small_map(generator, make_box):
+    solids = [make_box([x, 0, 0], [x + 64, 64, 16], TEXTURES) for x in range(0, 640, 64)]
+    entities = [
+        {'id': generator.ids.next(), 'classname': 'light', 'origin': f"{x} 32 64", '_light': '255 255 255 200'}
+        for x in range(32, 352, 64)
+    ]
+    return solids, entities
+
+
+@pytest.fixture
+def reference(tmp_path, small_map):
+    path = tmp_path / 'reference.vmf'
+    with open(path, 'w') as f:
+        write_per_line(f, *small_map)
+    return path.read_text()
+
+
+@pytest.mark.parametrize('batch_size', [1, 4, 5, 9, 10, 11, vmf_writer.DEFAULT_BATCH_SIZE])
+def test_chunks_match_per_line_writer(small_map, reference, batch_size):
+    chunks = list(vmf_writer.iter_vmf_chunks(*small_map, batch_size=batch_size))
+    assert ''.join(chunks) == reference
+
+    # Header, solid batches, end of world, entity batches, footer
+    solids, entities = small_map
+    batches = -(-len(solids) // batch_size) + -(-len(entities) // batch_size)
+    assert len(chunks) == batches + 3
+
+
+def test_write_vmf_matches_per_line_writer(tmp_path, small_map, reference):
+    path = tmp_path / 'chunked.vmf'
+    written = vmf_writer.write_vmf(path, *small_map, batch_size=3, buffer_size=256)
+    assert path.read_text() == reference
+    assert written == len(reference)
+
+
+def test_empty_map():
+    text = ''.join(vmf_writer.iter_vmf_chunks([], [], cameras=0))
+    assert text.count('world\n{\n') == 1 and 'solid' not in text and 'cameras' not in text
+    assert text.endswith('cordon\n{\n\t"mins" "(-1024 -1024 -1024)"\n\t"maxs" "(1024 1024 1024)"\n\t"active" "0"\n}\n')
+
+
+def test_entity_key_order(make_box):
+    entity = {'id': 7, 'classname': 'func_detail', 'solids': [make_box([0, 0, 0], [8, 8, 8], TEXTURES)]}
+    first = vmf_writer.format_entity(entity)
+    last = vmf_writer.format_entity_id_last(entity)
+    assert first.startswith('entity\n{\n\t"id" "7"\n\t"classname" "func_detail"\n\tsolid\n')
+    assert last.startswith('entity\n{\n\t"classname" "func_detail"\n\t"id" "7"\n\tsolid\n')
+    assert first.endswith('\t}\n}\n') and last.endswith('\t}\n}\n')
+
+
+def test_spilled_solids_match_in_memory(small_map, reference):
+    solids, entities = small_map
+    spill = vmf_writer.SolidSpill()
+    try:
+        for start in range(0, len(solids), 3):
+            spill.add(solids[start:start + 3])
+        assert spill.count == len(solids)
+        chunks = vmf_writer.iter_vmf_chunks([], entities, solid_chunks=spill.iter_chunks(chunk_size=100))
+        assert ''.join(chunks) == reference
+        # The spill can be read again, e.g. after a failed save
+        assert ''.join(spill.iter_chunks()) == ''.join(map(vmf_writer.format_solid, solids))
+    finally:
+        spill.close()
+
+
+def build_map(scenario, sink=None, tmp_path=None):
+    import random
+
+    import msg1
+
+    random.seed(3)
+    generator = msg1.SourceMapGenerator()
+    generator.add_worldspawn()
+    path = tmp_path / f"{scenario}_{sink}.vmf"
+    if sink == 'spill':
+        generator.enable_spill(tmp_path)
+    elif sink == 'pipeline':
+        generator.enable_pipeline(path)
+    if scenario == 'rooms':
+        generator.create_simple_room_scenario(room_count=4)
+    else:
+        generator.create_maze_scenario(maze_size=6)
+    generator.save_vmf(path)
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize('scenario', ['rooms', 'maze'])
+def test_spill_mode_matches_in_memory_output(tmp_path, scenario):
+    assert build_map(scenario, 'spill', tmp_path) == build_map(scenario, None, tmp_path)
+
+
+def test_pipelined_output_matches_in_memory(tmp_path):
+    assert build_map('rooms', 'pipeline', tmp_path) == build_map('rooms', None, tmp_path)
+
+
+def failing_write(text):
+    raise OSError('disk full')
+
+
+def test_pipeline_write_error_reaches_add_and_finish(tmp_path, small_map):
+    solids, _ = small_map
+    writer = vmf_writer.PipelinedWriter(tmp_path / 'map.vmf', batch_size=1, queue_size=1)
+    writer._write = failing_write
+
+    # With a one-slot queue the fourth add can only start once the writer
+    # has failed on the first batch and drained the second
+    with pytest.raises(OSError, match='disk full'):
+        for solid in solids:
+            writer.add([solid])
+    with pytest.raises(OSError, match='disk full'):
+        writer.finish(vmf_writer.iter_tail_chunks())
+    assert not writer.thread.is_alive()
+    assert writer.file.closed
+
+
+def test_pipeline_error_in_finish(tmp_path, small_map):
+    solids, _ = small_map
+    writer = vmf_writer.PipelinedWriter(tmp_path / 'map.vmf', batch_size=100)
+    writer.add(solids)
+    writer._write = failing_write
+    with pytest.raises(OSError, match='disk full'):
+        writer.finish(vmf_writer.iter_tail_chunks())
+    assert writer.file.closed
+
+
+def test_pipeline_close_without_finish(tmp_path, small_map):
+    solids, _ = small_map
+    writer = vmf_writer.PipelinedWriter(tmp_path / 'map.vmf', batch_size=2)
+    writer.add(solids)
+    writer.close()
+    assert not writer.thread.is_alive()
+    assert writer.file.closed
+    # A second close is harmless
+    writer.close()
+
+
+def test_throughput_reports_file_bytes(tmp_path, capsys):
+    path = tmp_path / 'map.vmf'
+    # Multi-byte characters make the byte count differ from the character count
+    written = vmf_writer.write_chunks(['é' * 1024 * 1024], path, verbose=True)
+    size = path.stat().st_size
+    assert size > written
+    assert f"Wrote {size / (1024 * 1024):.2f} MB" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import brush_ops
+import convex_brush
+import voxelize
+
+WALL = 'BRICK/BRICKWALL034A'
+METAL = 'METAL/METALWALL001A'
+
+
+def textures(material):
+    return {key: material for key in brush_ops.FACE_KEYS}
+
+
+def centers_inside(solid, origin, resolution, shape):
+    """Brute force: which voxel centers of a grid lie inside a convex solid."""
+    normals, distances = brush_ops.solid_planes(solid)
+    axes = [origin[axis] + (np.arange(shape[axis]) + 0.5) * resolution for axis in range(3)]
+    centers = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+    return np.all(centers @ normals.T <= distances + voxelize.EPSILON, axis=-1)
+
+
+@pytest.fixture
+def solids(generator, make_box):
+    ramp = convex_brush.ramps([((0, 0, 16), (128, 64, 64))], ['east'], textures(METAL), METAL)[0]
+    return [
+        make_box((0, 0, 0), (256, 128, 16), textures(WALL)),
+        # Faces at half-resolution offsets
+        make_box((72, 64, 16), (136, 120, 88), textures(METAL)),
+        generator._create_convex(ramp)
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [None, 4])
+def test_voxelize_solids_matches_brute_force(solids, chunk_size):
+    resolution = 16
+    grid, origin, names = voxelize.voxelize_solids(solids, resolution, materials=True, chunk_size=chunk_size)
+    if chunk_size:
+        grid = grid.to_dense()
+    assert names == [WALL, METAL]
+
+    expected = np.zeros(grid.shape, dtype=np.uint8)
+    for solid in solids:
+        material = names.index(voxelize.brush_material(solid)) + 1
+        expected[centers_inside(solid, origin, resolution, grid.shape)] = material
+    assert np.array_equal(grid, expected)
+    # The padding stays empty
+    assert not grid[0].any() and not grid[-1].any()
+
+
+def test_half_resolution_faces_cover_centers(make_box):
+    grid, origin, _ = voxelize.voxelize_solids([make_box((8, 0, 0), (24, 16, 16), {})], 16, padding=1)
+    # A 16-unit box from 8 to 24 touches the centers at 8 and 24: two voxels along x
+    assert grid.sum() == 2
+    assert voxelize.voxel_center(np.argwhere(grid)[0], origin, 16)[0] == 8
+
+
+def test_fill_convex_matches_brute_force(generator):
+    roof = convex_brush.gable((0, 0, 0), (160, 96, 80), 0, textures(WALL), METAL)
+    solid = generator._create_convex(roof)
+    normals, distances = brush_ops.solid_planes(solid)
+    origin, shape = np.array([-32.0, -32.0, -32.0]), (14, 10, 9)
+    grid = voxelize.fill_convex(np.zeros(shape, dtype=bool), normals, distances, origin, 16)
+    assert grid.any()
+    assert np.array_equal(grid, centers_inside(solid, origin, 16, shape))
+
+
+def test_save_load_round_trip(solids, tmp_path):
+    grid, origin, names = voxelize.voxelize_solids(solids, 8, materials=True)
+    filename = tmp_path / 'grid.npz'
+    voxelize.save_grid(filename, grid, origin, 8, names)
+
+    loaded, loaded_origin, resolution, loaded_names = voxelize.load_grid(filename)
+    assert loaded.dtype == np.uint8
+    assert np.array_equal(loaded, grid)
+    assert np.array_equal(loaded_origin, origin)
+    assert resolution == 8.0
+    assert loaded_names == names
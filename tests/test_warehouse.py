@@ -0,0 +1,38 @@
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'warehouse'))
+
+import warehouse
+
+
+def generate(tmp_path, **kwargs):
+    filename = tmp_path / 'warehouse.vmf'
+    warehouse.generate_warehouse_vmf(str(filename), **kwargs)
+    world, entities = filename.read_text().split('entities\n{')
+    return world, entities
+
+
+def ids(text):
+    return [int(value) for value in re.findall(r'"id" "(\d+)"', text)]
+
+
+def test_interior_stays_in_the_world_by_default(tmp_path):
+    world, entities = generate(tmp_path)
+    assert 'func_detail' not in entities
+    assert 'solid' not in entities
+    assert 'CONCRETE/CONCRETEWALL001A' in world
+
+
+def test_detail_interior_moves_posts_and_keeps_ids_unique(tmp_path):
+    world, entities = generate(tmp_path, detail_interior=True)
+    assert entities.count('"classname" "func_detail"') == 1
+    # The posts stand inside the shell; the walls, floor and roof seal it
+    assert 'CONCRETE/CONCRETEWALL001A' in entities
+    assert 'CONCRETE/CONCRETEWALL001A' not in world
+    assert 'BRICK/BRICKWALL001A' not in entities
+
+    # The worldspawn's id 1 is written by hand; every other id is reserved once
+    all_ids = ids(world)[1:] + ids(entities)
+    assert len(all_ids) == len(set(all_ids))
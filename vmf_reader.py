@@ -0,0 +1,79 @@
+"""
+VMF reader
+
+Parses a VMF file into the same solid dicts the generators build
+({'id', 'sides': [{'id', 'plane', 'material', ...}]}), so brush passes and
+analysis tools can run on hand-made maps as well as on generated ones.
+Entities are returned as dicts of their key/value pairs; brush entities
+keep their own solids under 'solids'.
+"""
+
+
+def parse_blocks(lines):
+    """
+    Parse VMF text lines into nested blocks.
+
+    Returns a list of top-level blocks, each a dict with 'type',
+    'properties' (list of (key, value) pairs) and 'children'.
+    """
+    root = {'type': None, 'properties': [], 'children': []}
+    stack = [root]
+    pending = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line == '{':
+            block = {'type': pending, 'properties': [], 'children': []}
+            stack[-1]['children'].append(block)
+            stack.append(block)
+            pending = None
+        elif line == '}':
+            stack.pop()
+        elif line.startswith('"'):
+            key, _, value = line[1:].partition('" "')
+            stack[-1]['properties'].append((key, value[:-1] if value.endswith('"') else value))
+        elif line.endswith('{'):
+            # "name {" on a single line
+            block = {'type': line[:-1].strip(), 'properties': [], 'children': []}
+            stack[-1]['children'].append(block)
+            stack.append(block)
+        else:
+            pending = line
+
+    return root['children']
+
+
+def _solid(block):
+    """Convert a parsed solid block into a solid dict."""
+    properties = dict(block['properties'])
+    sides = [dict(child['properties']) for child in block['children'] if child['type'] == 'side']
+    return {'id': properties.get('id'), 'sides': sides}
+
+
+def read_vmf(filename):
+    """
+    Read a VMF file.
+
+    Returns (solids, entities): the world brushes as solid dicts, and the
+    entities as dicts of their properties (with a 'solids' list for brush
+    entities).
+    """
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        blocks = parse_blocks(f)
+
+    solids = []
+    entities = []
+    for block in blocks:
+        if block['type'] == 'world':
+            solids.extend(_solid(child) for child in block['children'] if child['type'] == 'solid')
+        elif block['type'] == 'entity':
+            entity = dict(block['properties'])
+            brushes = [_solid(child) for child in block['children'] if child['type'] == 'solid']
+            if brushes:
+                entity['solids'] = brushes
+            entities.append(entity)
+
+    return solids, entities
@@ -0,0 +1,325 @@
+"""
+Chunked VMF serializer
+
+Builds the text of a VMF file in large chunks (one chunk per batch of solids
+or entities) instead of issuing one write per line. The chunks come from a
+generator, so callers can either hand them to write_vmf() or stream them to
+a socket, a pipe or a compressor without holding the whole file in memory.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+import time
+
+# Size of the file buffer used by write_vmf (bytes)
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+# Number of solids (or entities) formatted into a single chunk
+DEFAULT_BATCH_SIZE = 512
+
+DEFAULT_VERSIONINFO = [
+    ('editorversion', '400'),
+    ('editorbuild', '8864'),
+    ('mapversion', '1'),
+    ('formatversion', '100'),
+    ('prefab', '0')
+]
+
+DEFAULT_VIEWSETTINGS = [
+    ('bSnapToGrid', '1'),
+    ('bShowGrid', '1'),
+    ('bShowLogicalGrid', '0'),
+    ('nGridSpacing', '64'),
+    ('bShow3DGrid', '0')
+]
+
+DEFAULT_WORLD = [
+    ('id', '1'),
+    ('mapversion', '1'),
+    ('classname', 'worldspawn'),
+    ('skyname', 'sky_day01_01'),
+    ('sounds', '1'),
+    ('MaxRange', '4096')
+]
+
+DEFAULT_CORDON = [
+    ('mins', '(-1024 -1024 -1024)'),
+    ('maxs', '(1024 1024 1024)'),
+    ('active', '0')
+]
+
+SIDE_TEMPLATE = (
+    '\t\tside\n\t\t{{\n'
+    '\t\t\t"id" "{id}"\n'
+    '\t\t\t"plane" "{plane}"\n'
+    '\t\t\t"material" "{material}"\n'
+    '\t\t\t"uaxis" "{uaxis}"\n'
+    '\t\t\t"vaxis" "{vaxis}"\n'
+    '\t\t\t"rotation" "{rotation}"\n'
+    '\t\t\t"lightmapscale" "{lightmapscale}"\n'
+    '\t\t\t"smoothing_groups" "{smoothing_groups}"\n'
+    '\t\t}}\n'
+)
+
+
+def format_block(name, properties, indent=''):
+    """Format a flat block such as versioninfo or cordon."""
+    lines = [f'{indent}{name}\n{indent}{{\n']
+    lines.extend(f'{indent}\t"{key}" "{value}"\n' for key, value in properties)
+    lines.append(f'{indent}}}\n')
+    return ''.join(lines)
+
+
+def format_solid(solid):
+    """Format one solid (as nested in the world block) into a single string."""
+    parts = [f'\tsolid\n\t{{\n\t\t"id" "{solid["id"]}"\n']
+    parts.extend(SIDE_TEMPLATE.format_map(side) for side in solid['sides'])
+    parts.append('\t}\n')
+    return ''.join(parts)
+
+
+def format_entity(entity):
+    """Format an entity dict, writing its id first and the brushes of brush entities (under 'solids') last."""
+    parts = [f'entity\n{{\n\t"id" "{entity["id"]}"\n']
+    parts.extend(f'\t"{key}" "{value}"\n' for key, value in entity.items() if key not in ('id', 'solids'))
+    parts.extend(map(format_solid, entity.get('solids', ())))
+    parts.append('}\n')
+    return ''.join(parts)
+
+
+def format_entity_id_last(entity):
+    """Format an entity dict like format_entity, but with its id after the other keys."""
+    parts = ['entity\n{\n']
+    parts.extend(f'\t"{key}" "{value}"\n' for key, value in entity.items() if key not in ('id', 'solids'))
+    parts.append(f'\t"id" "{entity["id"]}"\n')
+    parts.extend(map(format_solid, entity.get('solids', ())))
+    parts.append('}\n')
+    return ''.join(parts)
+
+
+def format_raw_entity(entity):
+    """Format an entity parsed from an existing VMF, whose body is kept as raw text."""
+    return f'entity\n{{\n\t"id" "{entity["id"]}"\n{entity["content"]}\n}}\n'
+
+
+def iter_batches(items, formatter, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield the formatted text of items, batch_size items per chunk."""
+    batch = []
+    for item in items:
+        batch.append(formatter(item))
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def format_header(world=None, versioninfo=None, viewsettings=None):
+    """Return the text before the first solid, up to the open world block."""
+    world = DEFAULT_WORLD if world is None else world
+    return ''.join([
+        format_block('versioninfo', versioninfo or DEFAULT_VERSIONINFO),
+        'visgroups\n{\n}\n',
+        format_block('viewsettings', viewsettings or DEFAULT_VIEWSETTINGS),
+        'world\n{\n',
+        ''.join(f'\t"{key}" "{value}"\n' for key, value in world)
+    ])
+
+
+def format_footer(cameras=1, cordon=None):
+    """Return the cameras and cordon sections that close a VMF file."""
+    parts = ['cameras\n{\n\t"activecamera" "-1"\n}\n'] * cameras
+    parts.append(format_block('cordon', cordon or DEFAULT_CORDON))
+    return ''.join(parts)
+
+
+def iter_vmf_chunks(solids, entities=(), world=None, versioninfo=None, viewsettings=None,
+                    cameras=1, cordon=None, entity_formatter=format_entity,
+                    batch_size=DEFAULT_BATCH_SIZE, solid_chunks=()):
+    """
+    Generate the text of a VMF file as a sequence of large chunks.
+
+    Args:
+        solids: Iterable of solid dicts ({'id', 'sides': [...]}) for the world block.
+        entities: Iterable of entity dicts written after the world block.
+        world: (key, value) pairs of the worldspawn block.
+        cameras: Number of cameras blocks to write.
+        entity_formatter: Callable turning one entity into text.
+        batch_size: Number of solids or entities per chunk.
+        solid_chunks: Already formatted solid text (e.g. from a SolidSpill)
+            written into the world block after solids.
+    """
+    yield format_header(world, versioninfo, viewsettings)
+    yield from iter_batches(solids, format_solid, batch_size)
+    yield from solid_chunks
+    yield from iter_tail_chunks(entities, cameras, cordon, entity_formatter, batch_size)
+
+
+def iter_tail_chunks(entities=(), cameras=1, cordon=None, entity_formatter=format_entity,
+                     batch_size=DEFAULT_BATCH_SIZE):
+    """Generate the text after the last solid: the end of the world block, entities, cameras and cordon."""
+    yield '}\n'
+    yield from iter_batches(entities, entity_formatter, batch_size)
+    yield format_footer(cameras, cordon)
+
+
+class SolidSpill:
+    """
+    Temporary world-section file that finished solids are serialized into
+    as soon as they are produced, so they don't have to be kept in memory
+    until the map is saved.
+    """
+
+    def __init__(self, directory=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.file = tempfile.TemporaryFile('w+', dir=directory, buffering=buffer_size)
+        self.count = 0
+
+    def add(self, solids):
+        """Serialize a batch of solids into the spill file."""
+        self.file.write(''.join(map(format_solid, solids)))
+        self.count += len(solids)
+
+    def iter_chunks(self, chunk_size=DEFAULT_BUFFER_SIZE):
+        """Yield the spilled world-section text from the beginning, chunk_size characters at a time."""
+        self.file.flush()
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self.file.seek(0, 2)
+
+    def close(self):
+        """Close and delete the spill file."""
+        self.file.close()
+
+
+class PipelinedWriter:
+    """
+    Writes a VMF file on a background thread while solids are still being
+    generated. Finished solids are collected into batches and pushed into a
+    bounded queue; the writer thread formats and writes each batch, so file
+    I/O and string formatting overlap with the layout computation. When the
+    queue is full, add() blocks until the writer catches up.
+    """
+
+    def __init__(self, filename, world=None, batch_size=DEFAULT_BATCH_SIZE, queue_size=16,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pending = []
+        self.count = 0
+        self.written = 0
+        self.error = None
+        self.start = time.perf_counter()
+
+        self.file = open(filename, 'w', buffering=buffer_size)
+        self._write(format_header(world))
+
+        self.thread = threading.Thread(target=self._run, name='vmf-writer', daemon=True)
+        self.thread.start()
+
+    def _write(self, text):
+        self.file.write(text)
+        self.written += len(text)
+
+    def _run(self):
+        """Writer thread: format and write batches until the end-of-stream marker."""
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                break
+            if self.error is not None:
+                continue  # keep draining so producers never block on a dead writer
+            try:
+                self._write(''.join(map(format_solid, batch)))
+            except Exception as e:
+                self.error = e
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def add(self, solids):
+        """Queue finished solids for writing."""
+        self._check()
+        self.pending.extend(solids)
+        self.count += len(solids)
+        if len(self.pending) >= self.batch_size:
+            self.queue.put(self.pending)
+            self.pending = []
+
+    def finish(self, tail_chunks, verbose=False):
+        """
+        Flush the remaining solids, wait for the writer thread, then write
+        tail_chunks (see iter_tail_chunks) and close the file.
+
+        Returns the number of characters written.
+        """
+        if self.pending:
+            self.queue.put(self.pending)
+            self.pending = []
+        self.queue.put(None)
+        self.thread.join()
+
+        try:
+            self._check()
+            for chunk in tail_chunks:
+                self._write(chunk)
+        finally:
+            self.file.close()
+
+        if verbose:
+            report_throughput(os.path.getsize(self.filename), time.perf_counter() - self.start, self.filename)
+
+        return self.written
+
+    def close(self):
+        """Stop the writer thread and close the file without writing the tail."""
+        if self.thread.is_alive():
+            self.pending = []
+            self.queue.put(None)
+            self.thread.join()
+        self.file.close()
+
+
+def report_throughput(size, elapsed, filename):
+    """Print the size of a written file (in bytes) and the write throughput in MB/s."""
+    elapsed = max(elapsed, 1e-9)
+    megabytes = size / (1024 * 1024)
+    print(f"Wrote {megabytes:.2f} MB to {filename} in {elapsed:.3f}s ({megabytes / elapsed:.1f} MB/s)")
+
+
+def write_chunks(chunks, filename, buffer_size=DEFAULT_BUFFER_SIZE, verbose=False):
+    """
+    Write text chunks to filename through an explicitly sized buffer.
+
+    Returns the number of characters written. In verbose mode the size and
+    throughput of the write are reported.
+    """
+    total = 0
+    start = time.perf_counter()
+
+    def counted(chunks):
+        nonlocal total
+        for chunk in chunks:
+            total += len(chunk)
+            yield chunk
+
+    with open(filename, 'w', buffering=buffer_size) as f:
+        f.writelines(counted(chunks))
+
+    if verbose:
+        report_throughput(os.path.getsize(filename), time.perf_counter() - start, filename)
+
+    return total
+
+
+def write_vmf(filename, solids, entities=(), verbose=False, buffer_size=DEFAULT_BUFFER_SIZE, **kwargs):
+    """Serialize solids and entities to a VMF file using chunked writes."""
+    return write_chunks(iter_vmf_chunks(solids, entities, **kwargs), filename,
+                        buffer_size=buffer_size, verbose=verbose)
@@ -0,0 +1,336 @@
+"""
+Voxelization
+
+Rasterizes brushes into a NumPy grid, for analyses that need to know which
+parts of a map are solid (leak checks, ...): a boolean occupancy grid, or a
+uint8 grid of material ids where 0 is empty.
+
+A grid is described by its origin, the world position of the outer corner
+of voxel (0, 0, 0), and its resolution, the edge length of a voxel in map
+units. A voxel is solid when a brush covers its center: walls at least one
+voxel thick always show up. Grids built by grid_for() put voxel centers
+halfway between multiples of the resolution, so faces on multiples of the
+resolution never touch a center and openings at least one voxel wide stay
+open. Faces at half-resolution offsets (the 8-unit steps of the generators
+on a 16-unit grid) run through centers, and a center on a face counts as
+covered: such openings need to be wider than one voxel to stay open.
+
+Boxes are given in the numeric form of brush_ops: an array of extents
+(x0, y0, z0, x1, y1, z1), one row per box, and filled with one slice
+assignment each. Other convex brushes go through fill_convex(), which tests
+the voxel centers in their bounds against all side planes at once.
+
+Huge maps can use a ChunkedGrid instead of a dense array: it only allocates
+the chunks brushes touch, so the empty space around and between buildings
+costs nothing.
+"""
+
+import argparse
+import collections
+import math
+import time
+
+import numpy as np
+
+import brush_ops
+import vmf_reader
+
+# Tolerance for voxel centers lying on a side plane
+EPSILON = 1e-6
+
+# Edge length of a ChunkedGrid chunk in voxels
+CHUNK_SIZE = 64
+
+# Material prefixes left out when picking the material of a brush
+TOOL_PREFIX = 'TOOLS/'
+
+
+class ChunkedGrid:
+    """
+    A 3D grid stored as cubic chunks allocated on first write.
+
+    Supports the indexing the fill functions use: a tuple of three slices
+    (reading returns a dense copy of the region) or a tuple of three ints.
+    Unwritten voxels read as zero.
+    """
+
+    def __init__(self, shape, dtype=bool, chunk_size=CHUNK_SIZE):
+        self.shape = tuple(int(size) for size in shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.chunks = {}
+
+    def _regions(self, key):
+        """Yield (chunk key, slices in the chunk, slices in the region) covering key."""
+        if all(isinstance(value, (int, np.integer)) for value in key):
+            key = tuple(slice(value, value + 1) for value in key)
+        bounds = [value.indices(size)[:2] for value, size in zip(key, self.shape)]
+        size = self.chunk_size
+        ranges = [range(start // size, (stop - 1) // size + 1) if stop > start else range(0)
+                  for start, stop in bounds]
+        for cx in ranges[0]:
+            for cy in ranges[1]:
+                for cz in ranges[2]:
+                    inside = []
+                    outside = []
+                    for chunk, (start, stop) in zip((cx, cy, cz), bounds):
+                        low = max(start, chunk * size)
+                        high = min(stop, (chunk + 1) * size)
+                        inside.append(slice(low - chunk * size, high - chunk * size))
+                        outside.append(slice(low - start, high - start))
+                    yield (cx, cy, cz), tuple(inside), tuple(outside)
+
+    def __getitem__(self, key):
+        if all(isinstance(value, (int, np.integer)) for value in key):
+            chunk = self.chunks.get(tuple(int(value) // self.chunk_size for value in key))
+            if chunk is None:
+                return self.dtype.type(0)
+            return chunk[tuple(int(value) % self.chunk_size for value in key)]
+        shape = [len(range(*value.indices(size))) for value, size in zip(key, self.shape)]
+        region = np.zeros(shape, dtype=self.dtype)
+        for chunk_key, inside, outside in self._regions(key):
+            chunk = self.chunks.get(chunk_key)
+            if chunk is not None:
+                region[outside] = chunk[inside]
+        return region
+
+    def __setitem__(self, key, value):
+        array = value if np.ndim(value) else None
+        for chunk_key, inside, outside in self._regions(key):
+            chunk = self.chunks.get(chunk_key)
+            if chunk is None:
+                if array is None and not value:
+                    continue
+                # Chunks on the far edges are cut to the grid
+                chunk_shape = [min(self.chunk_size, size - index * self.chunk_size)
+                               for index, size in zip(chunk_key, self.shape)]
+                chunk = self.chunks[chunk_key] = np.zeros(chunk_shape, dtype=self.dtype)
+            chunk[inside] = value if array is None else array[outside]
+
+    @property
+    def nbytes(self):
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    def to_dense(self):
+        """Return the grid as a NumPy array."""
+        return self[tuple(slice(0, size) for size in self.shape)]
+
+
+def grid_for(extents, resolution, padding=1):
+    """
+    Return (origin, shape) of a grid covering all boxes in extents, with
+    padding empty voxels around them.
+    """
+    extents = np.asarray(extents, dtype=float).reshape(-1, 6)
+    if len(extents) == 0:
+        return np.zeros(3), (2 * padding, 2 * padding, 2 * padding)
+    low = np.floor(extents[:, :3].min(axis=0) / resolution) - padding
+    high = np.ceil(extents[:, 3:].max(axis=0) / resolution) + padding
+    return low * resolution, tuple(int(size) for size in high - low)
+
+
+def voxel_ranges(extents, origin, resolution, shape):
+    """
+    Return (low, high) index arrays of the voxels whose centers lie inside
+    each box (high exclusive), clipped to a grid of shape.
+    """
+    extents = np.asarray(extents, dtype=float).reshape(-1, 6)
+    low = np.ceil((extents[:, :3] - origin) / resolution - 0.5).astype(np.int64)
+    high = np.floor((extents[:, 3:] - origin) / resolution - 0.5).astype(np.int64) + 1
+    limit = np.asarray(shape, dtype=np.int64)
+    return np.clip(low, 0, limit), np.clip(high, 0, limit)
+
+
+def fill_boxes(grid, extents, origin, resolution, value=True):
+    """
+    Set the voxels covered by every box in extents to value, one slice
+    assignment per box. value is a scalar or one value per box; later boxes
+    overwrite earlier ones.
+    """
+    low, high = voxel_ranges(extents, origin, resolution, grid.shape)
+    keep = np.all(high > low, axis=1)
+    values = np.broadcast_to(np.asarray(value), (len(low),))[keep].tolist()
+    for (x0, y0, z0), (x1, y1, z1), box_value in zip(low[keep].tolist(), high[keep].tolist(), values):
+        grid[x0:x1, y0:y1, z0:z1] = box_value
+    return grid
+
+
+def fill_convex(grid, normals, distances, origin, resolution, value=True):
+    """
+    Set the voxels whose centers lie inside a convex brush to value. The
+    brush is given by its side planes (see brush_ops.solid_planes); only the
+    voxels in the bounds of the brush's corners are tested.
+    """
+    normals = np.asarray(normals, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    bounds = _plane_bounds(normals, distances)
+    if bounds is None:
+        return grid
+    low, high = voxel_ranges(bounds, origin, resolution, grid.shape)
+    low, high = low[0], high[0]
+    if np.any(high <= low):
+        return grid
+
+    axes = [origin[axis] + (np.arange(low[axis], high[axis]) + 0.5) * resolution for axis in range(3)]
+    centers = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+    inside = np.all(centers @ normals.T <= distances + EPSILON, axis=1)
+    if not inside.any():
+        return grid
+
+    region_slices = tuple(slice(low[axis], high[axis]) for axis in range(3))
+    region = grid[region_slices]
+    region[inside.reshape(region.shape)] = value
+    grid[region_slices] = region
+    return grid
+
+
+def _plane_bounds(normals, distances):
+    """
+    Return the extents of the convex polyhedron bounded by planes, from the
+    intersections of every three planes that lie inside all others, or None
+    if it is empty.
+    """
+    count = len(normals)
+    triples = np.array([(a, b, c) for a in range(count) for b in range(a + 1, count) for c in range(b + 1, count)])
+    if len(triples) == 0:
+        return None
+    matrices = normals[triples]
+    solvable = np.abs(np.linalg.det(matrices)) > EPSILON
+    if not solvable.any():
+        return None
+    points = np.linalg.solve(matrices[solvable], distances[triples[solvable]][..., None])[..., 0]
+    points = points[np.all(points @ normals.T <= distances + 1e-3, axis=1)]
+    if len(points) == 0:
+        return None
+    return np.concatenate([points.min(axis=0), points.max(axis=0)])
+
+
+def voxelize_boxes(extents, resolution, padding=1):
+    """Return (grid, origin) of a boolean occupancy grid of the boxes in extents."""
+    origin, shape = grid_for(extents, resolution, padding)
+    grid = np.zeros(shape, dtype=bool)
+    return fill_boxes(grid, extents, origin, resolution), origin
+
+
+def brush_material(solid):
+    """Return the most common material on a solid's sides, preferring non-tool materials."""
+    materials = [side['material'].upper() for side in solid['sides']]
+    visible = [material for material in materials if not material.startswith(TOOL_PREFIX)]
+    return collections.Counter(visible or materials).most_common(1)[0][0]
+
+
+def voxelize_solids(solids, resolution, materials=False, padding=1, chunk_size=None):
+    """
+    Voxelize VMF solids.
+
+    Boxes are filled by slice assignment, other brushes by their planes.
+
+    Args:
+        solids: Solid dicts.
+        resolution: Voxel size in map units.
+        materials: Store uint8 material ids (1 + index in the returned names)
+            instead of booleans.
+        padding: Empty voxels around the brushes.
+        chunk_size: Store the grid as a ChunkedGrid with chunks of this many
+            voxels per edge instead of a dense array.
+
+    Returns (grid, origin, names): names lists the materials of the ids,
+    empty unless materials is set. Later solids overwrite earlier ones.
+    """
+    boxes = []
+    box_values = []
+    convex = []
+    names = {}
+    bounds = []
+    for solid in solids:
+        if not solid.get('sides'):
+            continue
+        value = True
+        if materials:
+            name = brush_material(solid)
+            value = names.setdefault(name, len(names) + 1)
+            if value > 255:
+                raise ValueError("More than 255 materials do not fit a uint8 grid")
+        box = brush_ops.solid_box(solid)
+        if box is None:
+            normals, distances = brush_ops.solid_planes(solid)
+            brush_bounds = _plane_bounds(normals, distances)
+            if brush_bounds is not None:
+                bounds.append(brush_bounds)
+                convex.append((normals, distances, value))
+        else:
+            bounds.append(box[0])
+            boxes.append(box[0])
+            box_values.append(value)
+
+    origin, shape = grid_for(bounds, resolution, padding)
+    dtype = np.uint8 if materials else bool
+    if chunk_size:
+        grid = ChunkedGrid(shape, dtype, chunk_size)
+    else:
+        grid = np.zeros(shape, dtype=dtype)
+    if boxes:
+        fill_boxes(grid, boxes, origin, resolution, np.array(box_values, dtype=dtype))
+    for normals, distances, value in convex:
+        fill_convex(grid, normals, distances, origin, resolution, value)
+    return grid, origin, list(names)
+
+
+def save_grid(filename, grid, origin, resolution, names=()):
+    """Save a grid with its origin, resolution and material names as a .npz file."""
+    np.savez_compressed(filename, grid=grid, origin=np.asarray(origin, dtype=float), resolution=resolution,
+                        names=np.array(names, dtype=str))
+
+
+def load_grid(filename):
+    """Return (grid, origin, resolution, names) of a grid saved by save_grid()."""
+    with np.load(filename) as data:
+        return data['grid'], data['origin'], float(data['resolution']), data['names'].tolist()
+
+
+def voxel_index(point, origin, resolution):
+    """Return the index of the voxel containing point."""
+    return tuple(math.floor((point[axis] - origin[axis]) / resolution) for axis in range(3))
+
+
+def voxel_center(index, origin, resolution):
+    """Return the world position of the center of a voxel."""
+    return tuple(float(origin[axis] + (index[axis] + 0.5) * resolution) for axis in range(3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Voxelize the brushes of a .vmf file.')
+    parser.add_argument('input', type=str, help='Path to the .vmf file')
+    parser.add_argument('--resolution', type=float, default=16, help='Voxel size in map units')
+    parser.add_argument('--chunked', action='store_true', help='Store the grid in chunks instead of one array')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Save the material id grid, its origin, resolution and material names as a .npz file')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solids, _ = vmf_reader.read_vmf(args.input)
+    grid, origin, names = voxelize_solids(solids, args.resolution, materials=True,
+                                          chunk_size=CHUNK_SIZE if args.chunked else None)
+    elapsed = time.perf_counter() - start
+
+    shape = grid.shape
+    size = shape[0] * shape[1] * shape[2]
+    print(f"{len(solids)} solids -> {shape[0]}x{shape[1]}x{shape[2]} voxels of {args.resolution:g} units, "
+          f"origin ({origin[0]:g} {origin[1]:g} {origin[2]:g})")
+    print(f"Grid memory: {grid.nbytes / 1e6:.1f} MB ({size / 1e6:.1f} MB dense)")
+
+    arrays = grid.chunks.values() if isinstance(grid, ChunkedGrid) else [grid]
+    counts = sum(np.bincount(array.reshape(-1), minlength=len(names) + 1) for array in arrays)
+    for material_id in np.argsort(-counts[1:], kind='stable') + 1:
+        if counts[material_id]:
+            print(f"  {names[material_id - 1]}: {counts[material_id]} voxels")
+    print(f"Solid: {counts[1:].sum()} of {size} voxels")
+    print(f"Voxelization took {elapsed:.2f}s")
+
+    if args.output:
+        save_grid(args.output, grid.to_dense() if isinstance(grid, ChunkedGrid) else grid, origin, args.resolution, names)
+        print(f"Grid saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
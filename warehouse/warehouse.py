@@ -8,12 +8,23 @@ Creates a VMF file for a warehouse with:
 This script generates a complete VMF file that can be imported into Source Hammer editor.
 """
 
+import argparse
 import math
 import os
+import sys
+import textwrap
+
+# Shared helpers live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import brush_ops
+import convex_brush
+import vmf_writer
+from id_allocator import BOX_IDS, IdAllocator
 
 def generate_warehouse_vmf(filename="warehouse.vmf", width=1024, length=1024, height=512, 
                           wall_thickness=16, post_size=32, post_spacing=256, 
-                          door_width=128, door_height=196):
+                          door_width=128, door_height=196, roof_pitch=0, detail_interior=False):
     """
     Generate a warehouse VMF file with customizable dimensions
     
@@ -26,6 +37,10 @@ def generate_warehouse_vmf(filename="warehouse.vmf", width=1024, length=1024, he
     post_size: Width of support columns
     post_spacing: Distance between support columns
     door_width, door_height: Dimensions of the doors
+    roof_pitch: Height of a gable roof on top of the flat roof (0 for none),
+        with the ridge running along y
+    detail_interior: Move brushes that do not seal the map (the posts,
+        trusses and braces) into a func_detail entity, see brush_ops.split_detail
     """
     
     # Initialize VMF file content
@@ -59,211 +74,112 @@ world
 	"detailmaterial" "detail/detailsprites"
 """
     
-    # Initialize counters
-    solid_id = 1
-    side_id = 1
+    # Initialize the id allocator and the list of solids
+    ids = IdAllocator()
+    solids = []
+    
+    def create_side(side_id, plane, material, uaxis, vaxis):
+        return {
+            'id': side_id,
+            'plane': plane,
+            'material': material,
+            'uaxis': uaxis,
+            'vaxis': vaxis,
+            'rotation': 0,
+            'lightmapscale': 16,
+            'smoothing_groups': 0
+        }
     
     # Helper function to create a brush (solid)
     def create_brush(mins, maxs, material="BRICK/BRICKFLOOR001A"):
-        nonlocal solid_id, side_id
-        
-        brush = f"""	solid
-	{{
-		"id" "{solid_id}"
-"""
-        solid_id += 1
+        # Reserve the solid id and the ids of its six sides in one call
+        solid_id = ids.reserve(BOX_IDS)
         
         # Define the 6 sides of the brush (min x, max x, min y, max y, min z, max z)
         # Order: left, right, bottom, top, back, front
-        
-        # Left side (min x)
-        brush += f"""		side
-		{{
-			"id" "{side_id}"
-			"plane" "({mins[0]} {mins[1]} {mins[2]}) ({mins[0]} {maxs[1]} {mins[2]}) ({mins[0]} {maxs[1]} {maxs[2]})"
-			"material" "{material}"
-			"uaxis" "[0 1 0 0] 0.25"
-			"vaxis" "[0 0 -1 0] 0.25"
-			"rotation" "0"
-			"lightmapscale" "16"
-			"smoothing_groups" "0"
-		}}
-"""
-        side_id += 1
-        
-        # Right side (max x)
-        brush += f"""		side
-		{{
-			"id" "{side_id}"
-			"plane" "({maxs[0]} {maxs[1]} {mins[2]}) ({maxs[0]} {mins[1]} {mins[2]}) ({maxs[0]} {mins[1]} {maxs[2]})"
-			"material" "{material}"
-			"uaxis" "[0 1 0 0] 0.25"
-			"vaxis" "[0 0 -1 0] 0.25"
-			"rotation" "0"
-			"lightmapscale" "16"
-			"smoothing_groups" "0"
-		}}
-"""
-        side_id += 1
-        
-        # Bottom side (min z)
-        brush += f"""		side
-		{{
-			"id" "{side_id}"
-			"plane" "({maxs[0]} {mins[1]} {mins[2]}) ({maxs[0]} {maxs[1]} {mins[2]}) ({mins[0]} {maxs[1]} {mins[2]})"
-			"material" "{material}"
-			"uaxis" "[1 0 0 0] 0.25"
-			"vaxis" "[0 -1 0 0] 0.25"
-			"rotation" "0"
-			"lightmapscale" "16"
-			"smoothing_groups" "0"
-		}}
-"""
-        side_id += 1
-        
-        # Top side (max z)
-        brush += f"""		side
-		{{
-			"id" "{side_id}"
-			"plane" "({mins[0]} {mins[1]} {maxs[2]}) ({mins[0]} {maxs[1]} {maxs[2]}) ({maxs[0]} {maxs[1]} {maxs[2]})"
-			"material" "{material}"
-			"uaxis" "[1 0 0 0] 0.25"
-			"vaxis" "[0 -1 0 0] 0.25"
-			"rotation" "0"
-			"lightmapscale" "16"
-			"smoothing_groups" "0"
-		}}
-"""
-        side_id += 1
-        
-        # Back side (min y)
-        brush += f"""		side
-		{{
-			"id" "{side_id}"
-			"plane" "({maxs[0]} {mins[1]} {mins[2]}) ({mins[0]} {mins[1]} {mins[2]}) ({mins[0]} {mins[1]} {maxs[2]})"
-			"material" "{material}"
-			"uaxis" "[1 0 0 0] 0.25"
-			"vaxis" "[0 0 -1 0] 0.25"
-			"rotation" "0"
-			"lightmapscale" "16"
-			"smoothing_groups" "0"
-		}}
-"""
-        side_id += 1
-        
-        # Front side (max y)
-        brush += f"""		side
-		{{
-			"id" "{side_id}"
-			"plane" "({mins[0]} {maxs[1]} {mins[2]}) ({maxs[0]} {maxs[1]} {mins[2]}) ({maxs[0]} {maxs[1]} {maxs[2]})"
-			"material" "{material}"
-			"uaxis" "[1 0 0 0] 0.25"
-			"vaxis" "[0 0 -1 0] 0.25"
-			"rotation" "0"
-			"lightmapscale" "16"
-			"smoothing_groups" "0"
-		}}
-"""
-        side_id += 1
-        
-        brush += """	}
-"""
-        return brush
+        planes = [
+            # Left side (min x)
+            (f"({mins[0]} {mins[1]} {mins[2]}) ({mins[0]} {maxs[1]} {mins[2]}) ({mins[0]} {maxs[1]} {maxs[2]})",
+             "[0 1 0 0] 0.25", "[0 0 -1 0] 0.25"),
+            # Right side (max x)
+            (f"({maxs[0]} {maxs[1]} {mins[2]}) ({maxs[0]} {mins[1]} {mins[2]}) ({maxs[0]} {mins[1]} {maxs[2]})",
+             "[0 1 0 0] 0.25", "[0 0 -1 0] 0.25"),
+            # Bottom side (min z)
+            (f"({maxs[0]} {mins[1]} {mins[2]}) ({maxs[0]} {maxs[1]} {mins[2]}) ({mins[0]} {maxs[1]} {mins[2]})",
+             "[1 0 0 0] 0.25", "[0 -1 0 0] 0.25"),
+            # Top side (max z)
+            (f"({mins[0]} {mins[1]} {maxs[2]}) ({mins[0]} {maxs[1]} {maxs[2]}) ({maxs[0]} {maxs[1]} {maxs[2]})",
+             "[1 0 0 0] 0.25", "[0 -1 0 0] 0.25"),
+            # Back side (min y)
+            (f"({maxs[0]} {mins[1]} {mins[2]}) ({mins[0]} {mins[1]} {mins[2]}) ({mins[0]} {mins[1]} {maxs[2]})",
+             "[1 0 0 0] 0.25", "[0 0 -1 0] 0.25"),
+            # Front side (max y)
+            (f"({mins[0]} {maxs[1]} {mins[2]}) ({maxs[0]} {maxs[1]} {mins[2]}) ({maxs[0]} {maxs[1]} {maxs[2]})",
+             "[1 0 0 0] 0.25", "[0 0 -1 0] 0.25")
+        ]
+        return {
+            'id': solid_id,
+            'sides': [create_side(side_id, plane, material, uaxis, vaxis)
+                      for side_id, (plane, uaxis, vaxis) in enumerate(planes, solid_id + 1)]
+        }
+    
+    # Helper function to create a convex_brush brush (sloped faces)
+    def create_convex_brush(faces):
+        solid_id = ids.reserve(1 + len(faces))
+        return {
+            'id': solid_id,
+            'sides': [
+                create_side(side_id, " ".join(f"({x} {y} {z})" for x, y, z in points), material,
+                            f"[{uaxis[0]} {uaxis[1]} {uaxis[2]} 0] 0.25", f"[{vaxis[0]} {vaxis[1]} {vaxis[2]} 0] 0.25")
+                for side_id, (points, material, uaxis, vaxis) in enumerate(convex_brush.brush_sides(faces), solid_id + 1)
+            ]
+        }
     
     # Create the main building shell (exterior walls)
     # Floor
-    vmf_content += create_brush(
+    solids.append(create_brush(
         [0, 0, 0],
         [width, length, wall_thickness],
         "BRICK/BRICKFLOOR001A"
-    )
+    ))
     
     # Roof
-    vmf_content += create_brush(
+    solids.append(create_brush(
         [0, 0, height - wall_thickness],
         [width, length, height],
         "CONCRETE/CONCRETEFLOOR001A"
-    )
-    
-    # North wall (excluding door area)
-    vmf_content += create_brush(
-        [0, length - wall_thickness, wall_thickness],
-        [width/2 - door_width/2, length, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    vmf_content += create_brush(
-        [width/2 + door_width/2, length - wall_thickness, wall_thickness],
-        [width, length, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    # Above north door
-    vmf_content += create_brush(
-        [width/2 - door_width/2, length - wall_thickness, door_height],
-        [width/2 + door_width/2, length, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    # South wall (excluding door area)
-    vmf_content += create_brush(
-        [0, 0, wall_thickness],
-        [width/2 - door_width/2, wall_thickness, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    vmf_content += create_brush(
-        [width/2 + door_width/2, 0, wall_thickness],
-        [width, wall_thickness, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    # Above south door
-    vmf_content += create_brush(
-        [width/2 - door_width/2, 0, door_height],
-        [width/2 + door_width/2, wall_thickness, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    # East wall (excluding door area)
-    vmf_content += create_brush(
-        [width - wall_thickness, wall_thickness, wall_thickness],
-        [width, length/2 - door_width/2, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
+    ))
     
-    vmf_content += create_brush(
-        [width - wall_thickness, length/2 + door_width/2, wall_thickness],
-        [width, length - wall_thickness, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
+    # Gable roof: one prism sitting on the flat roof, sloped faces textured along the slope
+    if roof_pitch > 0:
+        solids.append(create_convex_brush(convex_brush.gable(
+            (0, 0, height), (width, length, height + roof_pitch), 1,
+            {'front': "BRICK/BRICKWALL001A", 'back': "BRICK/BRICKWALL001A"}, "METAL/METALROOF005A"
+        )))
     
-    # Above east door
-    vmf_content += create_brush(
-        [width - wall_thickness, length/2 - door_width/2, door_height],
-        [width, length/2 + door_width/2, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
+    # Exterior walls, each cut around the door in its middle
+    # (the north and south walls run the full width, east and west fit between them)
+    door_x0, door_x1 = width/2 - door_width/2, width/2 + door_width/2
+    door_y0, door_y1 = length/2 - door_width/2, length/2 + door_width/2
+    walls = [
+        # North wall
+        ((0, length - wall_thickness, wall_thickness, width, length, height - wall_thickness),
+         (door_x0, length - wall_thickness, wall_thickness, door_x1, length, door_height)),
+        # South wall
+        ((0, 0, wall_thickness, width, wall_thickness, height - wall_thickness),
+         (door_x0, 0, wall_thickness, door_x1, wall_thickness, door_height)),
+        # East wall
+        ((width - wall_thickness, wall_thickness, wall_thickness, width, length - wall_thickness, height - wall_thickness),
+         (width - wall_thickness, door_y0, wall_thickness, width, door_y1, door_height)),
+        # West wall
+        ((0, wall_thickness, wall_thickness, wall_thickness, length - wall_thickness, height - wall_thickness),
+         (0, door_y0, wall_thickness, wall_thickness, door_y1, door_height))
+    ]
     
-    # West wall (excluding door area)
-    vmf_content += create_brush(
-        [0, wall_thickness, wall_thickness],
-        [wall_thickness, length/2 - door_width/2, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    vmf_content += create_brush(
-        [0, length/2 + door_width/2, wall_thickness],
-        [wall_thickness, length - wall_thickness, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
-    
-    # Above west door
-    vmf_content += create_brush(
-        [0, length/2 - door_width/2, door_height],
-        [wall_thickness, length/2 + door_width/2, height - wall_thickness],
-        "BRICK/BRICKWALL001A"
-    )
+    # Pieces beside and above every door, cut for all walls at once
+    pieces, _ = brush_ops.subtract_many([wall for wall, _ in walls], [door for _, door in walls], range(len(walls)))
+    for piece in brush_ops.extents_tuples(pieces):
+        solids.append(create_brush(piece[:3], piece[3:], "BRICK/BRICKWALL001A"))
     
     # Create support posts
     num_posts_x = max(2, math.floor((width - 2*wall_thickness) / post_spacing))
@@ -295,11 +211,11 @@ world
                     door_conflict = True
             
             if not door_conflict:
-                vmf_content += create_brush(
+                solids.append(create_brush(
                     [post_x - post_size/2, post_y - post_size/2, wall_thickness],
                     [post_x + post_size/2, post_y + post_size/2, height - wall_thickness],
                     "CONCRETE/CONCRETEWALL001A"
-                )
+                ))
     
     # Create roof trusses
     truss_height = 64
@@ -314,11 +230,11 @@ world
             continue
         
         # Main truss beam
-        vmf_content += create_brush(
+        solids.append(create_brush(
             [wall_thickness, truss_y - truss_thickness/2, height - truss_height],
             [width - wall_thickness, truss_y + truss_thickness/2, height - wall_thickness],
             "METAL/METALWALL001A"
-        )
+        ))
         
         # Add cross braces between trusses
         if j < num_posts_y:
@@ -353,32 +269,44 @@ world
                 
                 if not door_conflict:
                     # Simplified diagonal brace (approximated as a rectangular brush)
-                    vmf_content += create_brush(
+                    solids.append(create_brush(
                         [post_x, truss_y, height - truss_height + brace_thickness],
                         [next_post_x, next_truss_y, height - truss_height + brace_thickness*2],
                         "METAL/METALWALL001A"
-                    )
+                    ))
+    
+    # Posts, trusses and braces stand inside the shell, so split_detail
+    # moves them into func_detail; everything sealing the map stays in the world
+    entities = []
+    if detail_interior:
+        interior = ([wall_thickness] * 3, [width - wall_thickness, length - wall_thickness, height - wall_thickness])
+        solids, detail = brush_ops.split_detail(solids, [interior])
+        if detail:
+            entities.append({'id': ids.next(), 'classname': 'func_detail', 'solids': detail})
+    vmf_content += "".join(map(vmf_writer.format_solid, solids))
+    
+    entities.append({
+        'id': ids.next(),
+        'classname': 'light_environment',
+        '_ambient': '255 255 255 20',
+        '_ambientHDR': '-1 -1 -1 1',
+        '_AmbientScaleHDR': '1',
+        '_light': '255 255 255 200',
+        '_lightHDR': '-1 -1 -1 1',
+        '_lightscaleHDR': '1',
+        'angles': '0 0 0',
+        'pitch': '-90',
+        'SunSpreadAngle': '0',
+        'origin': '0 0 256'
+    })
     
-    # Close the world entity and add entity definitions if needed
+    # Close the world entity and add the entities, nested in an entities block
     vmf_content += """}
 entities
 {
-	entity
-	{
-		"id" "2"
-		"classname" "light_environment"
-		"_ambient" "255 255 255 20"
-		"_ambientHDR" "-1 -1 -1 1"
-		"_AmbientScaleHDR" "1"
-		"_light" "255 255 255 200"
-		"_lightHDR" "-1 -1 -1 1"
-		"_lightscaleHDR" "1"
-		"angles" "0 0 0"
-		"pitch" "-90"
-		"SunSpreadAngle" "0"
-		"origin" "0 0 256"
-	}
-}
+"""
+    vmf_content += "".join(textwrap.indent(vmf_writer.format_entity(entity), "\t") for entity in entities)
+    vmf_content += """}
 cameras
 {
 	"activecamera" "-1"
@@ -399,6 +327,11 @@ cordon
 
 # Example usage
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a warehouse VMF')
+    parser.add_argument('--detail-brushes', action='store_true',
+                        help='Move brushes that do not seal the map into func_detail')
+    args = parser.parse_args()
+    
     generate_warehouse_vmf(
         filename="warehouse.vmf", 
         width=1024, 
@@ -408,5 +341,6 @@ if __name__ == "__main__":
         post_size=32,
         post_spacing=256,
         door_width=128,
-        door_height=196
+        door_height=196,
+        detail_interior=args.detail_brushes
     )
\ No newline at end of file